@@ -1,6 +1,26 @@
-from fastapi import FastAPI, Request, Response
+import os
+import re
+from typing import Annotated, BinaryIO, Iterator
+from urllib.parse import quote
+from zipfile import BadZipFile, ZipFile
+
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.background import BackgroundTask
+
+from main import convert_cvsx_to_mvsx_cached
+from src.io.mvsx.cache import ResultCache
+from src.models.mvsx.mvsx_options import ConversionSelection, MVSXConversionOptions
+from src.models.mvsx.mvsx_plan import MVSXPlan
+from src.plan import plan_conversion
+
+DATA_DIR = os.path.realpath("data")
+CHUNK_SIZE = 1 << 20
+# finished conversions, shared with the batch CLI when given the same
+# --cache-dir
+RESULT_CACHE = ResultCache("cache", max_bytes=10 * 2**30)
 
 app = FastAPI()
 
@@ -30,5 +50,162 @@ async def private_network_middleware(request: Request, call_next):
     return response
 
 
+def get_data_filepath(filepath: str) -> str:
+    # routes name a CVSX by its path under data/
+    if os.path.isabs(filepath):
+        raise HTTPException(status_code=404)
+    path = os.path.realpath(os.path.join(DATA_DIR, filepath))
+    if os.path.commonpath([path, DATA_DIR]) != DATA_DIR:
+        raise HTTPException(status_code=404)
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404)
+    return path
+
+
+def get_volume_url_template(url_template: str, cvsx_path: str) -> str:
+    # volume URLs name the CVSX by its path under data/, as the member route
+    # takes it, not by its path on the server
+    filepath = os.path.relpath(cvsx_path, DATA_DIR)
+    return url_template.replace("{cvsx_path}", quote(filepath))
+
+
+def get_byte_range(range_header: str | None, size: int) -> tuple[int, int] | None:
+    # single "bytes=start-end" range, end inclusive
+    if range_header is None:
+        return None
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", range_header.strip())
+    if match is None or match.groups() == ("", ""):
+        raise HTTPException(status_code=416)
+    start, end = match.groups()
+    if start == "":
+        # suffix range, the last end bytes
+        start, end = max(0, size - int(end)), size - 1
+    else:
+        start, end = int(start), min(int(end), size - 1) if end else size - 1
+    if start > end:
+        raise HTTPException(
+            status_code=416, headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, end
+
+
+def iter_member(f: BinaryIO, zip_file: ZipFile, length: int) -> Iterator[bytes]:
+    try:
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+        zip_file.close()
+
+
+@app.get("/cvsx/{filepath:path}/{member}")
+def get_cvsx_member(filepath: str, member: str, request: Request):
+    # serves one member of a CVSX under data/ without extracting it, so
+    # MVSX volume nodes can reference the CVSX in place (see
+    # MVSXConversionOptions.volume_url_template). Stored members seek
+    # directly to a requested byte range
+    cvsx_path = get_data_filepath(filepath)
+    zip_file = ZipFile(cvsx_path, "r")
+    try:
+        size = zip_file.getinfo(member).file_size
+    except KeyError:
+        zip_file.close()
+        raise HTTPException(status_code=404)
+
+    try:
+        byte_range = get_byte_range(request.headers.get("range"), size)
+    except HTTPException:
+        zip_file.close()
+        raise
+
+    f = zip_file.open(member)
+    headers = {"Accept-Ranges": "bytes"}
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(
+            iter_member(f, zip_file, size),
+            media_type="application/octet-stream",
+            headers=headers,
+        )
+
+    start, end = byte_range
+    f.seek(start)
+    headers["Content-Length"] = str(end - start + 1)
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return StreamingResponse(
+        iter_member(f, zip_file, end - start + 1),
+        status_code=206,
+        media_type="application/octet-stream",
+        headers=headers,
+    )
+
+
+@app.post("/mvsx/{filepath:path}")
+def convert_cvsx(
+    filepath: str,
+    selection: Annotated[ConversionSelection, Query()],
+    options: MVSXConversionOptions | None = None,
+):
+    # converts a CVSX under data/, the same content with the same options
+    # is converted once and then served from the result cache. Query
+    # parameters like ?timeframes=0&segment_ids=1&segment_ids=2 convert only
+    # part of the entry, in place of options.selection
+    cvsx_path = get_data_filepath(filepath)
+    if selection.model_fields_set:
+        options = options or MVSXConversionOptions()
+        options = options.model_copy(update={"selection": selection})
+    if options is not None and options.volume_url_template is not None:
+        options = options.model_copy(
+            update={
+                "volume_url_template": get_volume_url_template(
+                    options.volume_url_template, cvsx_path
+                )
+            }
+        )
+    # a link of the cached MVSX of its own, eviction by other requests
+    # cannot remove it while it is sent. Removed once sent
+    response_path = RESULT_CACHE.get_temp_path()
+    try:
+        convert_cvsx_to_mvsx_cached(
+            cvsx_path,
+            RESULT_CACHE,
+            options,
+            output_path=response_path,
+            link_output=True,
+        )
+    except BadZipFile:
+        raise HTTPException(status_code=422, detail="Not a CVSX archive")
+
+    name, _ = os.path.splitext(os.path.basename(cvsx_path))
+    return FileResponse(
+        response_path,
+        media_type="application/zip",
+        filename=f"{name}.mvsx",
+        background=BackgroundTask(os.remove, response_path),
+    )
+
+
+@app.post("/plan/{filepath:path}")
+def plan_cvsx(
+    filepath: str,
+    selection: Annotated[ConversionSelection, Query()],
+    options: MVSXConversionOptions | None = None,
+) -> MVSXPlan:
+    # predicts the time, peak memory and output size of POST /mvsx with the
+    # same arguments, from the index, metadata and BCIF headers only
+    cvsx_path = get_data_filepath(filepath)
+    if selection.model_fields_set:
+        options = options or MVSXConversionOptions()
+        options = options.model_copy(update={"selection": selection})
+    try:
+        return plan_conversion(cvsx_path, options)
+    except BadZipFile:
+        raise HTTPException(status_code=422, detail="Not a CVSX archive")
+
+
 app.mount("/temp", StaticFiles(directory="temp"), name="temp")
 app.mount("/data", StaticFiles(directory="data"), name="data")
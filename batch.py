@@ -0,0 +1,398 @@
+"""
+Converts many CVSX entries across a process pool, largest first. Progress is
+recorded in a JSON manifest, so a rerun skips converted entries and retries
+failed ones.
+
+    python batch.py "data/cvsx/zipped/*.cvsx" --output-dir output --workers 8
+    python batch.py data/cvsx/zipped --timeframes 0,1 --segmentations 0
+    python batch.py data/cvsx/zipped --dry-run
+    python batch.py data/cvsx/zipped --memory-limit 16 --cost-model model.json
+"""
+
+import argparse
+import glob
+import hashlib
+import os
+import tempfile
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+
+from main import convert_cvsx_to_mvsx, convert_cvsx_to_mvsx_cached
+from src.io.mvsx.cache import ResultCache, get_cache_key
+from src.models.mvsx.mvsx_batch import MVSXBatchEntry, MVSXBatchManifest
+from src.models.mvsx.mvsx_options import ConversionSelection, MVSXConversionOptions
+from src.models.mvsx.mvsx_plan import MVSXCostModel, MVSXPlan
+from src.plan import (
+    DEFAULT_COST_MODEL,
+    MemoryAdmission,
+    load_cost_model,
+    plan_conversion,
+)
+
+HASH_CHUNK_SIZE = 1 << 20
+# command line flags of the ConversionSelection fields
+SELECTION_FLAGS = {
+    "--timeframes": "timeframes",
+    "--channels": "channel_ids",
+    "--segmentations": "segmentation_ids",
+    "--segmentation-kinds": "segmentation_kinds",
+    "--segments": "segment_ids",
+}
+
+
+def find_cvsx_files(inputs: list[str]) -> list[str]:
+    # directories are searched for *.cvsx, everything else is a glob
+    cvsx_paths = set()
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "**", "*.cvsx")
+        for path in glob.glob(pattern, recursive=True):
+            if os.path.isfile(path):
+                cvsx_paths.add(os.path.abspath(path))
+    return sorted(cvsx_paths)
+
+
+def get_file_hash(path: str) -> str:
+    file_hash = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def get_output_path(cvsx_path: str, output_dir: str) -> str:
+    name, _ = os.path.splitext(os.path.basename(cvsx_path))
+    return os.path.abspath(os.path.join(output_dir, f"{name}.mvsx"))
+
+
+def load_manifest(manifest_path: str, options: str) -> MVSXBatchManifest:
+    if not os.path.exists(manifest_path):
+        return MVSXBatchManifest(options=options)
+    with open(manifest_path) as f:
+        manifest = MVSXBatchManifest.model_validate_json(f.read())
+    if manifest.options != options:
+        # nothing converted with other options is reused
+        return MVSXBatchManifest(options=options)
+    return manifest
+
+
+def save_manifest(manifest: MVSXBatchManifest, manifest_path: str) -> None:
+    # replaced in one step, so an interrupted batch keeps a valid manifest
+    directory = os.path.dirname(os.path.abspath(manifest_path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        f.write(manifest.model_dump_json(indent=2))
+    os.replace(temp_path, manifest_path)
+
+
+def is_converted(entry: MVSXBatchEntry | None, cvsx_path: str) -> bool:
+    if entry is None or entry.status != "done":
+        return False
+    if not os.path.exists(entry.output_path):
+        return False
+    stat = os.stat(cvsx_path)
+    return entry.cvsx_bytes == stat.st_size and entry.cvsx_mtime == stat.st_mtime
+
+
+def convert_entry(
+    entry: MVSXBatchEntry,
+    options: str,
+    scratch_dir: str | None = None,
+    cache: ResultCache | None = None,
+) -> MVSXBatchEntry:
+    # runs in a worker process
+    start_time = time.perf_counter()
+    conversion_options = MVSXConversionOptions.model_validate_json(options)
+    try:
+        cache_hit = None
+        if cache is None:
+            convert_cvsx_to_mvsx(
+                entry.cvsx_path,
+                conversion_options,
+                output_path=entry.output_path,
+                scratch_dir=scratch_dir,
+            )
+        else:
+            cache_hit = (
+                cache.get(get_cache_key(entry.cvsx_path, conversion_options))
+                is not None
+            )
+            convert_cvsx_to_mvsx_cached(
+                entry.cvsx_path,
+                cache,
+                conversion_options,
+                scratch_dir,
+                output_path=entry.output_path,
+            )
+        return entry.model_copy(
+            update={
+                "status": "done",
+                "seconds": time.perf_counter() - start_time,
+                "output_hash": get_file_hash(entry.output_path),
+                "cache_hit": cache_hit,
+                "error": None,
+            }
+        )
+    except Exception:
+        return entry.model_copy(
+            update={
+                "status": "failed",
+                "seconds": time.perf_counter() - start_time,
+                "output_hash": None,
+                "error": traceback.format_exc(),
+            }
+        )
+
+
+def plan_entry(
+    cvsx_path: str,
+    options: MVSXConversionOptions,
+    cost_model: MVSXCostModel,
+) -> MVSXPlan | str:
+    # the traceback if the entry cannot be planned, its conversion would
+    # fail as well
+    try:
+        return plan_conversion(cvsx_path, options, cost_model)
+    except Exception:
+        return traceback.format_exc()
+
+
+def print_plans(plans: dict[str, MVSXPlan | str]) -> None:
+    print(f"{'seconds':>9} {'peak MiB':>9} {'output MiB':>10} entry")
+    for cvsx_path, plan in plans.items():
+        if isinstance(plan, str):
+            print(f"{'failed':>9} {'':>9} {'':>10} {cvsx_path}")
+            continue
+        print(
+            f"{plan.seconds:9.1f} {plan.peak_memory_bytes / 2**20:9.1f} "
+            f"{plan.output_bytes / 2**20:10.2f} {cvsx_path}"
+        )
+    planned = [plan for plan in plans.values() if not isinstance(plan, str)]
+    print(
+        f"{sum(plan.seconds for plan in planned):9.1f} "
+        f"{max((plan.peak_memory_bytes for plan in planned), default=0) / 2**20:9.1f} "
+        f"{sum(plan.output_bytes for plan in planned) / 2**20:10.2f} "
+        f"total of {len(planned)} entries, largest peak memory"
+    )
+
+
+def plan_batch(
+    inputs: list[str],
+    manifest_path: str,
+    options: MVSXConversionOptions,
+    cost_model: MVSXCostModel = DEFAULT_COST_MODEL,
+) -> dict[str, MVSXPlan | str]:
+    # plans the entries run_batch would convert, without writing anything
+    manifest = load_manifest(manifest_path, options.model_dump_json())
+    return {
+        cvsx_path: plan_entry(cvsx_path, options, cost_model)
+        for cvsx_path in find_cvsx_files(inputs)
+        if not is_converted(manifest.entries.get(cvsx_path), cvsx_path)
+    }
+
+
+def run_batch(
+    inputs: list[str],
+    output_dir: str,
+    manifest_path: str,
+    options: MVSXConversionOptions,
+    workers: int | None = None,
+    scratch_dir: str | None = None,
+    cache: ResultCache | None = None,
+    memory_bytes: int | None = None,
+    cost_model: MVSXCostModel = DEFAULT_COST_MODEL,
+) -> MVSXBatchManifest:
+    # with memory_bytes, entries start only while the predicted peak memory
+    # of the running ones stays within it
+    os.makedirs(output_dir, exist_ok=True)
+    options_json = options.model_dump_json()
+    manifest = load_manifest(manifest_path, options_json)
+
+    cvsx_paths = find_cvsx_files(inputs)
+    output_paths: dict[str, str] = {}
+    for cvsx_path in cvsx_paths:
+        output_path = get_output_path(cvsx_path, output_dir)
+        if output_path in output_paths:
+            raise ValueError(
+                f"{cvsx_path} and {output_paths[output_path]} would both be "
+                f"converted to {output_path}"
+            )
+        output_paths[output_path] = cvsx_path
+
+    pending: list[MVSXBatchEntry] = []
+    for cvsx_path in cvsx_paths:
+        if is_converted(manifest.entries.get(cvsx_path), cvsx_path):
+            continue
+        stat = os.stat(cvsx_path)
+        entry = MVSXBatchEntry(
+            cvsx_path=cvsx_path,
+            cvsx_bytes=stat.st_size,
+            cvsx_mtime=stat.st_mtime,
+            output_path=get_output_path(cvsx_path, output_dir),
+        )
+        manifest.entries[cvsx_path] = entry
+        pending.append(entry)
+
+    admission = None
+    plans: dict[str, MVSXPlan] = {}
+    if memory_bytes is not None:
+        admission = MemoryAdmission(memory_bytes)
+        for entry in list(pending):
+            plan = plan_entry(entry.cvsx_path, options, cost_model)
+            if isinstance(plan, str):
+                manifest.entries[entry.cvsx_path] = entry.model_copy(
+                    update={"status": "failed", "error": plan}
+                )
+                pending.remove(entry)
+                print(f"{'failed':<7} {0:8.1f} s {entry.cvsx_path}")
+            else:
+                plans[entry.cvsx_path] = plan
+    save_manifest(manifest, manifest_path)
+
+    # the longest entries first, so they do not start last and keep a
+    # single worker busy after the others are done. By predicted time if
+    # planned, by size otherwise
+    if plans:
+        pending.sort(key=lambda entry: plans[entry.cvsx_path].seconds, reverse=True)
+    else:
+        pending.sort(key=lambda entry: entry.cvsx_bytes, reverse=True)
+    print(f"{len(pending)} of {len(manifest.entries)} entries to convert")
+
+    # without admission every entry is submitted at once. With it, no more
+    # than one per worker, so only running entries hold admitted memory
+    max_running = len(pending)
+    if admission is not None:
+        max_running = workers or os.cpu_count() or 1
+
+    with ProcessPoolExecutor(workers) as executor:
+        futures: dict[Future, MVSXBatchEntry] = {}
+        while pending or futures:
+            for entry in list(pending):
+                if len(futures) >= max_running:
+                    break
+                if admission is not None and not admission.try_admit(
+                    plans[entry.cvsx_path]
+                ):
+                    continue
+                future = executor.submit(
+                    convert_entry, entry, options_json, scratch_dir, cache
+                )
+                futures[future] = entry
+                pending.remove(entry)
+
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                entry = futures.pop(future)
+                if admission is not None:
+                    admission.release(plans[entry.cvsx_path])
+                try:
+                    result = future.result()
+                except Exception:
+                    # the worker process died
+                    result = entry.model_copy(
+                        update={"status": "failed", "error": traceback.format_exc()}
+                    )
+                manifest.entries[result.cvsx_path] = result
+                save_manifest(manifest, manifest_path)
+                print(
+                    f"{result.status:<7} {result.seconds or 0:8.1f} s "
+                    f"{result.cvsx_path}"
+                )
+
+    return manifest
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Convert CVSX entries to MVSX")
+    parser.add_argument("inputs", nargs="+", help="CVSX files, globs or directories")
+    parser.add_argument("--output-dir", default="output")
+    parser.add_argument(
+        "--manifest",
+        help="progress of the batch, defaults to manifest.json in the output dir",
+    )
+    parser.add_argument("--workers", type=int, help="defaults to the CPU count")
+    parser.add_argument(
+        "--scratch-dir",
+        help="for intermediate files, defaults to the system temporary directory",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="reuse MVSX archives of CVSX entries converted before",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=float,
+        default=10,
+        help="in GiB, least recently used archives are evicted beyond it",
+    )
+    parser.add_argument(
+        "--options",
+        default="{}",
+        help="MVSXConversionOptions as JSON",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="print the predicted time, peak memory and output size, convert nothing",
+    )
+    parser.add_argument(
+        "--memory-limit",
+        type=float,
+        help="in GiB, start entries only while their predicted peak memory fits",
+    )
+    parser.add_argument(
+        "--cost-model",
+        help="MVSXCostModel JSON fitted by benchmarks/planner.py",
+    )
+    # comma separated, replace the selection of --options
+    for flag, name in SELECTION_FLAGS.items():
+        parser.add_argument(flag, dest=name, help=f"convert only these {name}")
+    args = parser.parse_args()
+
+    options = MVSXConversionOptions.model_validate_json(args.options)
+    selection = {
+        name: getattr(args, name).split(",")
+        for name in SELECTION_FLAGS.values()
+        if getattr(args, name) is not None
+    }
+    if selection:
+        options = options.model_copy(
+            update={"selection": ConversionSelection.model_validate(selection)}
+        )
+
+    cost_model = DEFAULT_COST_MODEL
+    if args.cost_model is not None:
+        cost_model = load_cost_model(args.cost_model)
+    manifest_path = args.manifest or os.path.join(args.output_dir, "manifest.json")
+
+    if args.dry_run:
+        print_plans(plan_batch(args.inputs, manifest_path, options, cost_model))
+        return
+
+    memory_bytes = None
+    if args.memory_limit is not None:
+        memory_bytes = int(args.memory_limit * 2**30)
+
+    cache = None
+    if args.cache_dir is not None:
+        cache = ResultCache(args.cache_dir, int(args.cache_size * 2**30))
+
+    manifest = run_batch(
+        args.inputs,
+        args.output_dir,
+        manifest_path,
+        options,
+        args.workers,
+        args.scratch_dir,
+        cache,
+        memory_bytes,
+        cost_model,
+    )
+    failed = [e for e in manifest.entries.values() if e.status == "failed"]
+    if failed:
+        raise SystemExit(f"{len(failed)} entries failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Time and peak memory of writing an MVSJ with large meshes, through the
+builder (model_dump_json) and through the streaming MVSJWriter. Every mode
+runs in its own process, so peak RSS is not shared.
+
+    python -m benchmarks.mvsj_writer [num_segments] [vertices_per_segment]
+"""
+
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from molviewspec.builder import GlobalMetadata, States
+
+from main import create_index_snapshot, write_index_snapshot
+from src.io.mvsj.writer import MVSJWriter
+from src.models.mvsx.mvsx_options import MVSXConversionOptions
+from src.models.mvsx.mvsx_segmentation import MVSXMeshSegmentation
+
+MODES = {
+    "builder": MVSXConversionOptions(),
+    "builder-compact": MVSXConversionOptions(compact_mvsj=True),
+    "stream": MVSXConversionOptions(stream_mvsj=True),
+    "stream-compact": MVSXConversionOptions(stream_mvsj=True, compact_mvsj=True),
+}
+
+
+def random_segmentations(
+    num_segments: int,
+    vertices_per_segment: int,
+    seed: int = 0,
+) -> list[MVSXMeshSegmentation]:
+    rng = np.random.default_rng(seed)
+    segmentations = []
+    for segment_id in range(1, num_segments + 1):
+        num_triangles = 2 * vertices_per_segment
+        segmentations.append(
+            MVSXMeshSegmentation(
+                source_filepath=f"mesh_{segment_id}.bcif",
+                destination_filepath=f"segmentations/mesh_{segment_id}.mvsj",
+                timeframe_id=0,
+                segmentation_id="0",
+                segment_id=segment_id,
+                color="#ff0000",
+                descriptions=[],
+                vertices=(rng.random(vertices_per_segment * 3) * 1000).astype(
+                    np.float32
+                ),
+                indices=rng.integers(
+                    0, vertices_per_segment, num_triangles * 3, dtype=np.int32
+                ),
+                triangle_groups=np.zeros(num_triangles, dtype=np.int32),
+            )
+        )
+    return segmentations
+
+
+def get_peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_mode(mode: str, num_segments: int, vertices_per_segment: int, path: str):
+    options = MODES[mode]
+    segmentations = random_segmentations(num_segments, vertices_per_segment)
+    input_rss = get_peak_rss_mb()
+    indent = None if options.compact_mvsj else 2
+
+    start_time = time.perf_counter()
+    if options.stream_mvsj:
+        with open(path, "w") as f:
+            writer = MVSJWriter(f, indent=indent)
+            writer.begin_states(GlobalMetadata())
+            write_index_snapshot(writer, [], segmentations, options)
+            writer.end_states()
+    else:
+        snapshot = create_index_snapshot([], segmentations, options)
+        states = States(metadata=GlobalMetadata(), snapshots=[snapshot])
+        with open(path, "w") as f:
+            f.write(states.model_dump_json(indent=indent, exclude_none=True))
+    elapsed = time.perf_counter() - start_time
+
+    print(
+        f"{mode:<18} {elapsed:8.2f} s {get_peak_rss_mb() - input_rss:10.0f} MB "
+        f"{os.path.getsize(path) / 2**20:10.1f} MB"
+    )
+
+    # the output has to stay readable by molviewspec, checked after the
+    # measurement as peak RSS is inherited by child processes
+    with open(path) as f:
+        States.model_validate_json(f.read())
+
+
+def main(num_segments: int, vertices_per_segment: int) -> None:
+    print(f"segments: {num_segments}, vertices per segment: {vertices_per_segment}")
+    print(f"{'mode':<18} {'time':>10} {'peak RSS':>13} {'file':>13}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for mode in MODES:
+            path = os.path.join(tmp_dir, f"{mode}.mvsj")
+            subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "benchmarks.mvsj_writer",
+                    str(num_segments),
+                    str(vertices_per_segment),
+                    mode,
+                    path,
+                ],
+                check=True,
+            )
+
+
+if __name__ == "__main__":
+    num_segments = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    vertices_per_segment = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    if len(sys.argv) > 4:
+        run_mode(sys.argv[3], num_segments, vertices_per_segment, sys.argv[4])
+    else:
+        main(num_segments, vertices_per_segment)
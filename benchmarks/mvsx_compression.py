@@ -0,0 +1,80 @@
+"""
+CPU time and archive size of the MVSX compression modes on a volume-heavy
+asset set: noisy float32 maps as BCIF-like members and a JSON state.
+
+    python -m benchmarks.mvsx_compression [num_volumes] [grid_size]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from src.io.mvsx.archive import write_mvsx
+
+MODES = ["deflate", "auto", "probe", "store"]
+
+
+def write_assets(asset_dir: str, num_volumes: int, grid_size: int) -> list[str]:
+    rng = np.random.default_rng(0)
+    uris = []
+    for i in range(num_volumes):
+        # cryo-EM like: gaussian noise around a weak signal
+        values = rng.normal(size=(grid_size,) * 3).astype(np.float32)
+        values += np.linspace(0, 1, grid_size, dtype=np.float32)
+        uri = f"volumes/volume_{i}.bcif"
+        os.makedirs(os.path.join(asset_dir, "volumes"), exist_ok=True)
+        with open(os.path.join(asset_dir, uri), "wb") as f:
+            f.write(values.tobytes())
+        uris.append(uri)
+    return uris
+
+
+def write_state(mvsj_path: str, uris: list[str]) -> None:
+    nodes = [
+        {"kind": "download", "params": {"url": uri}, "children": []} for uri in uris
+    ]
+    mesh = {
+        "kind": "primitive",
+        "params": {
+            "kind": "mesh",
+            "vertices": np.round(
+                np.random.default_rng(0).random(300_000) * 500, 2
+            ).tolist(),
+        },
+    }
+    with open(mvsj_path, "w") as f:
+        json.dump({"kind": "single", "root": {"children": [*nodes, mesh]}}, f)
+
+
+def main(num_volumes: int, grid_size: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        uris = write_assets(tmp_dir, num_volumes, grid_size)
+        mvsj_path = os.path.join(tmp_dir, "index.mvsj")
+        write_state(mvsj_path, uris)
+        input_size = sum(
+            os.path.getsize(os.path.join(tmp_dir, uri)) for uri in uris
+        ) + os.path.getsize(mvsj_path)
+
+        print(
+            f"volumes: {num_volumes} x {grid_size}^3, "
+            f"input: {input_size / 2**20:.1f} MB"
+        )
+        print(f"{'mode':<10} {'CPU s':>8} {'archive MB':>12}")
+        for mode in MODES:
+            output_path = os.path.join(tmp_dir, f"{mode}.mvsx")
+            start_time = time.process_time()
+            write_mvsx(output_path, mvsj_path, tmp_dir, uris, compression=mode)
+            elapsed = time.process_time() - start_time
+            size = os.path.getsize(output_path) / 2**20
+            print(f"{mode:<10} {elapsed:8.2f} {size:12.1f}")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 4,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 192,
+    )
@@ -0,0 +1,136 @@
+"""
+Fits the cost model of the dry-run planner: converts CVSX entries with a
+few option sets, every conversion in its own process so peak RSS is not
+shared, and fits non-negative coefficients of the plan features to the
+time, peak memory and output size. Prints the predictions next to the
+measurements and writes the MVSXCostModel JSON for batch.py --cost-model.
+
+    python -m benchmarks.planner cost_model.json data/cvsx/zipped/*.cvsx
+"""
+
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from scipy.optimize import nnls
+
+from main import convert_cvsx_to_mvsx
+from src.models.mvsx.mvsx_options import MVSXConversionOptions
+from src.models.mvsx.mvsx_plan import MVSXCostModel
+from src.plan import FEATURES, plan_conversion
+
+MODES = {
+    "first": MVSXConversionOptions(),
+    "all": MVSXConversionOptions(all_timeframes=True),
+    "all-incremental": MVSXConversionOptions(
+        all_timeframes=True, incremental_segments=True, stream_mvsj=True
+    ),
+    "pyramid": MVSXConversionOptions(volume_pyramid=True),
+    "bits-8": MVSXConversionOptions(volume_bits=8),
+    "bits-16": MVSXConversionOptions(volume_bits=16),
+    "crop": MVSXConversionOptions(crop_to_segmentations=True),
+    "slices": MVSXConversionOptions(volume_slices="center"),
+}
+TARGETS = ["seconds", "peak_memory_bytes", "output_bytes"]
+
+
+def run_mode(cvsx_path: str, mode: str) -> None:
+    # runs in a subprocess, prints its measurements as JSON
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_path = os.path.join(temp_dir, "entry.mvsx")
+        start_time = time.perf_counter()
+        convert_cvsx_to_mvsx(cvsx_path, MODES[mode], output_path=output_path)
+        seconds = time.perf_counter() - start_time
+        output_bytes = os.path.getsize(output_path)
+    # in KiB on Linux
+    peak_memory_bytes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    print(
+        json.dumps(
+            {
+                "seconds": seconds,
+                "peak_memory_bytes": peak_memory_bytes,
+                "output_bytes": output_bytes,
+            }
+        )
+    )
+
+
+def measure(cvsx_path: str, mode: str) -> dict[str, float] | None:
+    # None if the conversion failed, e.g. killed out of memory
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.planner", "--run", cvsx_path, mode],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        print(f"{cvsx_path} {mode} failed with {result.returncode}, left out")
+        return None
+    # the converter prints progress before the measurements
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def fit(features: np.ndarray, values: np.ndarray) -> dict[str, float]:
+    # every feature column is scaled to unit norm, so large and small
+    # features weigh the same in the fit
+    norms = np.linalg.norm(features, axis=0)
+    norms[norms == 0] = 1
+    coefficients, _ = nnls(features / norms, values)
+    return {
+        name: float(value)
+        for name, value in zip(FEATURES, coefficients / norms)
+        if value > 0
+    }
+
+
+def main(model_path: str, cvsx_paths: list[str]) -> None:
+    rows = []
+    for cvsx_path in cvsx_paths:
+        for mode, options in MODES.items():
+            plan = plan_conversion(cvsx_path, options)
+            measured = measure(cvsx_path, mode)
+            if measured is not None:
+                rows.append((cvsx_path, mode, plan, measured))
+
+    features = np.array(
+        [[plan.features[name] for name in FEATURES] for *_, plan, _ in rows]
+    )
+    cost_model = MVSXCostModel(
+        **{
+            target: fit(features, np.array([measured[target] for *_, measured in rows]))
+            for target in TARGETS
+        }
+    )
+
+    refitted = [
+        (cvsx_path, mode, plan_conversion(cvsx_path, MODES[mode], cost_model), measured)
+        for cvsx_path, mode, _, measured in rows
+    ]
+    print(
+        f"{'entry':<24} {'mode':<16} {'seconds':>17} {'peak MiB':>17} "
+        f"{'output MiB':>17}"
+    )
+    for cvsx_path, mode, plan, measured in refitted:
+        print(
+            f"{os.path.basename(cvsx_path):<24} {mode:<16} "
+            f"{plan.seconds:8.2f}/{measured['seconds']:<8.2f} "
+            f"{plan.peak_memory_bytes / 2**20:8.1f}/"
+            f"{measured['peak_memory_bytes'] / 2**20:<8.1f} "
+            f"{plan.output_bytes / 2**20:8.2f}/{measured['output_bytes'] / 2**20:<8.2f}"
+        )
+    print("predicted/measured")
+
+    with open(model_path, "w") as f:
+        f.write(cost_model.model_dump_json(indent=2))
+    print(f"cost model written to {model_path}")
+
+
+if __name__ == "__main__":
+    if sys.argv[1] == "--run":
+        run_mode(sys.argv[2], sys.argv[3])
+    else:
+        main(sys.argv[1], sys.argv[2:])
@@ -0,0 +1,71 @@
+"""
+Microbenchmark of tapered cylinder (frustum) mesh generation.
+
+    python -m benchmarks.primitive_mesh [count]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from main import generate_cylinder_mesh
+from src.convert.primitive_mesh import choose_num_segments, generate_frustum_meshes
+
+
+def random_frustums(count: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    starts = rng.random((count, 3)) * 1000
+    ends = starts + rng.normal(size=(count, 3)) * 20
+    radii_bottom = rng.random(count) * 5
+    radii_top = rng.random(count) * 5
+    return starts, ends, radii_bottom, radii_top
+
+
+def bench_per_shape(frustums, sample: int) -> float:
+    starts, ends, radii_bottom, radii_top = frustums
+    start_time = time.perf_counter()
+    for i in range(sample):
+        generate_cylinder_mesh(
+            tuple(starts[i]),
+            tuple(ends[i]),
+            radii_bottom[i],
+            radii_top[i],
+        )
+    return time.perf_counter() - start_time
+
+
+def bench_batched(frustums) -> tuple[float, int]:
+    starts, ends, radii_bottom, radii_top = frustums
+    start_time = time.perf_counter()
+    num_segments = choose_num_segments(np.maximum(radii_bottom, radii_top))
+    num_triangles = 0
+    for n in np.unique(num_segments):
+        mask = num_segments == n
+        _, indices, _ = generate_frustum_meshes(
+            starts[mask],
+            ends[mask],
+            radii_bottom[mask],
+            radii_top[mask],
+            int(n),
+        )
+        num_triangles += len(indices)
+    return time.perf_counter() - start_time, num_triangles
+
+
+def main(count: int) -> None:
+    frustums = random_frustums(count)
+
+    sample = min(count, 2000)
+    per_shape = bench_per_shape(frustums, sample) * count / sample
+    batched, num_triangles = bench_batched(frustums)
+
+    print(f"frustums:            {count}")
+    print(f"triangles:           {num_triangles}")
+    print(f"per-shape (extrap.): {per_shape:.3f} s")
+    print(f"batched:             {batched:.3f} s")
+    print(f"speedup:             {per_shape / batched:.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
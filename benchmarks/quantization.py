@@ -0,0 +1,111 @@
+"""
+Size and accuracy of emitted geometry for coordinate precision policies:
+a marching cubes mesh of a blob on a voxel grid and instance transforms of
+randomly rotated boxes, written with MVSJWriter. Sizes are of the compact
+JSON and of the same JSON deflated as in the MVSX archive.
+
+    python -m benchmarks.quantization [voxel_size] [grid_size]
+"""
+
+import io
+import sys
+import zlib
+
+import numpy as np
+from skimage.measure import marching_cubes
+
+from src.convert.primitive_mesh import PYRAMID_VERTICES
+from src.convert.quantization import (
+    get_coordinate_decimals,
+    get_coordinate_step,
+    quantize,
+)
+from src.io.mvsj.writer import MVSJWriter
+from src.utils import axis_angle_to_rotation_matrices, compose_transform_matrices
+
+POLICIES = [
+    (None, "angstrom"),
+    (0.001, "angstrom"),
+    (0.01, "angstrom"),
+    (0.1, "angstrom"),
+    (0.1, "voxel"),
+    (0.25, "voxel"),
+    (0.5, "voxel"),
+]
+
+
+def blob_mesh(grid_size: int, voxel_size: float, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    x, y, z = np.mgrid[:grid_size, :grid_size, :grid_size] / grid_size - 0.5
+    r = np.sqrt(x**2 + y**2 + z**2)
+    field = r + 0.05 * rng.random(r.shape)
+    vertices, _, _, _ = marching_cubes(field, level=0.35)
+    return vertices * voxel_size
+
+
+def box_transforms(count: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    rotations = axis_angle_to_rotation_matrices(
+        rng.normal(size=(count, 3)),
+        rng.random(count) * np.pi,
+    )
+    return compose_transform_matrices(
+        rotations,
+        rng.random((count, 3)) * 20,
+        rng.random((count, 3)) * 500,
+    )
+
+
+def get_sizes(values: np.ndarray) -> tuple[int, int]:
+    sink = io.StringIO()
+    MVSJWriter(sink).write_node({"values": values})
+    data = sink.getvalue().encode()
+    return len(data), len(zlib.compress(data, 6))
+
+
+def get_instance_error(transforms: np.ndarray, quantized: np.ndarray) -> float:
+    # furthest moved vertex of the unit geometry
+    box_corners = np.array(np.meshgrid(*[[-0.5, 0.5]] * 3)).reshape(3, -1).T
+    corners = np.vstack((PYRAMID_VERTICES, box_corners))
+    points = np.c_[corners, np.ones(len(corners))]
+    moved = points @ (quantized - transforms).transpose(0, 2, 1)
+    return float(np.abs(moved[..., :3]).max())
+
+
+def main(voxel_size: float, grid_size: int) -> None:
+    vertices = blob_mesh(grid_size, voxel_size)
+    transforms = box_transforms(10_000)
+    print(f"voxel size: {voxel_size} Å, mesh vertices: {len(vertices)}")
+    print(
+        f"{'policy':<14} {'decimals':>8} {'mesh KB':>9} {'deflated':>9} "
+        f"{'max err Å':>10} {'inst KB':>9} {'deflated':>9} {'max err Å':>10}"
+    )
+
+    for precision, unit in POLICIES:
+        decimals = get_coordinate_decimals(
+            get_coordinate_step(precision, unit, np.full(3, voxel_size))
+        )
+        if decimals is None:
+            mesh, instances = vertices, transforms
+        else:
+            mesh = quantize(vertices, decimals)
+            instances = quantize(transforms, decimals)
+
+        mesh_size, mesh_deflated = get_sizes(mesh)
+        instances_size, instances_deflated = get_sizes(instances)
+
+        policy = "full" if precision is None else f"{precision} {unit[:3]}"
+        print(
+            f"{policy:<14} {str(decimals):>8} "
+            f"{mesh_size / 1024:9.0f} {mesh_deflated / 1024:9.0f} "
+            f"{np.abs(mesh - vertices).max():10.4f} "
+            f"{instances_size / 1024:9.0f} {instances_deflated / 1024:9.0f} "
+            f"{get_instance_error(transforms, instances):10.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main(
+        float(sys.argv[1]) if len(sys.argv) > 1 else 1.5,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 96,
+    )
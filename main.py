@@ -1,22 +1,88 @@
-from typing import Protocol, TypeVar
+import io
+import os
+import tempfile
+from typing import Any, Callable, Iterable, Iterator, Protocol, TypeVar
+from uuid import UUID, uuid4
 from zipfile import ZipFile
 
 import numpy as np
 from molviewspec import create_builder
-from molviewspec.builder import GlobalMetadata, Primitives, Root, Snapshot, States
-from molviewspec.mvsx_converter import mvsj_to_mvsx
+from molviewspec.builder import (
+    GlobalMetadata,
+    Primitives,
+    Root,
+    Snapshot,
+    SnapshotMetadata,
+    States,
+)
+from molviewspec.nodes import Node
 
-from src.convert.geometric import get_list_of_all_geometric_segmentations
+from src.convert.bounds import Bounds, get_segmentation_bounds, pad_bounds
+from src.convert.geometric import (
+    get_list_of_all_geometric_segmentation_sets,
+    get_list_of_all_geometric_segmentations,
+)
 from src.convert.lattice import get_list_of_all_lattice_segmentations
 from src.convert.mesh import get_list_of_all_mesh_segmentations
-from src.convert.volume import get_list_of_all_volumes
-from src.io.cvsx_loader import load_cvsx_entry
+from src.convert.pipeline import (
+    get_geometry_cache,
+    get_segmentation_members,
+    iter_member_segmentations,
+    iter_pipeline_segmentations,
+)
+from src.convert.primitive_mesh import (
+    PYRAMID_INDICES,
+    PYRAMID_VERTICES,
+    choose_num_segments,
+    generate_frustum_meshes,
+    generate_pyramid_meshes,
+)
+from src.convert.quantization import (
+    get_coordinate_decimals,
+    get_coordinate_step,
+    quantize_node,
+)
+from src.convert.selection import (
+    get_converted_timeframes,
+    select_segmentation_members,
+    select_timeframes,
+    select_volumes,
+)
+from src.convert.volume import (
+    crop_volume_cif,
+    get_entry_voxel_size,
+    get_list_of_all_volumes,
+    get_volume_cif,
+    get_volume_encoding_report,
+    get_volume_url,
+    iter_volume_pyramid,
+    slice_volume_cif,
+)
+from src.io.cif.write.volume import volume_to_bcif
+from src.io.cvsx_loader import index_timeframes, load_cvsx_entry
+from src.io.mvsj.writer import MVSJWriter
+from src.io.mvsx.archive import MVSXArchiveWriter, write_mvsx
+from src.io.mvsx.assets import AssetStore
+from src.io.mvsx.cache import ResultCache, copy_file, get_cache_key
+from src.models.cvsx.cvsx_annotations import DescriptionData
 from src.models.cvsx.cvsx_file import CVSXFile
+from src.models.cvsx.cvsx_index import (
+    CVSXSegmentationEntry,
+    CVSXTimeframeIndex,
+    CVSXVolumeEntry,
+)
+from src.models.cvsx.cvsx_query import SegmentationKind
+from src.models.mvsx.mvsx_entry import MVSXIndexSnapshot, MVSXTimeframeSnapshot
+from src.models.mvsx.mvsx_options import MVSXConversionOptions
+from src.models.mvsx.mvsx_report import MVSXAssetReport
 from src.models.mvsx.mvsx_segmentation import (
     MVSXBaseSegmentation,
     MVSXGeometricSegmentation,
+    MVSXGeometricSegmentationSet,
+    MVSXLatticeSegmentation,
     MVSXMeshSegmentation,
     MVSXSegmentation,
+    MVSXSegmentationMember,
 )
 from src.models.mvsx.mvsx_volume import MVSXVolume
 from src.models.read.geometric import (
@@ -27,6 +93,12 @@ from src.models.read.geometric import (
     SphereShape,
     Vector3,
 )
+from src.models.read.volume import VolumeCif
+from src.utils import (
+    axis_angle_to_rotation_matrices,
+    compose_transform_matrices,
+    matrices_to_flat_lists,
+)
 
 
 def axis_angle_to_rotation_matrix(axis: Vector3, angle: float) -> np.ndarray:
@@ -101,65 +173,24 @@ def generate_cylinder_mesh(
     end: Vector3,
     radius_bottom: float,
     radius_top: float,
-    num_segments: int = 32,
-) -> tuple[list[float], list[int]]:
-    start = np.array(start)
-    end = np.array(end)
-
-    direction = end - start
-    height = np.linalg.norm(direction)
-    direction = direction / height
-
-    vertices = []
-    indices = []
-
-    # Generate circle points for bottom and top
-    angles = np.linspace(0, 2 * np.pi, num_segments, endpoint=False)
-
-    # Find perpendicular vectors for circle generation
-    if abs(direction[2]) < 0.9:
-        perp1 = np.cross(direction, [0, 0, 1])
-    else:
-        perp1 = np.cross(direction, [1, 0, 0])
-    perp1 = perp1 / np.linalg.norm(perp1)
-    perp2 = np.cross(direction, perp1)
-
-    # Bottom circle vertices
-    for angle in angles:
-        x = start + (perp1 * np.cos(angle) + perp2 * np.sin(angle)) * radius_bottom
-        vertices.extend(x.tolist())
-
-    # Top circle vertices
-    for angle in angles:
-        x = end + (perp1 * np.cos(angle) + perp2 * np.sin(angle)) * radius_top
-        vertices.extend(x.tolist())
-
-    # Add center points for caps
-    bottom_center_idx = len(vertices) // 3
-    vertices.extend(start.tolist())
-    top_center_idx = len(vertices) // 3
-    vertices.extend(end.tolist())
-
-    # Create triangles for sides
-    for i in range(num_segments):
-        next_i = (i + 1) % num_segments
-        # Two triangles per segment
-        indices.extend([i, next_i, i + num_segments])
-        indices.extend([next_i, next_i + num_segments, i + num_segments])
-
-    # Bottom cap
-    for i in range(num_segments):
-        next_i = (i + 1) % num_segments
-        indices.extend([bottom_center_idx, next_i, i])
-
-    # Top cap
-    for i in range(num_segments):
-        next_i = (i + 1) % num_segments
-        indices.extend([top_center_idx, i + num_segments, next_i + num_segments])
-
-    triangle_groups = [0] * len(vertices)
+    num_segments: int | None = None,
+) -> tuple[list[float], list[int], list[int]]:
+    if num_segments is None:
+        num_segments = choose_num_segments(max(radius_bottom, radius_top))
+
+    vertices, indices, triangle_groups = generate_frustum_meshes(
+        np.array([start]),
+        np.array([end]),
+        np.array([radius_bottom]),
+        np.array([radius_top]),
+        num_segments,
+    )
 
-    return vertices, indices, triangle_groups
+    return (
+        vertices.ravel().tolist(),
+        indices.ravel().tolist(),
+        triangle_groups.tolist(),
+    )
 
 
 def add_cylinder_primitive(
@@ -222,58 +253,21 @@ def generate_pyramid_mesh(
     scaling: Vector3,
     rotation_axis: Vector3,
     rotation_angle: float,
-) -> tuple[list[float], list[int]]:
-    translation = np.array(translation)
-    scaling = np.array(scaling)
-
-    # Create rotation matrix
+) -> tuple[list[float], list[int], list[int]]:
     rotation_matrix = axis_angle_to_rotation_matrix(rotation_axis, rotation_angle)
-
-    # Define pyramid vertices (apex at top, square base at bottom)
-    base_verts = np.array(
-        [
-            [-0.5, -0.5, 0],
-            [0.5, -0.5, 0],
-            [0.5, 0.5, 0],
-            [-0.5, 0.5, 0],
-        ]
+    transform = compose_transform_matrices(
+        rotation_matrix[None],
+        np.array([scaling], dtype=np.float64),
+        np.array([translation], dtype=np.float64),
     )
-    apex = np.array([[0, 0, 1]])
-
-    # Apply scaling
-    pyramid_verts = np.vstack([base_verts, apex]) * scaling
-
-    # Apply rotation and translation
-    pyramid_verts = (rotation_matrix @ pyramid_verts.T).T + translation
-
-    # Create triangular faces with correct winding order (counter-clockwise from outside)
-    indices = [
-        # Base (2 triangles) - looking from below, counter-clockwise
-        0,
-        2,
-        1,
-        0,
-        3,
-        2,
-        # Sides (4 triangles) - looking from outside, counter-clockwise
-        0,
-        1,
-        4,
-        1,
-        2,
-        4,
-        2,
-        3,
-        4,
-        3,
-        0,
-        4,
-    ]
 
-    vertices = pyramid_verts.flatten().tolist()
-    triangle_groups = [0] * len(vertices)
+    vertices, indices, triangle_groups = generate_pyramid_meshes(transform)
 
-    return vertices, indices, triangle_groups
+    return (
+        vertices.ravel().tolist(),
+        indices.ravel().tolist(),
+        triangle_groups.tolist(),
+    )
 
 
 def add_pyramid_primitive(
@@ -348,102 +342,870 @@ def add_geometric_segmentation(builder: Root, segmentation: MVSXGeometricSegment
     return builder
 
 
-# structural typing
-class HasTimeframe(Protocol):
-    timeframe_id: int
+def get_instanced_tooltip(
+    segmentation_id: str,
+    descriptions: list[list[DescriptionData]],
+) -> str:
+    # a single tooltip is shared by all instances of a primitives node,
+    # so only keep what is common to the whole group
+    tooltip = f"{segmentation_id} | {len(descriptions)} segments"
+
+    names = {tuple(d.name for d in ds if d.name is not None) for ds in descriptions}
+    if len(names) == 1:
+        for name in names.pop():
+            tooltip += "\n\n"
+            tooltip += f"{name}"
+    return tooltip
 
 
-T = TypeVar("T", bound=HasTimeframe)
+def get_shape_transforms(
+    rotation_axes: np.ndarray,
+    rotation_radians: np.ndarray,
+    scalings: np.ndarray,
+    translations: np.ndarray,
+) -> np.ndarray:
+    rotations = axis_angle_to_rotation_matrices(rotation_axes, rotation_radians)
+    return compose_transform_matrices(rotations, scalings, translations)
+
 
+def get_segmentation_transforms(
+    segmentations: list[MVSXGeometricSegmentation],
+) -> np.ndarray:
+    shapes = [s.shape for s in segmentations]
+    return get_shape_transforms(
+        np.array([shape.rotation.axis for shape in shapes], dtype=np.float64),
+        np.array([shape.rotation.radians for shape in shapes], dtype=np.float64),
+        np.array([shape.scaling for shape in shapes], dtype=np.float64),
+        np.array([shape.translation for shape in shapes], dtype=np.float64),
+    )
+
+
+def add_instanced_shapes(
+    builder: Root,
+    kind: str,
+    transforms: np.ndarray,
+    color: str | None,
+    tooltip: str,
+    opacity: float | None,
+) -> None:
+    primitives_group = builder.primitives(
+        snapshot_key="",
+        opacity=opacity,
+        instances=matrices_to_flat_lists(transforms),
+    )
 
-def get_first_by_timeframe(items: list[T]) -> T | None:
-    if not items:
-        return None
+    if kind == "box":
+        # unit box, scaling is part of the instance transform
+        primitives_group.box(
+            face_color=color,
+            tooltip=tooltip,
+            center=(0, 0, 0),
+            extent=(0.5, 0.5, 0.5),
+            show_faces=True,
+        )
+    elif kind == "pyramid":
+        primitives_group.mesh(
+            color=color,
+            tooltip=tooltip,
+            vertices=PYRAMID_VERTICES.ravel().tolist(),
+            indices=PYRAMID_INDICES.ravel().tolist(),
+            triangle_groups=[0] * len(PYRAMID_INDICES),
+        )
+    else:
+        raise ValueError(f"Shape type '{kind}' cannot be instanced")
 
-    if not all(hasattr(item, "timeframe_id") for item in items):
-        raise TypeError("All items must have a 'timeframe_id' attribute")
 
-    return min(items, key=lambda item: item.timeframe_id)
+def add_merged_frustums(
+    primitives: Primitives,
+    starts: np.ndarray,
+    ends: np.ndarray,
+    radii_bottom: np.ndarray,
+    radii_top: np.ndarray,
+    segment_ids: np.ndarray,
+    group_colors: dict[int, str],
+    group_tooltips: dict[int, str],
+) -> None:
+    num_segments = choose_num_segments(np.maximum(radii_bottom, radii_top))
 
+    vertices = []
+    indices = []
+    triangle_groups = []
+    vertex_offset = 0
+    # one batch per template
+    for n in np.unique(num_segments):
+        mask = num_segments == n
+        batch_vertices, batch_indices, batch_groups = generate_frustum_meshes(
+            starts[mask],
+            ends[mask],
+            radii_bottom[mask],
+            radii_top[mask],
+            int(n),
+            group_ids=segment_ids[mask],
+        )
+        vertices.append(batch_vertices)
+        indices.append(batch_indices + vertex_offset)
+        triangle_groups.append(batch_groups)
+        vertex_offset += len(batch_vertices)
 
-def get_first_volume(volumes: list[MVSXVolume]) -> list[MVSXVolume]:
-    if not volumes:
-        return []
+    primitives.mesh(
+        vertices=np.concatenate(vertices).ravel().tolist(),
+        indices=np.concatenate(indices).ravel().tolist(),
+        triangle_groups=np.concatenate(triangle_groups).tolist(),
+        group_colors=group_colors,
+        group_tooltips=group_tooltips,
+    )
 
-    min_timeframe = min(v.timeframe_id for v in volumes)
-    earliest_volumes = [v for v in volumes if v.timeframe_id == min_timeframe]
 
-    channel_map = {}
-    for v in earliest_volumes:
-        if v.channel_id not in channel_map:
-            channel_map[v.channel_id] = v
+def add_batched_geometric_segmentation(
+    builder: Root,
+    segmentations: list[MVSXGeometricSegmentation],
+):
+    if not segmentations:
+        return builder
+
+    opacity = segmentations[0].opacity
+    primitives: Primitives | None = None
+
+    def get_primitives() -> Primitives:
+        # created on the first shape that is not instanced, so a group of
+        # only boxes and pyramids has no empty node
+        nonlocal primitives
+        if primitives is None:
+            primitives = builder.primitives(
+                snapshot_key="",
+                opacity=opacity,
+            )
+        return primitives
+
+    # boxes and pyramids share unit geometry, so they are instanced per color
+    instanced: dict[tuple[str, str | None], list[MVSXGeometricSegmentation]] = {}
+    # tapered cylinders are merged into a single mesh
+    frustums: list[MVSXGeometricSegmentation] = []
+
+    for segmentation in segmentations:
+        shape = segmentation.shape
+        color = segmentation.color
+
+        if shape.kind in ["box", "pyramid"]:
+            key = (shape.kind, color)
+            if key not in instanced:
+                instanced[key] = []
+            instanced[key].append(segmentation)
+            continue
+        if shape.kind == "cylinder" and not np.isclose(
+            shape.radius_bottom, shape.radius_top
+        ):
+            frustums.append(segmentation)
+            continue
+
+        tooltip = get_segmentation_tooltip(segmentation)
+        if shape.kind == "sphere":
+            add_sphere_primitive(get_primitives(), shape, color, tooltip)
+        elif shape.kind == "cylinder":
+            add_cylinder_primitive(get_primitives(), shape, color, tooltip)
+        elif shape.kind == "ellipsoid":
+            add_ellipsoid_primitive(get_primitives(), shape, color, tooltip)
         else:
-            print(
-                f"Duplicate channel_id '{v.channel_id}' for timeframe: {min_timeframe}"
+            raise ValueError(f"Unknown geometric primitives shape type: {shape.kind}")
+
+    for (kind, color), group in instanced.items():
+        add_instanced_shapes(
+            builder,
+            kind,
+            get_segmentation_transforms(group),
+            color,
+            get_instanced_tooltip(
+                group[0].segmentation_id,
+                [s.descriptions for s in group],
+            ),
+            opacity,
+        )
+
+    if frustums:
+        shapes = [s.shape for s in frustums]
+        add_merged_frustums(
+            get_primitives(),
+            np.array([shape.start for shape in shapes], dtype=np.float64),
+            np.array([shape.end for shape in shapes], dtype=np.float64),
+            np.array([shape.radius_bottom for shape in shapes], dtype=np.float64),
+            np.array([shape.radius_top for shape in shapes], dtype=np.float64),
+            np.array([s.segment_id for s in frustums], dtype=np.int32),
+            {s.segment_id: s.color for s in frustums if s.color},
+            {s.segment_id: get_segmentation_tooltip(s) for s in frustums},
+        )
+
+    return builder
+
+
+def group_indices(keys: list) -> dict:
+    groups: dict = {}
+    for i, key in enumerate(keys):
+        if key not in groups:
+            groups[key] = []
+        groups[key].append(i)
+    return {key: np.array(indices, dtype=np.int64) for key, indices in groups.items()}
+
+
+def add_geometric_segmentation_set(
+    builder: Root,
+    segmentation_set: MVSXGeometricSegmentationSet,
+):
+    shapes = segmentation_set.shapes
+    segmentation_id = segmentation_set.segmentation_id
+    colors = segmentation_set.colors
+    opacities = segmentation_set.opacities
+    descriptions = segmentation_set.descriptions
+
+    def get_tooltip(segment_id: int) -> str:
+        return get_segment_tooltip(
+            segmentation_id,
+            segment_id,
+            descriptions.get(segment_id, []),
+        )
+
+    def get_opacity_groups(ids: np.ndarray) -> dict[float | None, np.ndarray]:
+        return group_indices([opacities.get(i) for i in ids.tolist()])
+
+    # opacity is set on the primitives node, so there is one node per opacity
+    # of spheres, ellipsoids and cylinders. Boxes and pyramids are instanced
+    # in nodes of their own
+    all_opacities = [opacities.get(i) for i in shapes.segment_ids().tolist()]
+    primitive_ids = np.concatenate(
+        [shapes.sphere.id, shapes.ellipsoid.id, shapes.cylinder.id]
+    )
+    primitive_opacities = {opacities.get(i) for i in primitive_ids.tolist()}
+    nodes = {
+        opacity: builder.primitives(snapshot_key="", opacity=opacity)
+        for opacity in dict.fromkeys(all_opacities)
+        if opacity in primitive_opacities
+    }
+
+    sphere = shapes.sphere
+    for opacity, idx in get_opacity_groups(sphere.id).items():
+        for segment_id, center, radius in zip(
+            sphere.id[idx].tolist(),
+            sphere.center[idx].tolist(),
+            sphere.radius[idx].tolist(),
+        ):
+            nodes[opacity].sphere(
+                color=colors.get(segment_id),
+                tooltip=get_tooltip(segment_id),
+                center=center,
+                radius=radius,
             )
 
-    return list(channel_map.values())
+    ellipsoid = shapes.ellipsoid
+    for opacity, idx in get_opacity_groups(ellipsoid.id).items():
+        for segment_id, center, major, minor, radius in zip(
+            ellipsoid.id[idx].tolist(),
+            ellipsoid.center[idx].tolist(),
+            ellipsoid.dir_major[idx].tolist(),
+            ellipsoid.dir_minor[idx].tolist(),
+            ellipsoid.radius_scale[idx].tolist(),
+        ):
+            nodes[opacity].ellipsoid(
+                color=colors.get(segment_id),
+                tooltip=get_tooltip(segment_id),
+                center=center,
+                major_axis=major,
+                minor_axis=minor,
+                radius=radius,
+            )
 
+    cylinder = shapes.cylinder
+    uniform = np.isclose(cylinder.radius_bottom, cylinder.radius_top)
+    for opacity, idx in get_opacity_groups(cylinder.id).items():
+        tubes = idx[uniform[idx]]
+        for segment_id, start, end, radius in zip(
+            cylinder.id[tubes].tolist(),
+            cylinder.start[tubes].tolist(),
+            cylinder.end[tubes].tolist(),
+            cylinder.radius_bottom[tubes].tolist(),
+        ):
+            nodes[opacity].tube(
+                color=colors.get(segment_id),
+                tooltip=get_tooltip(segment_id),
+                start=start,
+                end=end,
+                radius=radius,
+            )
 
-def get_first_segmentation(
-    segmentations: list[MVSXSegmentation],
-) -> list[MVSXSegmentation]:
-    if not segmentations:
-        return []
+        frustums = idx[~uniform[idx]]
+        if len(frustums):
+            segment_ids = cylinder.id[frustums]
+            add_merged_frustums(
+                nodes[opacity],
+                cylinder.start[frustums],
+                cylinder.end[frustums],
+                cylinder.radius_bottom[frustums],
+                cylinder.radius_top[frustums],
+                segment_ids,
+                {i: colors[i] for i in segment_ids.tolist() if i in colors},
+                {i: get_tooltip(i) for i in segment_ids.tolist()},
+            )
 
-    min_timeframe = min(s.timeframe_id for s in segmentations)
-    earliest_segmentations = [
-        s for s in segmentations if s.timeframe_id == min_timeframe
+    for kind, columns in [("box", shapes.box), ("pyramid", shapes.pyramid)]:
+        for opacity, idx in get_opacity_groups(columns.id).items():
+            segment_ids = columns.id[idx]
+            color_groups = group_indices([colors.get(i) for i in segment_ids.tolist()])
+            for color, color_idx in color_groups.items():
+                instances = idx[color_idx]
+                add_instanced_shapes(
+                    builder,
+                    kind,
+                    get_shape_transforms(
+                        columns.rotation_axis[instances],
+                        columns.rotation_radians[instances],
+                        columns.scaling[instances],
+                        columns.translation[instances],
+                    ),
+                    color,
+                    get_instanced_tooltip(
+                        segmentation_id,
+                        [
+                            descriptions.get(i, [])
+                            for i in columns.id[instances].tolist()
+                        ],
+                    ),
+                    opacity,
+                )
+
+    return builder
+
+
+SnapshotSegmentation = (
+    MVSXSegmentation | MVSXGeometricSegmentationSet | MVSXSegmentationMember
+)
+SEGMENTATION_KINDS = ["mesh", "lattice", "primitive", "primitive_set"]
+
+
+# structural typing
+class HasSource(Protocol):
+    source_filepath: str
+
+
+T = TypeVar("T", bound=HasSource)
+
+# of the converted segmentation kinds
+CVSX_SEGMENTATION_KINDS: dict[str, SegmentationKind] = {
+    "mesh": "mesh",
+    "lattice": "lattice",
+    "primitive": "geometric-segmentation",
+    "primitive_set": "geometric-segmentation",
+}
+
+
+def get_converted_timeframe_index(
+    volumes: list[MVSXVolume],
+    segmentations: list[SnapshotSegmentation],
+) -> CVSXTimeframeIndex:
+    # the index of the CVSX members the volumes and segmentations were
+    # converted from, for snapshots assembled without the CVSX entry
+    volume_entries = {
+        volume.source_filepath: CVSXVolumeEntry(
+            source_filepath=volume.source_filepath,
+            channel_id=volume.channel_id,
+            timeframe_id=volume.timeframe_id,
+        )
+        for volume in volumes
+    }
+    segmentation_entries = {
+        segmentation.source_filepath: CVSXSegmentationEntry(
+            kind=CVSX_SEGMENTATION_KINDS[segmentation.kind],
+            source_filepath=segmentation.source_filepath,
+            segmentation_id=segmentation.segmentation_id,
+            timeframe_id=segmentation.timeframe_id,
+        )
+        for segmentation in segmentations
+    }
+    return index_timeframes(volume_entries.values(), segmentation_entries.values())
+
+
+def group_by_source(items: list[T]) -> dict[str, list[tuple[int, T]]]:
+    # with the position of every item, so snapshots keep the order of items
+    groups: dict[str, list[tuple[int, T]]] = {}
+    for position, item in enumerate(items):
+        if item.source_filepath not in groups:
+            groups[item.source_filepath] = []
+        groups[item.source_filepath].append((position, item))
+    return groups
+
+
+def get_entry_items(
+    entries: list[CVSXVolumeEntry] | list[CVSXSegmentationEntry],
+    items_by_source: dict[str, list[tuple[int, T]]],
+) -> list[tuple[int, T]]:
+    return [
+        item
+        for entry in entries
+        for item in items_by_source.get(entry.source_filepath, [])
     ]
 
-    return earliest_segmentations
 
+def sort_by_position(items: Iterable[tuple[int, T]]) -> list[T]:
+    return [item for _, item in sorted(items, key=lambda item: item[0])]
 
-def create_index_snapshot(
+
+def get_timeframe_snapshots(
     volumes: list[MVSXVolume],
-    segmentations: list[MVSXSegmentation],
-) -> Snapshot:
+    segmentations: list[SnapshotSegmentation],
+    timeframes: CVSXTimeframeIndex | None = None,
+) -> list[MVSXTimeframeSnapshot]:
+    if timeframes is None:
+        timeframes = get_converted_timeframe_index(volumes, segmentations)
+    volumes_by_source = group_by_source(volumes)
+    segmentations_by_source = group_by_source(segmentations)
+
+    # the latest volume of every channel and all segments of the latest
+    # timeframe of every segmentation, so channels and segmentations without
+    # data in later timeframes stay visible
+    channel_volumes: dict[str, MVSXVolume] = {}
+    latest_segmentations: dict[tuple[str, str], list] = {}
+    snapshots = []
+    for timeframe_id in sorted({*timeframes.volumes, *timeframes.segmentations}):
+        timeframe_volumes = timeframes.volumes.get(timeframe_id, {})
+        found_volumes = False
+        for channel_id, entries in timeframe_volumes.items():
+            for _, volume in get_entry_items(entries, volumes_by_source):
+                channel_volumes[channel_id] = volume
+                found_volumes = True
+
+        timeframe_segmentations: dict[tuple[str, str], list] = {}
+        for entries in timeframes.segmentations.get(timeframe_id, {}).values():
+            for item in get_entry_items(entries, segmentations_by_source):
+                _, segmentation = item
+                key = (segmentation.kind, segmentation.segmentation_id)
+                if key not in timeframe_segmentations:
+                    timeframe_segmentations[key] = []
+                timeframe_segmentations[key].append(item)
+        latest_segmentations.update(timeframe_segmentations)
+
+        if not found_volumes and not timeframe_segmentations:
+            continue
+        snapshots.append(
+            MVSXTimeframeSnapshot(
+                key=f"timeframe_{timeframe_id}",
+                title=f"Timeframe {timeframe_id}",
+                timeframe_id=timeframe_id,
+                volumes=list(channel_volumes.values()),
+                segmentations=sort_by_position(
+                    item for items in latest_segmentations.values() for item in items
+                ),
+            )
+        )
+    return snapshots
+
+
+def get_first_timeframe_snapshot(
+    volumes: list[MVSXVolume],
+    segmentations: list[SnapshotSegmentation],
+    timeframes: CVSXTimeframeIndex | None = None,
+) -> MVSXTimeframeSnapshot:
+    if timeframes is None:
+        timeframes = get_converted_timeframe_index(volumes, segmentations)
+    volumes_by_source = group_by_source(volumes)
+    segmentations_by_source = group_by_source(segmentations)
+
+    # the first timeframe of the volumes and of the segmentations
+    volume_timeframe_id = next(iter(timeframes.volumes), None)
+    segmentation_timeframe_id = next(iter(timeframes.segmentations), None)
+    timeframe_ids = [volume_timeframe_id, segmentation_timeframe_id]
+    timeframe_id = min((t for t in timeframe_ids if t is not None), default=0)
+
+    channel_volumes: dict[str, MVSXVolume] = {}
+    for channel_id, entries in timeframes.volumes.get(volume_timeframe_id, {}).items():
+        for _, volume in get_entry_items(entries, volumes_by_source):
+            if channel_id in channel_volumes:
+                print(
+                    f"Duplicate channel_id '{channel_id}' for timeframe: "
+                    f"{volume_timeframe_id}"
+                )
+                continue
+            channel_volumes[channel_id] = volume
+
+    first_segmentations = timeframes.segmentations.get(segmentation_timeframe_id, {})
+    return MVSXTimeframeSnapshot(
+        key=f"timeframe_{timeframe_id}",
+        title=f"Timeframe {timeframe_id}",
+        timeframe_id=timeframe_id,
+        volumes=list(channel_volumes.values()),
+        segmentations=sort_by_position(
+            item
+            for entries in first_segmentations.values()
+            for item in get_entry_items(entries, segmentations_by_source)
+        ),
+    )
+
+
+def write_volume_cif(
+    cvsx_file: CVSXFile,
+    volume: MVSXVolume,
+    volume_cif: VolumeCif,
+    assets: AssetStore,
+    num_bits: int | None = None,
+) -> None:
+    data = volume_to_bcif(volume_cif, num_bits)
+    volume.destination_filepath = assets.write_file(
+        io.BytesIO(data), volume.destination_filepath
+    )
+    if num_bits is not None:
+        assets.report.volume_encodings.append(
+            get_volume_encoding_report(
+                cvsx_file, volume, volume_cif, num_bits, len(data)
+            )
+        )
+
+
+def write_volumes(
+    cvsx_file: CVSXFile,
+    volumes: list[MVSXVolume],
+    assets: AssetStore,
+    options: MVSXConversionOptions,
+    crop_bounds: Bounds | None = None,
+) -> dict[UUID, list[MVSXVolume]]:
+    """
+    Writes the volumes and, with options.volume_pyramid, their downsampled
+    levels. Returns the levels of every volume from coarse to fine, the
+    last one is the volume itself. Volumes are copied from the CVSX as they
+    are, or referenced in place with options.volume_url_template, unless
+    they are cropped, sliced or re-encoded.
+    """
+    modified = (
+        crop_bounds is not None
+        or options.volume_slices is not None
+        or options.volume_bits is not None
+    )
+    pyramids: dict[UUID, list[MVSXVolume]] = {}
+    with ZipFile(cvsx_file.filepath, "r") as zip_ref:
+        for volume in volumes:
+            levels = [volume]
+            pyramids[volume.id] = levels
+
+            volume_cif = None
+            if modified or options.volume_pyramid:
+                volume_cif = get_volume_cif(cvsx_file.filepath, volume.source_filepath)
+                if crop_bounds is not None:
+                    volume_cif = crop_volume_cif(volume_cif, crop_bounds)
+                if options.volume_slices is not None:
+                    volume_cif = slice_volume_cif(volume_cif, options.volume_slices)
+
+            # levels before the volume itself, their filepaths are derived
+            # from its destination filepath
+            if options.volume_pyramid:
+                for level, level_cif in iter_volume_pyramid(
+                    cvsx_file, volume, volume_cif
+                ):
+                    write_volume_cif(
+                        cvsx_file, level, level_cif, assets, options.volume_bits
+                    )
+                    levels.insert(0, level)
+
+            if modified:
+                write_volume_cif(
+                    cvsx_file, volume, volume_cif, assets, options.volume_bits
+                )
+            elif options.volume_url_template is not None:
+                volume.destination_filepath = get_volume_url(
+                    options.volume_url_template, cvsx_file, volume
+                )
+            else:
+                with zip_ref.open(volume.source_filepath) as f:
+                    volume.destination_filepath = assets.write_file(
+                        f, volume.destination_filepath
+                    )
+    return pyramids
+
+
+def get_pyramid_snapshots(
+    timeframe_snapshots: list[MVSXTimeframeSnapshot],
+    pyramids: dict[UUID, list[MVSXVolume]],
+) -> list[MVSXTimeframeSnapshot]:
+    # the timeframe snapshots load the coarsest level, so the first view is
+    # quick. Snapshots of the finer levels follow after all timeframes
+    num_levels = max((len(levels) for levels in pyramids.values()), default=1)
+    snapshots = []
+    for level in range(num_levels):
+        finer_levels = num_levels - 1 - level
+        for timeframe_snapshot in timeframe_snapshots:
+            if level > 0 and not timeframe_snapshot.volumes:
+                continue
+
+            volumes = []
+            for volume in timeframe_snapshot.volumes:
+                levels = pyramids.get(volume.id, [volume])
+                volumes.append(levels[max(0, len(levels) - 1 - finer_levels)])
+            if level == 0:
+                snapshots.append(
+                    timeframe_snapshot.model_copy(update={"volumes": volumes})
+                )
+                continue
+
+            sample_rate = volumes[0].sample_rate
+            if sample_rate is None:
+                sampling = "full resolution"
+            else:
+                sampling = f"sample rate {sample_rate}"
+            snapshots.append(
+                timeframe_snapshot.model_copy(
+                    update={
+                        "key": f"{timeframe_snapshot.key}_level_{level}",
+                        "title": f"{timeframe_snapshot.title} ({sampling})",
+                        "volumes": volumes,
+                    }
+                )
+            )
+    return snapshots
+
+
+def get_index_snapshot(
+    cvsx_file: CVSXFile,
+    timeframe_snapshots: list[MVSXTimeframeSnapshot],
+) -> MVSXIndexSnapshot:
+    return MVSXIndexSnapshot(
+        key="index",
+        title=cvsx_file.annotations.name,
+        timeframe_keys=[snapshot.key for snapshot in timeframe_snapshots],
+    )
+
+
+def build_nodes(add: Callable[..., Any], *args) -> list[Node]:
     builder = create_builder()
+    add(builder, *args)
+    return builder.get_node().children or []
+
+
+def iter_segmentations_of_kinds(
+    segmentations: list[SnapshotSegmentation],
+    kinds: list[str],
+    options: MVSXConversionOptions,
+    cvsx_file: CVSXFile | None = None,
+) -> Iterator[MVSXSegmentation]:
+    # members planned into the snapshot are converted now, one segment at a
+    # time, and converted segmentations are passed through
+    members = [
+        s
+        for s in segmentations
+        if isinstance(s, MVSXSegmentationMember) and s.kind in kinds
+    ]
+    if members:
+        if cvsx_file is None:
+            raise ValueError("Converting segmentation members needs the CVSX file")
+        yield from iter_member_segmentations(cvsx_file, members, options)
+    for segmentation in segmentations:
+        if isinstance(segmentation, MVSXSegmentationMember):
+            continue
+        if segmentation.kind in kinds:
+            yield segmentation
 
-    first_volumes = get_first_volume(volumes)
-    frist_segmentations = get_first_segmentation(segmentations)
 
-    for volume in first_volumes:
-        add_volume(builder, volume)
-    for segmentation in frist_segmentations:
-        add_segmentation(builder, segmentation)
+def iter_scene_nodes(
+    volumes: list[MVSXVolume],
+    segmentations: list[SnapshotSegmentation],
+    options: MVSXConversionOptions,
+    numpy_arrays: bool = False,
+    cvsx_file: CVSXFile | None = None,
+) -> Iterator[tuple[Node | dict, str | None]]:
+    # every part of the scene is built on its own, so it can be written out
+    # and released before the next one is built. With numpy_arrays, mesh
+    # nodes are dicts holding the numpy arrays (see MVSJWriter). Mesh nodes
+    # come with the destination filepath of their asset
+    for volume in volumes:
+        for node in build_nodes(add_volume, volume):
+            yield node, None
+
+    kinds = ["mesh", "lattice", "primitive"]
+    if options.merge_segments:
+        # every group is merged as a whole
+        mesh_segmentations = list(
+            iter_segmentations_of_kinds(
+                segmentations, ["mesh", "lattice"], options, cvsx_file
+            )
+        )
+        for group in group_segmentations(mesh_segmentations):
+            if numpy_arrays:
+                node = get_merged_mesh_segmentation_node(group)
+            else:
+                [node] = build_nodes(add_merged_mesh_segmentation, group)
+            yield node, get_merged_destination_filepath(group)
+        del mesh_segmentations
+        kinds = ["primitive"]
+
+    for segmentation_set in iter_segmentations_of_kinds(
+        segmentations, ["primitive_set"], options, cvsx_file
+    ):
+        for node in build_nodes(add_geometric_segmentation_set, segmentation_set):
+            yield node, None
+
+    if options.batch_primitives:
+        geometric_segmentations = list(
+            iter_segmentations_of_kinds(
+                segmentations, ["primitive"], options, cvsx_file
+            )
+        )
+        for group in group_segmentations(geometric_segmentations):
+            for node in build_nodes(add_batched_geometric_segmentation, group):
+                yield node, None
+        del geometric_segmentations
+        kinds = [kind for kind in kinds if kind != "primitive"]
+
+    for segmentation in iter_segmentations_of_kinds(
+        segmentations, kinds, options, cvsx_file
+    ):
+        if segmentation.kind in ["mesh", "lattice"]:
+            if numpy_arrays:
+                node = get_mesh_segmentation_node(segmentation)
+            else:
+                [node] = build_nodes(add_mesh_segmentation, segmentation)
+            yield node, segmentation.destination_filepath
+        else:
+            for node in build_nodes(add_segmentation, segmentation):
+                yield node, None
 
-    snapshot = builder.get_snapshot()
+
+def iter_snapshot_nodes(
+    volumes: list[MVSXVolume],
+    segmentations: list[SnapshotSegmentation],
+    options: MVSXConversionOptions,
+    output_dir: str = "temp",
+    voxel_size: np.ndarray | None = None,
+    assets: AssetStore | None = None,
+    numpy_arrays: bool = False,
+    cvsx_file: CVSXFile | None = None,
+) -> Iterator[Node | dict]:
+    decimals = get_coordinate_decimals(
+        get_coordinate_step(
+            options.coordinate_precision,
+            options.coordinate_unit,
+            voxel_size,
+        )
+    )
+
+    # mesh assets are written next to the MVSJ and referenced by uri
+    if assets is None:
+        assets = AssetStore(output_dir)
+
+    for node, destination_filepath in iter_scene_nodes(
+        volumes, segmentations, options, numpy_arrays, cvsx_file
+    ):
+        quantize_node(node, decimals)
+        if options.mesh_output == "uri" and destination_filepath is not None:
+            node = get_node_from_file(node, destination_filepath, assets)
+        yield node
+
+
+def create_snapshot(
+    timeframe_snapshot: MVSXTimeframeSnapshot,
+    options: MVSXConversionOptions | None = None,
+    output_dir: str = "temp",
+    voxel_size: np.ndarray | None = None,
+    assets: AssetStore | None = None,
+    cvsx_file: CVSXFile | None = None,
+) -> Snapshot:
+    options = options or MVSXConversionOptions()
+    builder = create_builder()
+
+    builder.get_node().children = list(
+        iter_snapshot_nodes(
+            timeframe_snapshot.volumes,
+            timeframe_snapshot.segmentations,
+            options,
+            output_dir,
+            voxel_size,
+            assets,
+            cvsx_file=cvsx_file,
+        )
+    )
+
+    snapshot = builder.get_snapshot(
+        key=timeframe_snapshot.key,
+        title=timeframe_snapshot.title,
+        description=timeframe_snapshot.description,
+    )
 
     return snapshot
 
 
-def create_segmentation_primitives_files(
-    mesh_segmentations: list[MVSXMeshSegmentation],
-    geometric_segmentations: list[MVSXGeometricSegmentation],
-):
-    for mesh in mesh_segmentations:
-        builder = create_builder()
-        add_mesh_segmentation(builder, mesh)
-        state = builder.get_state()
-        if state.root.children != 1:
-            raise ValueError("Expected state to contain exactly one child")
-        primitives_node = state.root.children[0]
-        if primitives_node.kind != "primitives":
-            raise ValueError("Expected primitives node")
-        with open(f"temp/{mesh.destination_filepath}", "w") as f:
-            f.write(mesh)
-
-    for geometric in geometric_segmentations:
-        add_geometric_segmentation(builder, geometric)
+def write_snapshot(
+    writer: MVSJWriter,
+    timeframe_snapshot: MVSXTimeframeSnapshot,
+    options: MVSXConversionOptions | None = None,
+    output_dir: str = "temp",
+    voxel_size: np.ndarray | None = None,
+    assets: AssetStore | None = None,
+    cvsx_file: CVSXFile | None = None,
+) -> None:
+    options = options or MVSXConversionOptions()
+
+    writer.begin_snapshot(
+        SnapshotMetadata(
+            key=timeframe_snapshot.key,
+            title=timeframe_snapshot.title,
+            description=timeframe_snapshot.description,
+            linger_duration_ms=1000,
+        )
+    )
+    for node in iter_snapshot_nodes(
+        timeframe_snapshot.volumes,
+        timeframe_snapshot.segmentations,
+        options,
+        output_dir,
+        voxel_size,
+        assets,
+        numpy_arrays=True,
+        cvsx_file=cvsx_file,
+    ):
+        writer.write_node(node)
+    writer.end_snapshot()
+
+
+def create_index_snapshot(
+    volumes: list[MVSXVolume],
+    segmentations: list[MVSXSegmentation],
+    options: MVSXConversionOptions | None = None,
+    output_dir: str = "temp",
+    voxel_size: np.ndarray | None = None,
+) -> Snapshot:
+    return create_snapshot(
+        get_first_timeframe_snapshot(volumes, segmentations),
+        options,
+        output_dir,
+        voxel_size,
+    )
+
+
+def write_index_snapshot(
+    writer: MVSJWriter,
+    volumes: list[MVSXVolume],
+    segmentations: list[MVSXSegmentation],
+    options: MVSXConversionOptions | None = None,
+    output_dir: str = "temp",
+    voxel_size: np.ndarray | None = None,
+) -> None:
+    write_snapshot(
+        writer,
+        get_first_timeframe_snapshot(volumes, segmentations),
+        options,
+        output_dir,
+        voxel_size,
+    )
 
 
 def get_segmentation_tooltip(segmentation: MVSXBaseSegmentation) -> str:
+    return get_segment_tooltip(
+        segmentation.segmentation_id,
+        segmentation.segment_id,
+        segmentation.descriptions,
+    )
+
+
+def get_segment_tooltip(
+    segmentation_id: str,
+    segment_id: int,
+    descriptions: list[DescriptionData],
+) -> str:
     tooltip = ""
-    segmentation_id = segmentation.segmentation_id
-    segment_id = segmentation.segment_id
     tooltip += f"{segmentation_id} | Segment {segment_id}"
-    for description in segmentation.descriptions:
+    for description in descriptions:
         if description.name is not None:
             tooltip += "\n\n"
             tooltip += f"{description.name}"
@@ -483,6 +1245,155 @@ def add_mesh_segmentation(builder: Root, segmentation: MVSXMeshSegmentation):
     return builder
 
 
+MeshLikeSegmentation = MVSXMeshSegmentation | MVSXLatticeSegmentation
+
+
+def group_segmentations(
+    segmentations: list[MVSXBaseSegmentation],
+) -> list[list[MVSXBaseSegmentation]]:
+    # opacity is a property of the whole primitives node, so segments
+    # with different opacities cannot share one
+    groups: dict[tuple, list[MVSXBaseSegmentation]] = {}
+    for segmentation in segmentations:
+        key = (
+            segmentation.kind,
+            segmentation.segmentation_id,
+            segmentation.timeframe_id,
+            segmentation.opacity,
+        )
+        if key not in groups:
+            groups[key] = []
+        groups[key].append(segmentation)
+    return list(groups.values())
+
+
+def merge_mesh_segmentations(
+    segmentations: list[MeshLikeSegmentation],
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    vertices = []
+    indices = []
+    triangle_groups = []
+
+    vertex_offset = 0
+    for segmentation in segmentations:
+        segment_vertices = segmentation.vertices.reshape(-1, 3)
+        segment_indices = segmentation.indices.reshape(-1, 3)
+
+        vertices.append(segment_vertices)
+        indices.append(segment_indices + vertex_offset)
+        # one group per segment, so colors and tooltips stay per segment
+        triangle_groups.append(
+            np.full(len(segment_indices), segmentation.segment_id, dtype=np.int32)
+        )
+
+        vertex_offset += len(segment_vertices)
+
+    return (
+        np.concatenate(vertices),
+        np.concatenate(indices),
+        np.concatenate(triangle_groups),
+    )
+
+
+def get_merged_destination_filepath(segmentations: list[MeshLikeSegmentation]) -> str:
+    first = segmentations[0]
+    name = f"{first.kind}_{first.segmentation_id}_{first.timeframe_id}"
+    if first.opacity is not None:
+        name += f"_{first.opacity}"
+    return f"segmentations/merged_{name}.mvsj"
+
+
+def add_merged_mesh_segmentation(
+    builder: Root,
+    segmentations: list[MeshLikeSegmentation],
+):
+    if not segmentations:
+        return builder
+
+    vertices, indices, triangle_groups = merge_mesh_segmentations(segmentations)
+
+    group_colors = {s.segment_id: s.color for s in segmentations if s.color}
+    group_tooltips = {s.segment_id: get_segmentation_tooltip(s) for s in segmentations}
+
+    builder.primitives(
+        snapshot_key="",
+        opacity=segmentations[0].opacity,
+    ).mesh(
+        vertices=vertices.ravel().tolist(),
+        indices=indices.ravel().tolist(),
+        triangle_groups=triangle_groups.tolist(),
+        group_colors=group_colors,
+        group_tooltips=group_tooltips,
+    )
+    return builder
+
+
+def get_mesh_primitives_node(
+    vertices: np.ndarray,
+    indices: np.ndarray,
+    triangle_groups: np.ndarray,
+    opacity: float | None,
+    **mesh_params,
+) -> dict:
+    # same node as builder.primitives().mesh(), but the arrays are kept
+    # as they are, for MVSJWriter
+    return {
+        "kind": "primitives",
+        "params": {"opacity": opacity, "snapshot_key": ""},
+        "children": [
+            {
+                "kind": "primitive",
+                "params": {
+                    "kind": "mesh",
+                    "vertices": vertices,
+                    "indices": indices,
+                    "triangle_groups": triangle_groups,
+                    **mesh_params,
+                },
+            }
+        ],
+    }
+
+
+def get_node_from_file(
+    node: Node | dict,
+    destination_filepath: str,
+    assets: AssetStore,
+) -> Node:
+    uri = assets.write_node(node, destination_filepath)
+    return Node(
+        kind="primitives_from_uri",
+        params={"uri": uri, "format": "mvs-node-json"},
+    )
+
+
+def get_mesh_segmentation_node(segmentation: MeshLikeSegmentation) -> dict:
+    return get_mesh_primitives_node(
+        segmentation.vertices,
+        segmentation.indices,
+        segmentation.triangle_groups,
+        segmentation.opacity,
+        tooltip=get_segmentation_tooltip(segmentation),
+        color=segmentation.color,
+    )
+
+
+def get_merged_mesh_segmentation_node(
+    segmentations: list[MeshLikeSegmentation],
+) -> dict:
+    vertices, indices, triangle_groups = merge_mesh_segmentations(segmentations)
+    return get_mesh_primitives_node(
+        vertices,
+        indices,
+        triangle_groups,
+        segmentations[0].opacity,
+        group_colors={s.segment_id: s.color for s in segmentations if s.color},
+        group_tooltips={
+            s.segment_id: get_segmentation_tooltip(s) for s in segmentations
+        },
+    )
+
+
 def add_segmentation(builder: Root, segmentation: MVSXSegmentation) -> None:
     if segmentation.kind in ["mesh", "lattice"]:
         add_mesh_segmentation(builder, segmentation)
@@ -490,35 +1401,246 @@ def add_segmentation(builder: Root, segmentation: MVSXSegmentation) -> None:
         add_geometric_segmentation(builder, segmentation)
 
 
-def convert_cvsx_to_mvsx(cvsx_path: str):
-    cvsx_file: CVSXFile = load_cvsx_entry(cvsx_path)
-    volumes: list[MVSXVolume] = get_list_of_all_volumes(cvsx_file)
+def get_segmentations(
+    cvsx_file: CVSXFile,
+    options: MVSXConversionOptions,
+    timeframes: CVSXTimeframeIndex | None = None,
+) -> list[SnapshotSegmentation]:
+    # of the segmentation members in timeframes, or of all members
+    if timeframes is not None:
+        members = select_segmentation_members(
+            get_segmentation_members(cvsx_file, options.columnar_primitives),
+            timeframes,
+            options.selection.segment_ids if options.selection else None,
+        )
+        if options.incremental_segments:
+            return members
+        return list(iter_member_segmentations(cvsx_file, members, options))
+    if options.incremental_segments:
+        # converted while their snapshots are written
+        return get_segmentation_members(cvsx_file, options.columnar_primitives)
+    if options.pipeline is not None:
+        return list(iter_pipeline_segmentations(cvsx_file, options))
+
+    geometry_cache = get_geometry_cache(options)
     segmentations: list[MVSXSegmentation] = [
         *get_list_of_all_mesh_segmentations(cvsx_file),
-        *get_list_of_all_lattice_segmentations(cvsx_file),
-        *get_list_of_all_geometric_segmentations(cvsx_file),
+        *get_list_of_all_lattice_segmentations(cvsx_file, geometry_cache),
     ]
+    if options.columnar_primitives:
+        segmentations += get_list_of_all_geometric_segmentation_sets(cvsx_file)
+    else:
+        segmentations += get_list_of_all_geometric_segmentations(cvsx_file)
+    return segmentations
 
-    # copy over data
-    for volume in volumes:
-        with ZipFile(cvsx_path, "r") as zip_ref:
-            zip_ref.extract(volume.source_filepath, "temp/volumes")
 
-    index_snapshot = create_index_snapshot(volumes, segmentations)
-    states = States(
-        metadata=GlobalMetadata(),
-        snapshots=[index_snapshot],
+def write_entry(
+    cvsx_file: CVSXFile,
+    options: MVSXConversionOptions,
+    assets: AssetStore,
+    mvsj_path: str,
+) -> None:
+    timeframes = cvsx_file.timeframes
+    volumes: list[MVSXVolume] = get_list_of_all_volumes(cvsx_file)
+    if options.selection is not None:
+        timeframes = select_timeframes(timeframes, options.selection)
+        volumes = select_volumes(volumes, timeframes)
+    _, segmentation_timeframes = get_converted_timeframes(timeframes, options)
+    if options.selection is None and segmentation_timeframes is timeframes:
+        segmentations = get_segmentations(cvsx_file, options)
+    else:
+        segmentations = get_segmentations(cvsx_file, options, segmentation_timeframes)
+
+    indent = None if options.compact_mvsj else 2
+    voxel_size = None
+    if options.coordinate_unit == "voxel" and options.coordinate_precision:
+        voxel_size = get_entry_voxel_size(cvsx_file, volumes)
+
+    if options.all_timeframes:
+        timeframe_snapshots = get_timeframe_snapshots(
+            volumes, segmentations, timeframes
+        )
+    else:
+        timeframe_snapshots = [
+            get_first_timeframe_snapshot(volumes, segmentations, timeframes)
+        ]
+    index_snapshot = get_index_snapshot(cvsx_file, timeframe_snapshots)
+    metadata = GlobalMetadata(
+        title=index_snapshot.title,
+        description=index_snapshot.description,
     )
 
-    with open("temp/mesh.mvsj", "w") as f:
-        f.write(states.model_dump_json(indent=2, exclude_none=True))
+    # write the volumes used by the snapshots
+    snapshot_volumes = {
+        volume.id: volume
+        for timeframe_snapshot in timeframe_snapshots
+        for volume in timeframe_snapshot.volumes
+    }
+    crop_bounds = None
+    if options.crop_to_segmentations:
+        crop_bounds = get_segmentation_bounds(
+            iter_segmentations_of_kinds(
+                segmentations, SEGMENTATION_KINDS, options, cvsx_file
+            )
+        )
+        if crop_bounds is not None:
+            crop_bounds = pad_bounds(crop_bounds, options.crop_margin)
+    pyramids = write_volumes(
+        cvsx_file, list(snapshot_volumes.values()), assets, options, crop_bounds
+    )
+    if options.volume_pyramid:
+        timeframe_snapshots = get_pyramid_snapshots(timeframe_snapshots, pyramids)
+
+    if options.stream_mvsj:
+        with open(mvsj_path, "w") as f:
+            writer = MVSJWriter(f, indent=indent)
+            writer.begin_states(metadata)
+            for timeframe_snapshot in timeframe_snapshots:
+                write_snapshot(
+                    writer,
+                    timeframe_snapshot,
+                    options,
+                    voxel_size=voxel_size,
+                    assets=assets,
+                    cvsx_file=cvsx_file,
+                )
+            writer.end_states()
+    else:
+        snapshots = [
+            create_snapshot(
+                timeframe_snapshot,
+                options,
+                voxel_size=voxel_size,
+                assets=assets,
+                cvsx_file=cvsx_file,
+            )
+            for timeframe_snapshot in timeframe_snapshots
+        ]
+        states = States(
+            metadata=metadata,
+            snapshots=snapshots,
+        )
 
-    mvsj_to_mvsx(
-        input_mvsj_path="temp/mesh.mvsj",
-        output_mvsx_path="temp/mesh.mvsx",
+        with open(mvsj_path, "w") as f:
+            f.write(states.model_dump_json(indent=indent, exclude_none=True))
+
+
+def write_archive(
+    cvsx_file: CVSXFile,
+    options: MVSXConversionOptions,
+    work_dir: str,
+    archive_path: str,
+) -> MVSXAssetReport:
+    mvsj_path = os.path.join(work_dir, "index.mvsj")
+    asset_dir = os.path.join(work_dir, "assets")
+
+    if options.pipeline is None:
+        # shared by all snapshots, so identical volumes and geometry are
+        # written once
+        assets = AssetStore(asset_dir, options.content_addressed_assets)
+        write_entry(cvsx_file, options, assets, mvsj_path)
+        write_mvsx(
+            output_path=archive_path,
+            mvsj_path=mvsj_path,
+            asset_dir=asset_dir,
+            asset_uris=assets.uris,
+            compression=options.compression,
+            compresslevel=options.compresslevel,
+            probe_bytes=options.probe_bytes,
+        )
+        return assets.report
+
+    # assets are packed as soon as they are stored, while the next ones are
+    # still being written, the MVSJ goes in last
+    with MVSXArchiveWriter(
+        output_path=archive_path,
+        asset_dir=asset_dir,
+        compression=options.compression,
+        compresslevel=options.compresslevel,
+        probe_bytes=options.probe_bytes,
+        queue_size=options.pipeline.queue_size,
+    ) as archive:
+        assets = AssetStore(
+            asset_dir, options.content_addressed_assets, on_store=archive.add
+        )
+        write_entry(cvsx_file, options, assets, mvsj_path)
+        archive.add_file(mvsj_path, "index.mvsj")
+    return assets.report
+
+
+def convert_cvsx_to_mvsx(
+    cvsx_path: str,
+    options: MVSXConversionOptions | None = None,
+    output_path: str = "temp/mesh.mvsx",
+    scratch_dir: str | None = None,
+) -> MVSXAssetReport:
+    """
+    Converts the CVSX entry at cvsx_path into the MVSX archive output_path.
+    Intermediate files go to a private directory in scratch_dir (the system
+    temporary directory by default) that is removed afterwards, so
+    conversions to different outputs can run side by side.
+    """
+    options = options or MVSXConversionOptions()
+    # members outside the selection are not even tested
+    cvsx_file: CVSXFile = load_cvsx_entry(
+        cvsx_path, test_members=options.selection is None
     )
 
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(output_dir, exist_ok=True)
+    # completed next to output_path and moved there in one step, so an
+    # existing archive is never left half written
+    archive_path = f"{output_path}.{uuid4().hex}.partial"
+    try:
+        with tempfile.TemporaryDirectory(
+            prefix="cvsx2mvsx-", dir=scratch_dir
+        ) as work_dir:
+            report = write_archive(cvsx_file, options, work_dir, archive_path)
+        os.replace(archive_path, output_path)
+    finally:
+        if os.path.exists(archive_path):
+            os.remove(archive_path)
+    return report
+
+
+def convert_cvsx_to_mvsx_cached(
+    cvsx_path: str,
+    cache: ResultCache,
+    options: MVSXConversionOptions | None = None,
+    scratch_dir: str | None = None,
+    output_path: str | None = None,
+    link_output: bool = False,
+) -> tuple[str, MVSXAssetReport]:
+    # converted only if the same CVSX content was not converted with the
+    # same options before. Returns the path of the MVSX in the cache, which
+    # eviction by other conversions can remove, or with output_path a copy
+    # of it there, which stays. link_output hard links the copy, it must
+    # not be modified then
+    options = options or MVSXConversionOptions()
+    key = get_cache_key(cvsx_path, options)
+    if output_path is None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+    else:
+        report = cache.copy(key, output_path, link_output)
+        if report is not None:
+            return output_path, report
+
+    temp_path = cache.get_temp_path()
+    try:
+        report = convert_cvsx_to_mvsx(cvsx_path, options, temp_path, scratch_dir)
+        if output_path is None:
+            return cache.put(key, temp_path, report), report
+        copy_file(temp_path, output_path, link_output)
+        cache.put(key, temp_path, report)
+        return output_path, report
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
 
 if __name__ == "__main__":
     # TODO: add switch for the lattice segmentation conversion
-    convert_cvsx_to_mvsx("data/cvsx/zipped/idr-5025551.cvsx")
+    report = convert_cvsx_to_mvsx("data/cvsx/zipped/idr-5025551.cvsx")
+    print(report)
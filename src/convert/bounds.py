@@ -0,0 +1,100 @@
+from typing import Iterable
+
+import numpy as np
+
+from src.models.mvsx.mvsx_segmentation import (
+    MVSXGeometricSegmentationSet,
+    MVSXSegmentation,
+)
+from src.models.read.geometric import ShapePrimitive, ShapePrimitiveColumns
+
+# lower and upper corner of an axis aligned box in Å
+Bounds = tuple[np.ndarray, np.ndarray]
+
+
+def get_points_bounds(points: np.ndarray) -> Bounds | None:
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    if not len(points):
+        return None
+    return points.min(axis=0), points.max(axis=0)
+
+
+def get_spheres_bounds(centers: np.ndarray, radii: np.ndarray) -> Bounds | None:
+    centers = np.asarray(centers, dtype=np.float64).reshape(-1, 3)
+    radii = np.asarray(radii, dtype=np.float64).reshape(-1, 1)
+    if not len(centers):
+        return None
+    return (centers - radii).min(axis=0), (centers + radii).max(axis=0)
+
+
+def union_bounds(*bounds: Bounds | None) -> Bounds | None:
+    bounds = [b for b in bounds if b is not None]
+    if not bounds:
+        return None
+    return (
+        np.min([lower for lower, _ in bounds], axis=0),
+        np.max([upper for _, upper in bounds], axis=0),
+    )
+
+
+def pad_bounds(bounds: Bounds, margin: float) -> Bounds:
+    lower, upper = bounds
+    return lower - margin, upper + margin
+
+
+# Shapes are bounded by spheres around their anchor: the unit box corners
+# are at most 1/2 and the unit pyramid vertices at most 1 per axis away, so
+# scaling s moves them at most |s| / 2 and |s|. A frustum lies within the
+# spheres of its end caps.
+
+
+def get_shape_bounds(shape: ShapePrimitive) -> Bounds:
+    if shape.kind == "sphere":
+        centers, radii = [shape.center], [shape.radius]
+    elif shape.kind == "box":
+        centers, radii = [shape.translation], [np.linalg.norm(shape.scaling) / 2]
+    elif shape.kind == "pyramid":
+        centers, radii = [shape.translation], [np.linalg.norm(shape.scaling)]
+    elif shape.kind == "ellipsoid":
+        centers, radii = [shape.center], [max(shape.radius_scale)]
+    elif shape.kind == "cylinder":
+        centers = [shape.start, shape.end]
+        radii = [shape.radius_bottom, shape.radius_top]
+    else:
+        raise ValueError(f"Unknown shape kind: {shape.kind}")
+    return get_spheres_bounds(centers, radii)
+
+
+def get_shape_columns_bounds(shapes: ShapePrimitiveColumns) -> Bounds | None:
+    return union_bounds(
+        get_spheres_bounds(shapes.sphere.center, shapes.sphere.radius),
+        get_spheres_bounds(
+            shapes.box.translation,
+            np.linalg.norm(shapes.box.scaling.reshape(-1, 3), axis=1) / 2,
+        ),
+        get_spheres_bounds(
+            shapes.pyramid.translation,
+            np.linalg.norm(shapes.pyramid.scaling.reshape(-1, 3), axis=1),
+        ),
+        get_spheres_bounds(
+            shapes.ellipsoid.center,
+            shapes.ellipsoid.radius_scale.reshape(-1, 3).max(axis=1, initial=0),
+        ),
+        get_spheres_bounds(shapes.cylinder.start, shapes.cylinder.radius_bottom),
+        get_spheres_bounds(shapes.cylinder.end, shapes.cylinder.radius_top),
+    )
+
+
+def get_segmentation_bounds(
+    segmentations: Iterable[MVSXSegmentation | MVSXGeometricSegmentationSet],
+) -> Bounds | None:
+    # union over all segments as they are emitted, None without geometry
+    bounds = []
+    for segmentation in segmentations:
+        if segmentation.kind in ["mesh", "lattice"]:
+            bounds.append(get_points_bounds(segmentation.vertices))
+        elif segmentation.kind == "primitive":
+            bounds.append(get_shape_bounds(segmentation.shape))
+        elif segmentation.kind == "primitive_set":
+            bounds.append(get_shape_columns_bounds(segmentation.shapes))
+    return union_bounds(*bounds)
@@ -1,6 +1,9 @@
+import numpy as np
+
 from src.models.cvsx.cvsx_annotations import DescriptionData, SegmentAnnotationData
 from src.models.cvsx.cvsx_file import CVSXFile
 from src.models.mvsx.mvsx_segmentation import SegmentationType
+from src.models.read.common import VolumeData3dInfo
 
 SegmentationId = tuple[str, int]
 
@@ -37,3 +40,13 @@ def get_segmentation_descriptions(
         descriptions_map[key].append(description_data)
 
     return descriptions_map
+
+
+def get_voxel_size(info: VolumeData3dInfo) -> np.ndarray:
+    return np.array(
+        [
+            info.spacegroup_cell_size_0 / info.sample_count_0,
+            info.spacegroup_cell_size_1 / info.sample_count_1,
+            info.spacegroup_cell_size_2 / info.sample_count_2,
+        ]
+    )
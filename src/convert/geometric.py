@@ -1,14 +1,24 @@
+from typing import Iterator
 from zipfile import ZipFile
 
 from src.convert.common import (
+    SegmentationId,
     get_segmentation_annotations,
     get_segmentation_descriptions,
 )
-from src.io.cif.read.geometric import parse_geometric_json
+from src.io.cif.read.geometric import (
+    parse_geometric_json,
+    parse_geometric_json_columns,
+)
+from src.models.cvsx.cvsx_annotations import DescriptionData, SegmentAnnotationData
 from src.models.cvsx.cvsx_file import CVSXFile
-from src.models.mvsx.mvsx_entry import MVSXBaseSegmentation
-from src.models.mvsx.mvsx_segmentation import MVSXGeometricSegmentation
+from src.models.mvsx.mvsx_segmentation import (
+    MVSXBaseSegmentation,
+    MVSXGeometricSegmentation,
+    MVSXGeometricSegmentationSet,
+)
 from src.models.read.geometric import (
+    ShapePrimitiveColumns,
     ShapePrimitiveData,
 )
 from src.utils import get_hex_color, rgba_to_opacity
@@ -22,13 +32,105 @@ def get_shape_data(cvsx_path: str, inner_path: str) -> ShapePrimitiveData:
             return lattice_cif
 
 
-def get_list_of_all_geometric_segmentations(
+def get_shape_columns(cvsx_path: str, inner_path: str) -> ShapePrimitiveColumns:
+    with ZipFile(cvsx_path, "r") as z:
+        with z.open(inner_path) as f:
+            json_data = f.read()
+            return parse_geometric_json_columns(json_data)
+
+
+def get_geometric_segmentations(
+    source_filepath: str,
+    segmentation_id: str,
+    timeframe_id: int,
+    shape_data: ShapePrimitiveData,
+    segmentation_annotations: dict[SegmentationId, SegmentAnnotationData],
+    segmentation_descriptions: dict[SegmentationId, list[DescriptionData]],
+) -> list[MVSXGeometricSegmentation]:
+    destination_filepath = f"segmentations/{source_filepath}"
+    mvsx_segmentations: list[MVSXGeometricSegmentation] = []
+
+    for shape in shape_data.shape_primitive_list:
+        segment_id = shape.id
+        annotation = segmentation_annotations.get((segmentation_id, segment_id))
+        descriptions = segmentation_descriptions.get((segmentation_id, segment_id))
+
+        color = get_hex_color(annotation)
+        opacity = rgba_to_opacity(annotation)
+
+        # sanity check
+        if annotation:
+            assert annotation.segment_kind == "primitive"
+            assert annotation.segment_id == segment_id
+            assert annotation.segmentation_id == segmentation_id
+            assert annotation.time == timeframe_id
+
+        mvsx_segmentation = MVSXGeometricSegmentation(
+            kind="primitive",
+            source_filepath=source_filepath,
+            destination_filepath=destination_filepath,
+            timeframe_id=timeframe_id,
+            segmentation_id=segmentation_id,
+            segment_id=segment_id,
+            color=color,
+            opacity=opacity,
+            descriptions=descriptions,
+            shape=shape,
+        )
+
+        mvsx_segmentations.append(mvsx_segmentation)
+
+    return mvsx_segmentations
+
+
+def get_geometric_segmentation_set(
+    source_filepath: str,
+    segmentation_id: str,
+    timeframe_id: int,
+    shapes: ShapePrimitiveColumns,
+    segmentation_annotations: dict[SegmentationId, SegmentAnnotationData],
+    segmentation_descriptions: dict[SegmentationId, list[DescriptionData]],
+) -> MVSXGeometricSegmentationSet:
+    colors: dict[int, str] = {}
+    opacities: dict[int, float] = {}
+    descriptions: dict[int, list] = {}
+
+    # only per-segment annotations are looked up here, the shape
+    # parameters stay in numpy arrays
+    for segment_id in shapes.segment_ids().tolist():
+        annotation = segmentation_annotations.get((segmentation_id, segment_id))
+        segment_descriptions = segmentation_descriptions.get(
+            (segmentation_id, segment_id)
+        )
+
+        color = get_hex_color(annotation)
+        opacity = rgba_to_opacity(annotation)
+
+        if color is not None:
+            colors[segment_id] = color
+        if opacity is not None:
+            opacities[segment_id] = opacity
+        if segment_descriptions:
+            descriptions[segment_id] = segment_descriptions
+
+    return MVSXGeometricSegmentationSet(
+        source_filepath=source_filepath,
+        destination_filepath=f"segmentations/{source_filepath}",
+        timeframe_id=timeframe_id,
+        segmentation_id=segmentation_id,
+        shapes=shapes,
+        colors=colors,
+        opacities=opacities,
+        descriptions=descriptions,
+    )
+
+
+def iter_geometric_segmentations(
     cvsx_file: CVSXFile,
-) -> list[MVSXBaseSegmentation]:
+) -> Iterator[MVSXGeometricSegmentation]:
     if not cvsx_file.index.geometricSegmentations:
-        return []
+        return
 
-    mvsx_segmentations: list[MVSXGeometricSegmentation] = []
     segmentation_annotations = get_segmentation_annotations(cvsx_file)
     segmentation_descriptions = get_segmentation_descriptions(cvsx_file, "primitive")
 
@@ -36,43 +138,51 @@ def get_list_of_all_geometric_segmentations(
         source_filepath,
         segmentation_info,
     ) in cvsx_file.index.geometricSegmentations.items():
-        destination_filepath = f"segmentations/{source_filepath}"
-        segmentation_id = segmentation_info.segmentationId
-        timeframe_id = segmentation_info.timeframeIndex
-
         shape_data: ShapePrimitiveData = get_shape_data(
             cvsx_file.filepath,
             source_filepath,
         )
+        yield from get_geometric_segmentations(
+            source_filepath,
+            segmentation_info.segmentationId,
+            segmentation_info.timeframeIndex,
+            shape_data,
+            segmentation_annotations,
+            segmentation_descriptions,
+        )
 
-        for shape in shape_data.shape_primitive_list:
-            segment_id = shape.id
-            annotation = segmentation_annotations.get((segmentation_id, segment_id))
-            descriptions = segmentation_descriptions.get((segmentation_id, segment_id))
-
-            color = get_hex_color(annotation)
-            opacity = rgba_to_opacity(annotation)
-
-            # sanity check
-            if annotation:
-                assert annotation.segment_kind == "primitive"
-                assert annotation.segment_id == segment_id
-                assert annotation.segmentation_id == segmentation_id
-                assert annotation.time == timeframe_id
-
-            mvsx_segmentation = MVSXGeometricSegmentation(
-                kind="primitive",
-                source_filepath=source_filepath,
-                destination_filepath=destination_filepath,
-                timeframe_id=timeframe_id,
-                segmentation_id=segmentation_id,
-                segment_id=segment_id,
-                color=color,
-                opacity=opacity,
-                descriptions=descriptions,
-                shape=shape,
-            )
-
-            mvsx_segmentations.append(mvsx_segmentation)
 
-    return mvsx_segmentations
+def iter_geometric_segmentation_sets(
+    cvsx_file: CVSXFile,
+) -> Iterator[MVSXGeometricSegmentationSet]:
+    if not cvsx_file.index.geometricSegmentations:
+        return
+
+    segmentation_annotations = get_segmentation_annotations(cvsx_file)
+    segmentation_descriptions = get_segmentation_descriptions(cvsx_file, "primitive")
+
+    for (
+        source_filepath,
+        segmentation_info,
+    ) in cvsx_file.index.geometricSegmentations.items():
+        shapes = get_shape_columns(cvsx_file.filepath, source_filepath)
+        yield get_geometric_segmentation_set(
+            source_filepath,
+            segmentation_info.segmentationId,
+            segmentation_info.timeframeIndex,
+            shapes,
+            segmentation_annotations,
+            segmentation_descriptions,
+        )
+
+
+def get_list_of_all_geometric_segmentations(
+    cvsx_file: CVSXFile,
+) -> list[MVSXBaseSegmentation]:
+    return list(iter_geometric_segmentations(cvsx_file))
+
+
+def get_list_of_all_geometric_segmentation_sets(
+    cvsx_file: CVSXFile,
+) -> list[MVSXGeometricSegmentationSet]:
+    return list(iter_geometric_segmentation_sets(cvsx_file))
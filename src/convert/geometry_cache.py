@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from threading import Lock
+from typing import Callable, Hashable
+from zipfile import ZipFile
+
+import numpy as np
+
+# part of every key, bump it when the meshing output changes
+MESHING_ENGINE = "skimage.marching_cubes/1"
+
+MeshData = tuple[np.ndarray, np.ndarray, np.ndarray]
+MESH_ARRAYS = ["vertices", "indices", "triangle_groups"]
+
+
+def get_member_keys(cvsx_path: str) -> dict[str, str]:
+    # members are identified by their content, from the CRC and size in the
+    # central directory, so renamed or repacked entries still hit
+    with ZipFile(cvsx_path, "r") as z:
+        return {
+            info.filename: f"{info.CRC:08x}-{info.file_size}" for info in z.infolist()
+        }
+
+
+class GeometryCache:
+    """
+    Mesh arrays of lattice segments in cache_dir, as .npy files that are
+    memory mapped when read. A segment is keyed by the content of its
+    lattice member, the segment id and the meshing parameters, so edits of
+    annotations or descriptions do not mesh it again. The segment ids of
+    every member are cached as well, so fully cached members are not parsed.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _get_path(self, *parts) -> str:
+        key = hashlib.sha256("\0".join(map(str, parts)).encode()).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def _get_segment_path(
+        self,
+        member_key: str,
+        segment_id: int,
+        smooth_iterations: int,
+    ) -> str:
+        return self._get_path(
+            "segment", member_key, segment_id, smooth_iterations, MESHING_ENGINE
+        )
+
+    def get_segment_ids(self, member_key: str) -> list[int] | None:
+        try:
+            with open(f"{self._get_path('segment_ids', member_key)}.json") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def put_segment_ids(self, member_key: str, segment_ids: list[int]) -> None:
+        path = f"{self._get_path('segment_ids', member_key)}.json"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump([int(segment_id) for segment_id in segment_ids], f)
+        os.replace(temp_path, path)
+
+    def has(self, member_key: str, segment_id: int, smooth_iterations: int) -> bool:
+        return os.path.isdir(
+            self._get_segment_path(member_key, segment_id, smooth_iterations)
+        )
+
+    def get(
+        self,
+        member_key: str,
+        segment_id: int,
+        smooth_iterations: int,
+    ) -> MeshData | None:
+        path = self._get_segment_path(member_key, segment_id, smooth_iterations)
+        try:
+            return tuple(
+                np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+                for name in MESH_ARRAYS
+            )
+        except FileNotFoundError:
+            return None
+
+    def put(
+        self,
+        member_key: str,
+        segment_id: int,
+        smooth_iterations: int,
+        mesh_data: MeshData,
+    ) -> None:
+        # written to a temporary directory that is renamed into place, so
+        # readers never see a partial segment
+        path = self._get_segment_path(member_key, segment_id, smooth_iterations)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = tempfile.mkdtemp(dir=os.path.dirname(path), suffix=".tmp")
+        for name, array in zip(MESH_ARRAYS, mesh_data):
+            np.save(os.path.join(temp_path, f"{name}.npy"), np.asarray(array))
+        try:
+            os.rename(temp_path, path)
+        except OSError:
+            # written meanwhile by another conversion
+            shutil.rmtree(temp_path, ignore_errors=True)
+
+
+class PreviousMeshes:
+    """
+    The last mesh of every lattice segment with the hash of its voxel mask,
+    so segments that did not change since the previous timeframe are not
+    meshed again. One segment is meshed at a time, different segments
+    concurrently.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._segment_locks: dict[Hashable, Lock] = {}
+        self._meshes: dict[Hashable, tuple[str, MeshData]] = {}
+
+    def get(
+        self,
+        segment_key: Hashable,
+        mask_hash: str | None,
+        get_mesh_data: Callable[[], MeshData | None],
+    ) -> MeshData | None:
+        # without a mask hash the mesh is neither reused nor kept
+        if mask_hash is None:
+            return get_mesh_data()
+        with self._lock:
+            if segment_key not in self._segment_locks:
+                self._segment_locks[segment_key] = Lock()
+            segment_lock = self._segment_locks[segment_key]
+        with segment_lock:
+            previous = self._meshes.get(segment_key)
+            if previous is not None and previous[0] == mask_hash:
+                return previous[1]
+            mesh_data = get_mesh_data()
+            if mesh_data is not None:
+                self._meshes[segment_key] = (mask_hash, mesh_data)
+            return mesh_data
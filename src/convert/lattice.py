@@ -1,17 +1,32 @@
+import hashlib
+from functools import partial
+from typing import Iterator
 from zipfile import ZipFile
 
 import numpy as np
+from scipy.ndimage import find_objects
 from skimage.measure import marching_cubes
 
 from src.convert.common import SegmentationId, get_segmentation_annotations
+from src.convert.geometry_cache import (
+    GeometryCache,
+    MeshData,
+    PreviousMeshes,
+    get_member_keys,
+)
 from src.io.cif.read.lattice import parse_lattice_bcif
-from src.models.cvsx.cvsx_annotations import DescriptionData
+from src.models.cvsx.cvsx_annotations import DescriptionData, SegmentAnnotationData
 from src.models.cvsx.cvsx_file import CVSXFile
-from src.models.mvsx.mvsx_entry import MVSXBaseSegmentation
-from src.models.mvsx.mvsx_segmentation import MVSXLatticeSegmentation
+from src.models.mvsx.mvsx_segmentation import (
+    MVSXBaseSegmentation,
+    MVSXLatticeSegmentation,
+)
 from src.models.read.lattice import LatticeCif
 from src.utils import get_hex_color, rgba_to_opacity, smooth_3d_volume
 
+# of the segment masks before marching cubes
+SMOOTH_ITERATIONS = 1
+
 
 def get_lattice_segmentation_descriptions(
     cvsx_file: CVSXFile,
@@ -46,8 +61,8 @@ def get_lattice_cif(cvsx_path: str, inner_path: str) -> LatticeCif:
 def get_mesh_data_for_lattice_segment(
     lattice_cif: LatticeCif,
     segment_id: int,
-    smooth_iterations: int = 1,
-) -> np.ndarray:
+    smooth_iterations: int = SMOOTH_ITERATIONS,
+) -> MeshData:
     values = lattice_cif.segmentation_block.segmentation_data_3d.values
     info = lattice_cif.segmentation_block.volume_data_3d_info
 
@@ -130,15 +145,149 @@ def get_mesh_data_for_lattice_segment(
     return vertices, indices, triangle_groups
 
 
-def get_list_of_all_lattice_segmentations(
+def get_segment_mask_hashes(lattice_cif: LatticeCif) -> dict[int, str]:
+    # the mesh of a segment depends only on its voxel mask, the grid and the
+    # voxel size, so equal hashes give equal meshes. Masks are cropped to
+    # their bounding box, found for all segments in one pass
+    values = lattice_cif.segmentation_block.segmentation_data_3d.values
+    info = lattice_cif.segmentation_block.volume_data_3d_info
+    nx, ny, nz = (
+        int(info.sample_count_0),
+        int(info.sample_count_1),
+        int(info.sample_count_2),
+    )
+    data = np.asarray(values).reshape((nz, ny, nx))
+    if not np.issubdtype(data.dtype, np.integer):
+        data = data.astype(np.int64)
+
+    grid = (
+        f"{nx} {ny} {nz} {info.spacegroup_cell_size_0} "
+        f"{info.spacegroup_cell_size_1} {info.spacegroup_cell_size_2}"
+    )
+    mask_hashes: dict[int, str] = {}
+    for segment_id, bbox in enumerate(find_objects(data), start=1):
+        if bbox is None:
+            continue
+        mask = data[bbox] == segment_id
+        mask_hash = hashlib.sha256(grid.encode())
+        mask_hash.update(str([(s.start, s.stop) for s in bbox]).encode())
+        mask_hash.update(np.packbits(mask).tobytes())
+        mask_hashes[segment_id] = mask_hash.hexdigest()
+    return mask_hashes
+
+
+def get_lattice_segment_ids(lattice_cif: LatticeCif) -> set[int]:
+    segment_ids = lattice_cif.segmentation_block.segmentation_data_table.segment_id
+    # remove background
+    return set(segment_ids) - {0}
+
+
+def check_lattice_annotation(
+    annotation: SegmentAnnotationData,
+    segmentation_id: str,
+    segment_id: int,
+    timeframe_id: int,
+) -> None:
+    assert annotation.segment_kind == "lattice"
+    assert annotation.segment_id == segment_id
+    assert annotation.segmentation_id == segmentation_id
+    if isinstance(annotation.time, int):
+        # simple case
+        assert annotation.time == timeframe_id
+
+    elif isinstance(annotation.time, list):
+        if all(isinstance(x, int) for x in annotation.time):
+            assert timeframe_id in annotation.time
+        elif all(
+            isinstance(x, tuple)
+            and len(x) == 2
+            and isinstance(x[0], int)
+            and isinstance(x[1], int)
+            for x in annotation.time
+        ):
+            assert any(start <= timeframe_id <= end for start, end in annotation.time)
+        else:
+            raise TypeError("annotation.time list contains unsupported types")
+    else:
+        raise TypeError("annotation.time must be int or list")
+
+
+def get_lattice_segmentation(
+    source_filepath: str,
+    segmentation_id: str,
+    timeframe_id: int,
+    segment_id: int,
+    mesh_data: MeshData,
+    segmentation_annotations: dict[SegmentationId, SegmentAnnotationData],
+    segmentation_descriptions: dict[SegmentationId, list[DescriptionData]],
+) -> MVSXLatticeSegmentation:
+    filepath = f"lattice_{segment_id}_{segmentation_id}_{timeframe_id}.mvsj"
+    destination_filepath = f"segmentations/{filepath}"
+    annotation = segmentation_annotations.get((segmentation_id, segment_id))
+    descriptions = segmentation_descriptions.get((segmentation_id, segment_id))
+
+    color = get_hex_color(annotation)
+    opacity = rgba_to_opacity(annotation)
+
+    # sanity check
+    if annotation:
+        check_lattice_annotation(annotation, segmentation_id, segment_id, timeframe_id)
+
+    vertices, indices, triangle_groups = mesh_data
+
+    return MVSXLatticeSegmentation(
+        kind="lattice",
+        source_filepath=source_filepath,
+        destination_filepath=destination_filepath,
+        timeframe_id=timeframe_id,
+        segmentation_id=segmentation_id,
+        segment_id=segment_id,
+        vertices=vertices,
+        indices=indices,
+        triangle_groups=triangle_groups,
+        color=color,
+        opacity=opacity,
+        descriptions=descriptions,
+    )
+
+
+def get_lattice_segment_mesh(
+    lattice_cif: LatticeCif | None,
+    segment_id: int,
+    geometry_cache: GeometryCache | None = None,
+    member_key: str | None = None,
+    smooth_iterations: int = SMOOTH_ITERATIONS,
+) -> MeshData | None:
+    # None if the segment is not cached and lattice_cif is not given
+    if geometry_cache is not None:
+        mesh_data = geometry_cache.get(member_key, segment_id, smooth_iterations)
+        if mesh_data is not None:
+            return mesh_data
+    if lattice_cif is None:
+        return None
+
+    mesh_data = get_mesh_data_for_lattice_segment(
+        lattice_cif, segment_id, smooth_iterations
+    )
+    if geometry_cache is not None:
+        geometry_cache.put(member_key, segment_id, smooth_iterations, mesh_data)
+    return mesh_data
+
+
+def iter_lattice_segmentations(
     cvsx_file: CVSXFile,
-) -> list[MVSXBaseSegmentation]:
+    geometry_cache: GeometryCache | None = None,
+) -> Iterator[MVSXLatticeSegmentation]:
     if not cvsx_file.index.latticeSegmentations:
-        return []
+        return
 
-    mvsx_segmentations = []
     segmentation_annotations = get_segmentation_annotations(cvsx_file)
     segmentation_descriptions = get_lattice_segmentation_descriptions(cvsx_file)
+    member_keys = {}
+    if geometry_cache is not None:
+        member_keys = get_member_keys(cvsx_file.filepath)
+    # timeframes after the first one mesh only the segments that moved
+    previous_meshes = PreviousMeshes()
 
     for (
         source_filepath,
@@ -146,72 +295,53 @@ def get_list_of_all_lattice_segmentations(
     ) in cvsx_file.index.latticeSegmentations.items():
         segmentation_id = segmentation_info.segmentationId
         timeframe_id = segmentation_info.timeframeIndex
-
-        lattice_cif = get_lattice_cif(cvsx_file.filepath, source_filepath)
-
-        segment_ids = lattice_cif.segmentation_block.segmentation_data_table.segment_id
-        # remove background
-        segment_ids = set(segment_ids) - {0}
+        member_key = member_keys.get(source_filepath)
+
+        # parsed only if a segment is not cached
+        lattice_cif = None
+        segment_ids = None
+        if geometry_cache is not None:
+            segment_ids = geometry_cache.get_segment_ids(member_key)
+        if segment_ids is None:
+            lattice_cif = get_lattice_cif(cvsx_file.filepath, source_filepath)
+            segment_ids = list(get_lattice_segment_ids(lattice_cif))
+            if geometry_cache is not None:
+                geometry_cache.put_segment_ids(member_key, segment_ids)
+
+        mask_hashes = {}
+        if lattice_cif is not None:
+            mask_hashes = get_segment_mask_hashes(lattice_cif)
 
         for segment_id in segment_ids:
-            filepath = f"lattice_{segment_id}_{segmentation_id}_{timeframe_id}.mvsj"
-            destination_filepath = f"segmentations/{filepath}"
-            annotation = segmentation_annotations.get((segmentation_id, segment_id))
-            descriptions = segmentation_descriptions.get((segmentation_id, segment_id))
-
-            color = get_hex_color(annotation)
-            opacity = rgba_to_opacity(annotation)
-
-            # sanity check
-            if annotation:
-                assert annotation.segment_kind == "lattice"
-                assert annotation.segment_id == segment_id
-                assert annotation.segmentation_id == segmentation_id
-                if isinstance(annotation.time, int):
-                    # simple case
-                    assert annotation.time == timeframe_id
-
-                elif isinstance(annotation.time, list):
-                    if all(isinstance(x, int) for x in annotation.time):
-                        assert timeframe_id in annotation.time
-                    elif all(
-                        isinstance(x, tuple)
-                        and len(x) == 2
-                        and isinstance(x[0], int)
-                        and isinstance(x[1], int)
-                        for x in annotation.time
-                    ):
-                        assert any(
-                            start <= timeframe_id <= end
-                            for start, end in annotation.time
-                        )
-                    else:
-                        raise TypeError(
-                            "annotation.time list contains unsupported types"
-                        )
-                else:
-                    raise TypeError("annotation.time must be int or list")
-
-            vertices, indices, triangle_groups = get_mesh_data_for_lattice_segment(
-                lattice_cif,
-                segment_id,
+            mesh_data = previous_meshes.get(
+                (segmentation_id, segment_id),
+                mask_hashes.get(segment_id),
+                partial(
+                    get_lattice_segment_mesh,
+                    lattice_cif,
+                    segment_id,
+                    geometry_cache,
+                    member_key,
+                ),
             )
-
-            mvsx_segmentation = MVSXLatticeSegmentation(
-                kind="lattice",
-                source_filepath=source_filepath,
-                destination_filepath=destination_filepath,
-                timeframe_id=timeframe_id,
-                segmentation_id=segmentation_id,
-                segment_id=segment_id,
-                vertices=vertices,
-                indices=indices,
-                triangle_groups=triangle_groups,
-                color=color,
-                opacity=opacity,
-                descriptions=descriptions,
+            if mesh_data is None:
+                lattice_cif = get_lattice_cif(cvsx_file.filepath, source_filepath)
+                mesh_data = get_lattice_segment_mesh(
+                    lattice_cif, segment_id, geometry_cache, member_key
+                )
+            yield get_lattice_segmentation(
+                source_filepath,
+                segmentation_id,
+                timeframe_id,
+                segment_id,
+                mesh_data,
+                segmentation_annotations,
+                segmentation_descriptions,
             )
 
-            mvsx_segmentations.append(mvsx_segmentation)
 
-    return mvsx_segmentations
+def get_list_of_all_lattice_segmentations(
+    cvsx_file: CVSXFile,
+    geometry_cache: GeometryCache | None = None,
+) -> list[MVSXBaseSegmentation]:
+    return list(iter_lattice_segmentations(cvsx_file, geometry_cache))
@@ -1,11 +1,16 @@
 import os
+from typing import Iterator
 from zipfile import ZipFile
 
 import numpy as np
 
-from src.convert.common import SegmentationId, get_segmentation_annotations
+from src.convert.common import (
+    SegmentationId,
+    get_segmentation_annotations,
+    get_voxel_size,
+)
 from src.io.cif.read.mesh import parse_mesh_bcif
-from src.models.cvsx.cvsx_annotations import DescriptionData
+from src.models.cvsx.cvsx_annotations import DescriptionData, SegmentAnnotationData
 from src.models.cvsx.cvsx_file import CVSXFile
 from src.models.mvsx.mvsx_segmentation import MVSXMeshSegmentation
 from src.models.read.mesh import MeshCif
@@ -58,15 +63,16 @@ def get_info_from_mesh_filepath(filepath: str) -> tuple[str, str, str]:
     return segment_id, segmentation_id, timeframe_id
 
 
-def get_mesh_data(
-    cvsx_path: str,
-    inner_path: str,
-) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+def get_mesh_cif(cvsx_path: str, inner_path: str) -> MeshCif:
     with ZipFile(cvsx_path, "r") as z:
         with z.open(inner_path) as f:
             bcif_data = f.read()
-            mesh_cif: MeshCif = parse_mesh_bcif(bcif_data)
+            return parse_mesh_bcif(bcif_data)
 
+
+def get_mesh_arrays(
+    mesh_cif: MeshCif,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
     x = np.array(mesh_cif.mesh_block.mesh_vertex.x, dtype=np.float64)
     y = np.array(mesh_cif.mesh_block.mesh_vertex.y, dtype=np.float64)
     z = np.array(mesh_cif.mesh_block.mesh_vertex.z, dtype=np.float64)
@@ -74,31 +80,11 @@ def get_mesh_data(
     indices = mesh_cif.mesh_block.mesh_triangle.vertex_id
     triangle_groups = mesh_cif.mesh_block.mesh_triangle.mesh_id
 
-    spacegroup_cell_size_0 = (
-        mesh_cif.mesh_block.volume_data_3d_info.spacegroup_cell_size_0
-    )
-    spacegroup_cell_size_1 = (
-        mesh_cif.mesh_block.volume_data_3d_info.spacegroup_cell_size_1
-    )
-    spacegroup_cell_size_2 = (
-        mesh_cif.mesh_block.volume_data_3d_info.spacegroup_cell_size_2
-    )
-
-    sample_count_0 = mesh_cif.mesh_block.volume_data_3d_info.sample_count_0
-    sample_count_1 = mesh_cif.mesh_block.volume_data_3d_info.sample_count_1
-    sample_count_2 = mesh_cif.mesh_block.volume_data_3d_info.sample_count_2
-
-    voxel_size_x = spacegroup_cell_size_0 / sample_count_0
-    voxel_size_y = spacegroup_cell_size_1 / sample_count_1
-    voxel_size_z = spacegroup_cell_size_2 / sample_count_2
-
-    x *= voxel_size_x
-    y *= voxel_size_y
-    z *= voxel_size_z
-
-    x = np.round(x, 2)
-    y = np.round(y, 2)
-    z = np.round(z, 2)
+    # coordinates are rounded when emitted, see src/convert/quantization.py
+    voxel_size = get_voxel_size(mesh_cif.mesh_block.volume_data_3d_info)
+    x *= voxel_size[0]
+    y *= voxel_size[1]
+    z *= voxel_size[2]
 
     vertices = np.column_stack((x, y, z))
     indices = indices.reshape(-1, 3)[:, [0, 2, 1]]
@@ -106,54 +92,73 @@ def get_mesh_data(
     return vertices, indices, triangle_groups
 
 
-def get_list_of_all_mesh_segmentations(
-    cvsx_file: CVSXFile,
-) -> list[MVSXMeshSegmentation]:
+def get_mesh_data(
+    cvsx_path: str,
+    inner_path: str,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    return get_mesh_arrays(get_mesh_cif(cvsx_path, inner_path))
+
+
+def get_mesh_segmentation(
+    source_filepath: str,
+    mesh_cif: MeshCif,
+    segmentation_annotations: dict[SegmentationId, SegmentAnnotationData],
+    segmentation_descriptions: dict[SegmentationId, list[DescriptionData]],
+) -> MVSXMeshSegmentation:
+    parts = get_info_from_mesh_filepath(source_filepath)
+    segment_id, segmentation_id, timeframe_id = parts
+    filename, _ = os.path.splitext(source_filepath)
+    destination_filepath = f"segmentations/{filename}.mvsj"
+    annotation = segmentation_annotations.get((segmentation_id, segment_id))
+    descriptions = segmentation_descriptions.get((segmentation_id, segment_id))
+
+    color = get_hex_color(annotation)
+    opacity = rgba_to_opacity(annotation)
+
+    # sanity check
+    if annotation:
+        assert annotation.segment_kind == "mesh"
+        assert annotation.segment_id == segment_id
+        assert annotation.segmentation_id == segmentation_id
+        assert annotation.time == timeframe_id
+
+    vertices, indices, triangle_groups = get_mesh_arrays(mesh_cif)
+
+    return MVSXMeshSegmentation(
+        type="mesh",
+        source_filepath=source_filepath,
+        destination_filepath=destination_filepath,
+        timeframe_id=timeframe_id,
+        segmentation_id=segmentation_id,
+        segment_id=segment_id,
+        vertices=vertices,
+        indices=indices,
+        triangle_groups=triangle_groups,
+        color=color,
+        opacity=opacity,
+        descriptions=descriptions,
+    )
+
+
+def iter_mesh_segmentations(cvsx_file: CVSXFile) -> Iterator[MVSXMeshSegmentation]:
     if not cvsx_file.index.meshSegmentations:
-        return []
+        return
 
-    mvsx_segmentations = []
     segmentation_annotations = get_segmentation_annotations(cvsx_file)
     segmentation_descriptions = get_segmentation_descriptions(cvsx_file)
 
     for mesh_segmentation in cvsx_file.index.meshSegmentations:
         for source_filepath in mesh_segmentation.segmentsFilenames:
-            parts = get_info_from_mesh_filepath(source_filepath)
-            segment_id, segmentation_id, timeframe_id = parts
-            destination_filepath = f"segmentations/{source_filepath}"
-            annotation = segmentation_annotations.get((segmentation_id, segment_id))
-            descriptions = segmentation_descriptions.get((segmentation_id, segment_id))
-
-            color = get_hex_color(annotation)
-            opacity = rgba_to_opacity(annotation)
-
-            # sanity check
-            if annotation:
-                assert annotation.segment_kind == "mesh"
-                assert annotation.segment_id == segment_id
-                assert annotation.segmentation_id == segmentation_id
-                assert annotation.time == timeframe_id
-
-            vertices, indices, triangle_groups = get_mesh_data(
-                cvsx_file.filepath,
+            mesh_cif = get_mesh_cif(cvsx_file.filepath, source_filepath)
+            yield get_mesh_segmentation(
                 source_filepath,
+                mesh_cif,
+                segmentation_annotations,
+                segmentation_descriptions,
             )
 
-            mvsx_segmentation = MVSXMeshSegmentation(
-                type="mesh",
-                source_filepath=source_filepath,
-                destination_filepath=destination_filepath,
-                timeframe_id=timeframe_id,
-                segmentation_id=segmentation_id,
-                segment_id=segment_id,
-                vertices=vertices,
-                indices=indices,
-                triangle_groups=triangle_groups,
-                color=color,
-                opacity=opacity,
-                descriptions=descriptions,
-            )
-
-            mvsx_segmentations.append(mvsx_segmentation)
 
-    return mvsx_segmentations
+def get_list_of_all_mesh_segmentations(
+    cvsx_file: CVSXFile,
+) -> list[MVSXMeshSegmentation]:
+    return list(iter_mesh_segmentations(cvsx_file))
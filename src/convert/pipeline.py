@@ -0,0 +1,294 @@
+from functools import partial
+from typing import Any, Iterator
+
+from src.convert.common import (
+    get_segmentation_annotations,
+    get_segmentation_descriptions,
+)
+from src.convert.geometric import (
+    get_geometric_segmentation_set,
+    get_geometric_segmentations,
+)
+from src.convert.geometry_cache import (
+    GeometryCache,
+    PreviousMeshes,
+    get_member_keys,
+)
+from src.convert.lattice import (
+    SMOOTH_ITERATIONS,
+    get_lattice_cif,
+    get_lattice_segment_ids,
+    get_lattice_segment_mesh,
+    get_lattice_segmentation,
+    get_segment_mask_hashes,
+)
+from src.convert.mesh import get_info_from_mesh_filepath, get_mesh_segmentation
+from src.convert.selection import is_selected, select_shape_columns, select_shapes
+from src.io.cif.read.common import read_file_from_zip
+from src.io.cif.read.geometric import (
+    parse_geometric_json,
+    parse_geometric_json_columns,
+)
+from src.io.cif.read.lattice import parse_lattice_bcif
+from src.io.cif.read.mesh import parse_mesh_bcif
+from src.models.cvsx.cvsx_file import CVSXFile
+from src.models.mvsx.mvsx_options import MVSXConversionOptions
+from src.models.mvsx.mvsx_segmentation import (
+    MVSXSegmentation,
+    MVSXSegmentationMember,
+)
+from src.pipeline import Pipeline, Stage
+
+
+def get_segmentation_members(
+    cvsx_file: CVSXFile,
+    columnar_primitives: bool = False,
+) -> list[MVSXSegmentationMember]:
+    # same order as the get_list_of_all_* converters
+    members: list[MVSXSegmentationMember] = []
+
+    for mesh_segmentation in cvsx_file.index.meshSegmentations or []:
+        for source_filepath in mesh_segmentation.segmentsFilenames:
+            _, segmentation_id, timeframe_id = get_info_from_mesh_filepath(
+                source_filepath
+            )
+            members.append(
+                MVSXSegmentationMember(
+                    kind="mesh",
+                    source_filepath=source_filepath,
+                    segmentation_id=segmentation_id,
+                    timeframe_id=timeframe_id,
+                )
+            )
+
+    lattice_segmentations = cvsx_file.index.latticeSegmentations or {}
+    for source_filepath, segmentation_info in lattice_segmentations.items():
+        members.append(
+            MVSXSegmentationMember(
+                kind="lattice",
+                source_filepath=source_filepath,
+                segmentation_id=segmentation_info.segmentationId,
+                timeframe_id=segmentation_info.timeframeIndex,
+            )
+        )
+
+    geometric_segmentations = cvsx_file.index.geometricSegmentations or {}
+    for source_filepath, segmentation_info in geometric_segmentations.items():
+        members.append(
+            MVSXSegmentationMember(
+                kind="primitive_set" if columnar_primitives else "primitive",
+                source_filepath=source_filepath,
+                segmentation_id=segmentation_info.segmentationId,
+                timeframe_id=segmentation_info.timeframeIndex,
+            )
+        )
+
+    return members
+
+
+class SegmentationStages:
+    """
+    Stage functions converting the segmentation members of a CVSX entry:
+    read gives the raw member, parse its CIF or JSON model (one item per
+    segment for lattices, so they are meshed concurrently) and geometry
+    the MVSX segmentations. Lattice members whose segments are all in the
+    geometry cache are neither read nor parsed, and lattice segments that
+    did not change since the previous timeframe are not meshed again. With
+    segment_ids, other segments of lattice and geometric members are left
+    out.
+    """
+
+    def __init__(
+        self,
+        cvsx_file: CVSXFile,
+        geometry_cache: GeometryCache | None = None,
+        segment_ids: list[int] | None = None,
+    ):
+        self.cvsx_file = cvsx_file
+        self.geometry_cache = geometry_cache
+        self.segment_ids = segment_ids
+        self.member_keys = {}
+        if geometry_cache is not None:
+            self.member_keys = get_member_keys(cvsx_file.filepath)
+        self.previous_meshes = PreviousMeshes()
+        self.annotations = get_segmentation_annotations(cvsx_file)
+        self.descriptions = {
+            kind: get_segmentation_descriptions(cvsx_file, kind)
+            for kind in ["mesh", "lattice", "primitive"]
+        }
+
+    def read(
+        self,
+        member: MVSXSegmentationMember,
+    ) -> Iterator[tuple[MVSXSegmentationMember, bytes | None]]:
+        if member.kind == "lattice" and self._get_cached_segment_ids(member):
+            yield member, None
+            return
+        data = read_file_from_zip(self.cvsx_file.filepath, member.source_filepath)
+        yield member, data
+
+    def _get_cached_segment_ids(
+        self,
+        member: MVSXSegmentationMember,
+    ) -> list[int] | None:
+        # None unless the segment ids and all segments are cached
+        if self.geometry_cache is None:
+            return None
+        member_key = self.member_keys[member.source_filepath]
+        segment_ids = self.geometry_cache.get_segment_ids(member_key)
+        if segment_ids is None:
+            return None
+        segment_ids = self._select_segment_ids(segment_ids)
+        for segment_id in segment_ids:
+            if not self.geometry_cache.has(member_key, segment_id, SMOOTH_ITERATIONS):
+                return None
+        return segment_ids
+
+    def _select_segment_ids(self, segment_ids: list[int]) -> list[int]:
+        return [i for i in segment_ids if is_selected(self.segment_ids, i)]
+
+    def parse(
+        self,
+        item: tuple[MVSXSegmentationMember, bytes | None],
+    ) -> Iterator[tuple[MVSXSegmentationMember, Any, int | None, str | None]]:
+        # items are the member, its model, the segment id and mask hash of
+        # lattice segments
+        member, data = item
+        if member.kind == "mesh":
+            yield member, parse_mesh_bcif(data), None, None
+        elif member.kind == "lattice" and data is None:
+            for segment_id in self._get_cached_segment_ids(member) or []:
+                yield member, None, segment_id, None
+        elif member.kind == "lattice":
+            lattice_cif = parse_lattice_bcif(data)
+            segment_ids = list(get_lattice_segment_ids(lattice_cif))
+            if self.geometry_cache is not None:
+                self.geometry_cache.put_segment_ids(
+                    self.member_keys[member.source_filepath], segment_ids
+                )
+            mask_hashes = get_segment_mask_hashes(lattice_cif)
+            for segment_id in self._select_segment_ids(segment_ids):
+                yield member, lattice_cif, segment_id, mask_hashes.get(segment_id)
+        elif member.kind == "primitive":
+            shape_data = parse_geometric_json(data)
+            if self.segment_ids is not None:
+                shape_data = select_shapes(shape_data, self.segment_ids)
+            yield member, shape_data, None, None
+        elif member.kind == "primitive_set":
+            shapes = parse_geometric_json_columns(data)
+            if self.segment_ids is not None:
+                shapes = select_shape_columns(shapes, self.segment_ids)
+                if not len(shapes.segment_ids()):
+                    return
+            yield member, shapes, None, None
+        else:
+            raise ValueError(f"Unknown member kind: {member.kind}")
+
+    def geometry(
+        self,
+        item: tuple[MVSXSegmentationMember, Any, int | None, str | None],
+    ) -> list[MVSXSegmentation]:
+        member, parsed, segment_id, mask_hash = item
+        if member.kind == "mesh":
+            return [
+                get_mesh_segmentation(
+                    member.source_filepath,
+                    parsed,
+                    self.annotations,
+                    self.descriptions["mesh"],
+                )
+            ]
+        if member.kind == "lattice":
+            member_key = self.member_keys.get(member.source_filepath)
+            mesh_data = self.previous_meshes.get(
+                (member.segmentation_id, segment_id),
+                mask_hash,
+                partial(
+                    get_lattice_segment_mesh,
+                    parsed,
+                    segment_id,
+                    self.geometry_cache,
+                    member_key,
+                ),
+            )
+            if mesh_data is None:
+                # removed from the cache since it was read
+                lattice_cif = get_lattice_cif(
+                    self.cvsx_file.filepath, member.source_filepath
+                )
+                mesh_data = get_lattice_segment_mesh(
+                    lattice_cif, segment_id, self.geometry_cache, member_key
+                )
+            return [
+                get_lattice_segmentation(
+                    member.source_filepath,
+                    member.segmentation_id,
+                    member.timeframe_id,
+                    segment_id,
+                    mesh_data,
+                    self.annotations,
+                    self.descriptions["lattice"],
+                )
+            ]
+        if member.kind == "primitive":
+            return get_geometric_segmentations(
+                member.source_filepath,
+                member.segmentation_id,
+                member.timeframe_id,
+                parsed,
+                self.annotations,
+                self.descriptions["primitive"],
+            )
+        return [
+            get_geometric_segmentation_set(
+                member.source_filepath,
+                member.segmentation_id,
+                member.timeframe_id,
+                parsed,
+                self.annotations,
+                self.descriptions["primitive"],
+            )
+        ]
+
+
+def get_geometry_cache(options: MVSXConversionOptions) -> GeometryCache | None:
+    if options.geometry_cache_dir is None:
+        return None
+    return GeometryCache(options.geometry_cache_dir)
+
+
+def iter_member_segmentations(
+    cvsx_file: CVSXFile,
+    members: list[MVSXSegmentationMember],
+    options: MVSXConversionOptions,
+) -> Iterator[MVSXSegmentation]:
+    # one segment at a time in the order of the members. With
+    # options.pipeline, later members are read and meshed meanwhile
+    segment_ids = options.selection.segment_ids if options.selection else None
+    stages = SegmentationStages(cvsx_file, get_geometry_cache(options), segment_ids)
+    if options.pipeline is None:
+        for member in members:
+            for item in stages.read(member):
+                for parsed in stages.parse(item):
+                    yield from stages.geometry(parsed)
+        return
+
+    pipeline = Pipeline(
+        [
+            Stage("read", stages.read, options.pipeline.read_workers),
+            Stage("parse", stages.parse, options.pipeline.parse_workers),
+            Stage("geometry", stages.geometry, options.pipeline.geometry_workers),
+        ],
+        queue_size=options.pipeline.queue_size,
+    )
+    yield from pipeline.run(members)
+
+
+def iter_pipeline_segmentations(
+    cvsx_file: CVSXFile,
+    options: MVSXConversionOptions,
+) -> Iterator[MVSXSegmentation]:
+    # yields the segmentations of the get_list_of_all_* converters, in the
+    # same order
+    members = get_segmentation_members(cvsx_file, options.columnar_primitives)
+    yield from iter_member_segmentations(cvsx_file, members, options)
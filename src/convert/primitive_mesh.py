@@ -0,0 +1,176 @@
+from functools import lru_cache
+
+import numpy as np
+
+MIN_SEGMENTS = 6
+MAX_SEGMENTS = 32
+
+# Unit pyramid (apex at top, square base at bottom)
+PYRAMID_VERTICES = np.array(
+    [
+        [-0.5, -0.5, 0],
+        [0.5, -0.5, 0],
+        [0.5, 0.5, 0],
+        [-0.5, 0.5, 0],
+        [0, 0, 1],
+    ],
+    dtype=np.float64,
+)
+
+# Triangular faces with correct winding order (counter-clockwise from outside)
+PYRAMID_INDICES = np.array(
+    [
+        # Base (2 triangles) - looking from below, counter-clockwise
+        [0, 2, 1],
+        [0, 3, 2],
+        # Sides (4 triangles) - looking from outside, counter-clockwise
+        [0, 1, 4],
+        [1, 2, 4],
+        [2, 3, 4],
+        [3, 0, 4],
+    ],
+    dtype=np.int32,
+)
+
+
+def choose_num_segments(
+    radius: float | np.ndarray,
+    max_edge_length: float = 1.0,
+    min_segments: int = MIN_SEGMENTS,
+    max_segments: int = MAX_SEGMENTS,
+) -> int | np.ndarray:
+    # enough segments to keep the circle edges below max_edge_length
+    num_segments = np.ceil(2 * np.pi * np.asarray(radius) / max_edge_length)
+    num_segments = np.clip(num_segments, min_segments, max_segments).astype(int)
+    if num_segments.ndim == 0:
+        return int(num_segments)
+    return num_segments
+
+
+@lru_cache(maxsize=None)
+def get_frustum_template(num_segments: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Unit circle and triangle indices shared by all frustums with the same
+    number of segments. Vertex layout: bottom ring, top ring, bottom center,
+    top center.
+    """
+    angles = np.linspace(0, 2 * np.pi, num_segments, endpoint=False)
+    circle = np.column_stack((np.cos(angles), np.sin(angles)))
+
+    i = np.arange(num_segments)
+    next_i = (i + 1) % num_segments
+    bottom_center = np.full(num_segments, 2 * num_segments)
+    top_center = np.full(num_segments, 2 * num_segments + 1)
+
+    sides = np.concatenate(
+        (
+            np.column_stack((i, next_i, i + num_segments)),
+            np.column_stack((next_i, next_i + num_segments, i + num_segments)),
+        )
+    )
+    # keep the original order: two triangles per side segment
+    sides = sides.reshape(2, num_segments, 3).transpose(1, 0, 2).reshape(-1, 3)
+    bottom_cap = np.column_stack((bottom_center, next_i, i))
+    top_cap = np.column_stack((top_center, i + num_segments, next_i + num_segments))
+
+    indices = np.concatenate((sides, bottom_cap, top_cap)).astype(np.int32)
+
+    circle.setflags(write=False)
+    indices.setflags(write=False)
+    return circle, indices
+
+
+def get_frustum_frames(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """(N, 3, 3) rotations whose columns are (perp1, perp2, direction)"""
+    directions = ends - starts
+    heights = np.linalg.norm(directions, axis=1, keepdims=True)
+    directions = directions / heights
+
+    # Find perpendicular vectors for circle generation
+    reference = np.where(
+        np.abs(directions[:, 2:3]) < 0.9,
+        np.array([0.0, 0.0, 1.0]),
+        np.array([1.0, 0.0, 0.0]),
+    )
+    perp1 = np.cross(directions, reference)
+    perp1 /= np.linalg.norm(perp1, axis=1, keepdims=True)
+    perp2 = np.cross(directions, perp1)
+
+    return np.stack((perp1, perp2, directions), axis=2)
+
+
+def _batch_indices(
+    template: np.ndarray,
+    count: int,
+    vertices_per_shape: int,
+) -> np.ndarray:
+    offsets = np.arange(count, dtype=np.int64)[:, None, None] * vertices_per_shape
+    return (template[None, :, :] + offsets).reshape(-1, 3)
+
+
+def _batch_groups(
+    group_ids: np.ndarray | None,
+    count: int,
+    triangles_per_shape: int,
+) -> np.ndarray:
+    if group_ids is None:
+        group_ids = np.arange(count, dtype=np.int32)
+    return np.repeat(np.asarray(group_ids, dtype=np.int32), triangles_per_shape)
+
+
+def generate_frustum_meshes(
+    starts: np.ndarray,
+    ends: np.ndarray,
+    radii_bottom: np.ndarray,
+    radii_top: np.ndarray,
+    num_segments: int,
+    group_ids: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Meshes of N tapered cylinders with the same number of segments.
+    Returns (N*V, 3) vertices, (N*T, 3) indices and (N*T,) triangle groups,
+    where the triangle group is the shape index unless group_ids is given.
+    """
+    starts = np.asarray(starts, dtype=np.float64).reshape(-1, 3)
+    ends = np.asarray(ends, dtype=np.float64).reshape(-1, 3)
+    radii_bottom = np.asarray(radii_bottom, dtype=np.float64).reshape(-1)
+    radii_top = np.asarray(radii_top, dtype=np.float64).reshape(-1)
+    count = len(starts)
+
+    circle, template_indices = get_frustum_template(num_segments)
+    heights = np.linalg.norm(ends - starts, axis=1)
+
+    # vertices in the local frame of each frustum
+    local = np.zeros((count, 2 * num_segments + 2, 3))
+    local[:, :num_segments, :2] = circle[None] * radii_bottom[:, None, None]
+    local[:, num_segments : 2 * num_segments, :2] = (
+        circle[None] * radii_top[:, None, None]
+    )
+    local[:, num_segments : 2 * num_segments, 2] = heights[:, None]
+    local[:, -1, 2] = heights
+
+    frames = get_frustum_frames(starts, ends)
+    vertices = local @ frames.transpose(0, 2, 1) + starts[:, None, :]
+
+    indices = _batch_indices(template_indices, count, 2 * num_segments + 2)
+    triangle_groups = _batch_groups(group_ids, count, len(template_indices))
+
+    return vertices.reshape(-1, 3), indices, triangle_groups
+
+
+def generate_pyramid_meshes(
+    transforms: np.ndarray,
+    group_ids: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Meshes of N pyramids given their (N, 4, 4) unit pyramid transforms"""
+    count = len(transforms)
+
+    vertices = (
+        PYRAMID_VERTICES[None] @ transforms[:, :3, :3].transpose(0, 2, 1)
+        + transforms[:, None, :3, 3]
+    )
+
+    indices = _batch_indices(PYRAMID_INDICES, count, len(PYRAMID_VERTICES))
+    triangle_groups = _batch_groups(group_ids, count, len(PYRAMID_INDICES))
+
+    return vertices.reshape(-1, 3), indices, triangle_groups
@@ -0,0 +1,114 @@
+import math
+from typing import Any
+
+import numpy as np
+from molviewspec.nodes import Node
+
+from src.models.mvsx.mvsx_options import CoordinateUnit
+
+# primitive params holding positions or lengths in Å. Directions (ellipsoid
+# axes) are not coordinates and keep full precision
+COORDINATE_PARAMS: dict[str, list[str]] = {
+    "mesh": ["vertices"],
+    "sphere": ["center", "radius"],
+    "ellipsoid": ["center", "radius"],
+    "tube": ["start", "end", "radius"],
+    "box": ["center", "extent"],
+}
+# translation entries of a column major 4x4 transform
+TRANSLATION = [12, 13, 14]
+
+
+def get_coordinate_step(
+    precision: float | None,
+    unit: CoordinateUnit,
+    voxel_size: np.ndarray | None = None,
+) -> float | None:
+    if precision is None:
+        return None
+    if unit == "angstrom":
+        return precision
+    if voxel_size is None:
+        # an entry without a volume grid keeps full precision
+        return None
+    return precision * float(np.min(voxel_size))
+
+
+def get_coordinate_decimals(step: float | None) -> int | None:
+    # decimal places of the coarsest decimal grid not coarser than step,
+    # rounding to it moves a coordinate by at most step / 2
+    if step is None:
+        return None
+    return max(0, math.ceil(-math.log10(step) - 1e-9))
+
+
+def quantize(values: Any, decimals: int) -> Any:
+    # float64 first, rounded float32 values are not exact
+    rounded = np.round(np.asarray(values, dtype=np.float64), decimals)
+    if isinstance(values, np.ndarray):
+        return rounded
+    return rounded.tolist()
+
+
+def get_template_extent(children: list) -> float:
+    # largest absolute coordinate of the unit geometry under an instanced
+    # primitives node
+    extent = 0.0
+    for child in children:
+        params = child["params"] if isinstance(child, dict) else child.params
+        if not params:
+            continue
+        if params.get("kind") == "box":
+            center = np.abs(np.asarray(params.get("center", (0, 0, 0)), dtype=float))
+            half = np.abs(np.asarray(params.get("extent", (0, 0, 0)), dtype=float))
+            extent = max(extent, float(np.max(center + half)))
+        elif params.get("kind") == "mesh":
+            vertices = np.abs(np.asarray(params["vertices"], dtype=float))
+            extent = max(extent, float(np.max(vertices, initial=0)))
+    return extent
+
+
+def quantize_instances(instances: Any, decimals: int, extent: float) -> Any:
+    # column major 4x4 transforms. A template vertex v moves by the
+    # translation error plus the linear part error times up to 3 * |v|, so
+    # the linear part is rounded to a step scaled down by the extent
+    matrices = np.asarray(instances, dtype=np.float64)
+    linear_decimals = decimals
+    if extent > 0:
+        linear_decimals = get_coordinate_decimals(10.0**-decimals / (3 * extent))
+    rounded = np.round(matrices, linear_decimals)
+    rounded[..., TRANSLATION] = np.round(matrices[..., TRANSLATION], decimals)
+    if isinstance(instances, np.ndarray):
+        return rounded
+    return rounded.tolist()
+
+
+def quantize_node(node: Node | dict, decimals: int | None) -> Node | dict:
+    """
+    Rounds the coordinates of all primitives under node in place. The unit
+    geometry of instanced primitives is kept as it is and only their
+    transforms are rounded, so a vertex moves by at most about one step.
+    """
+    if decimals is None:
+        return node
+
+    if isinstance(node, dict):
+        kind, params, children = node["kind"], node.get("params"), node.get("children")
+    else:
+        kind, params, children = node.kind, node.params, node.children
+
+    if params:
+        if kind == "primitives" and params.get("instances") is not None:
+            params["instances"] = quantize_instances(
+                params["instances"], decimals, get_template_extent(children or [])
+            )
+            return node
+        if kind == "primitive":
+            for key in COORDINATE_PARAMS.get(params["kind"], []):
+                if params.get(key) is not None:
+                    params[key] = quantize(params[key], decimals)
+
+    for child in children or []:
+        quantize_node(child, decimals)
+
+    return node
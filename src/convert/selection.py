@@ -0,0 +1,158 @@
+import numpy as np
+
+from src.convert.mesh import get_info_from_mesh_filepath
+from src.models.cvsx.cvsx_index import (
+    CVSXSegmentationEntry,
+    CVSXTimeframeIndex,
+    CVSXVolumeEntry,
+)
+from src.models.mvsx.mvsx_options import ConversionSelection, MVSXConversionOptions
+from src.models.mvsx.mvsx_segmentation import MVSXSegmentationMember
+from src.models.mvsx.mvsx_volume import MVSXVolume
+from src.models.read.geometric import ShapePrimitiveColumns, ShapePrimitiveData
+
+
+def is_selected(selected: list | None, value) -> bool:
+    return selected is None or value in selected
+
+
+def select_timeframes(
+    timeframes: CVSXTimeframeIndex,
+    selection: ConversionSelection,
+) -> CVSXTimeframeIndex:
+    # every selected timeframe lists what its snapshot shows, the latest
+    # volume of every channel and the latest members of every segmentation
+    # up to the timeframe, so static volumes stay in later timeframes
+    latest_volumes: dict[str, list[CVSXVolumeEntry]] = {}
+    latest_segmentations: dict[tuple[str, str], list[CVSXSegmentationEntry]] = {}
+    volumes: dict[int, dict[str, list[CVSXVolumeEntry]]] = {}
+    segmentations: dict[int, dict[str, list[CVSXSegmentationEntry]]] = {}
+    for timeframe_id in sorted({*timeframes.volumes, *timeframes.segmentations}):
+        channels = timeframes.volumes.get(timeframe_id, {})
+        for channel_id, entries in channels.items():
+            if is_selected(selection.channel_ids, channel_id):
+                latest_volumes[channel_id] = entries
+
+        segmentation_ids = timeframes.segmentations.get(timeframe_id, {})
+        timeframe_segmentations: dict[tuple[str, str], list] = {}
+        for segmentation_id, entries in segmentation_ids.items():
+            if not is_selected(selection.segmentation_ids, segmentation_id):
+                continue
+            for entry in entries:
+                if not is_selected(selection.segmentation_kinds, entry.kind):
+                    continue
+                key = (segmentation_id, entry.kind)
+                if key not in timeframe_segmentations:
+                    timeframe_segmentations[key] = []
+                timeframe_segmentations[key].append(entry)
+        latest_segmentations.update(timeframe_segmentations)
+
+        if not is_selected(selection.timeframes, timeframe_id):
+            continue
+        if latest_volumes:
+            volumes[timeframe_id] = dict(latest_volumes)
+        selected_segmentations: dict[str, list[CVSXSegmentationEntry]] = {}
+        for (segmentation_id, _), entries in latest_segmentations.items():
+            if segmentation_id not in selected_segmentations:
+                selected_segmentations[segmentation_id] = []
+            selected_segmentations[segmentation_id] += entries
+        if selected_segmentations:
+            segmentations[timeframe_id] = selected_segmentations
+
+    return CVSXTimeframeIndex(volumes=volumes, segmentations=segmentations)
+
+
+def get_first_timeframe(timeframes: CVSXTimeframeIndex) -> CVSXTimeframeIndex:
+    # the first timeframe with volumes and the first with segmentations, as
+    # in the first snapshot
+    return CVSXTimeframeIndex(
+        volumes=dict(list(timeframes.volumes.items())[:1]),
+        segmentations=dict(list(timeframes.segmentations.items())[:1]),
+    )
+
+
+def get_converted_timeframes(
+    timeframes: CVSXTimeframeIndex,
+    options: MVSXConversionOptions,
+) -> tuple[CVSXTimeframeIndex, CVSXTimeframeIndex]:
+    # the timeframes whose volumes and whose segmentations are converted.
+    # Without all_timeframes only the first snapshot is converted, but the
+    # crop covers the segmentations of all timeframes
+    if options.all_timeframes:
+        return timeframes, timeframes
+    first = get_first_timeframe(timeframes)
+    if options.crop_to_segmentations:
+        return first, timeframes
+    return first, first
+
+
+def get_volume_sources(timeframes: CVSXTimeframeIndex) -> set[str]:
+    return {
+        entry.source_filepath
+        for channels in timeframes.volumes.values()
+        for entries in channels.values()
+        for entry in entries
+    }
+
+
+def get_segmentation_sources(timeframes: CVSXTimeframeIndex) -> set[str]:
+    return {
+        entry.source_filepath
+        for segmentation_ids in timeframes.segmentations.values()
+        for entries in segmentation_ids.values()
+        for entry in entries
+    }
+
+
+def select_volumes(
+    volumes: list[MVSXVolume],
+    timeframes: CVSXTimeframeIndex,
+) -> list[MVSXVolume]:
+    source_filepaths = get_volume_sources(timeframes)
+    return [volume for volume in volumes if volume.source_filepath in source_filepaths]
+
+
+def select_segmentation_members(
+    members: list[MVSXSegmentationMember],
+    timeframes: CVSXTimeframeIndex,
+    segment_ids: list[int] | None = None,
+) -> list[MVSXSegmentationMember]:
+    # mesh members hold a single segment, named in their filename
+    source_filepaths = get_segmentation_sources(timeframes)
+    selected = []
+    for member in members:
+        if member.source_filepath not in source_filepaths:
+            continue
+        if member.kind == "mesh":
+            segment_id, _, _ = get_info_from_mesh_filepath(member.source_filepath)
+            if not is_selected(segment_ids, segment_id):
+                continue
+        selected.append(member)
+    return selected
+
+
+def select_shapes(
+    shape_data: ShapePrimitiveData,
+    segment_ids: list[int],
+) -> ShapePrimitiveData:
+    return ShapePrimitiveData(
+        shape_primitive_list=[
+            shape
+            for shape in shape_data.shape_primitive_list
+            if shape.id in segment_ids
+        ]
+    )
+
+
+def select_shape_columns(
+    shapes: ShapePrimitiveColumns,
+    segment_ids: list[int],
+) -> ShapePrimitiveColumns:
+    # the same rows of every column of a kind
+    selected = {}
+    for kind, columns in shapes:
+        mask = np.isin(columns.id, segment_ids)
+        selected[kind] = type(columns)(
+            **{name: values[mask] for name, values in columns}
+        )
+    return ShapePrimitiveColumns(**selected)
@@ -1,10 +1,22 @@
+import math
+from typing import Iterator
+from urllib.parse import quote
+from uuid import uuid4
 from zipfile import ZipFile
 
+import numpy as np
+
+from src.convert.bounds import Bounds
+from src.io.cif.read.header import read_bcif_row_counts
 from src.io.cif.read.volume import parse_volume_bcif
 from src.models.cvsx.cvsx_annotations import ChannelAnnotation
 from src.models.cvsx.cvsx_file import CVSXFile
+from src.models.cvsx.cvsx_metadata import SamplingBox, VolumeDescriptiveStatistics
 from src.models.mvsx.mvsx_entry import MVSXVolume
-from src.models.read.volume import VolumeCif
+from src.models.mvsx.mvsx_options import VolumeSlices
+from src.models.mvsx.mvsx_report import MVSXVolumeEncodingReport
+from src.models.read.volume import VolumeBlock, VolumeCif, VolumeData3d
+from src.models.write.encoders import get_quantization_range
 from src.utils import get_hex_color
 
 
@@ -25,6 +37,96 @@ def get_volume_cif(cvsx_path: str, inner_path: str) -> VolumeCif:
             return volume_cif
 
 
+def get_sampling_box(
+    cvsx_file: CVSXFile,
+    voxels: int | None = None,
+) -> tuple[int, SamplingBox] | None:
+    # the sample rate and volume sampling box with the nearest number of
+    # samples, the finest box without voxels
+    boxes = cvsx_file.metadata.volumes.volume_sampling_info.boxes
+    if not boxes:
+        return None
+    if not voxels:
+        return min(boxes.items())
+    return min(
+        boxes.items(),
+        key=lambda item: abs(
+            math.log(max(math.prod(item[1].grid_dimensions), 1) / voxels)
+        ),
+    )
+
+
+def get_entry_voxel_size(
+    cvsx_file: CVSXFile,
+    volumes: list[MVSXVolume],
+) -> np.ndarray | None:
+    # all volumes of an entry share the grid. The sampling box comes from
+    # the metadata, matched by the sample count in the header of the first
+    # converted volume, no volume data is decoded
+    voxels = None
+    if volumes:
+        with ZipFile(cvsx_file.filepath, "r") as z:
+            with z.open(volumes[0].source_filepath) as f:
+                voxels = read_bcif_row_counts(f).get("volume_data_3d")
+    sampling_box = get_sampling_box(cvsx_file, voxels)
+    if sampling_box is None:
+        return None
+    _, box = sampling_box
+    return np.array(box.voxel_size, dtype=np.float64)
+
+
+def get_volume_statistics(
+    cvsx_file: CVSXFile,
+    volume: MVSXVolume,
+    sample_rate: int,
+) -> VolumeDescriptiveStatistics | None:
+    # statistics are listed by sampling level, timeframe and channel
+    sampling_info = cvsx_file.metadata.volumes.volume_sampling_info
+    level_statistics = sampling_info.descriptive_statistics.get(sample_rate, {})
+    timeframe_statistics = level_statistics.get(volume.timeframe_id, {})
+    return timeframe_statistics.get(volume.channel_id)
+
+
+def get_volume_encoding_report(
+    cvsx_file: CVSXFile,
+    volume: MVSXVolume,
+    volume_cif: VolumeCif,
+    num_bits: int,
+    size: int,
+) -> MVSXVolumeEncodingReport:
+    # decodes the values the way the interval quantization of
+    # decide_encoder encodes them
+    values = volume_cif.volume_block.volume_data_3d.values
+    minimum, maximum = get_quantization_range(values)
+    step = (maximum - minimum) / (2**num_bits - 2)
+    steps = np.round((np.clip(values, minimum, maximum) - minimum) / step)
+    error = (minimum + steps * step).astype(values.dtype) - values
+
+    info = volume_cif.volume_block.volume_data_3d_info
+    return MVSXVolumeEncodingReport(
+        filepath=volume.destination_filepath,
+        num_bits=num_bits,
+        source_bytes=values.nbytes,
+        bytes=size,
+        max_error=float(np.abs(error).max(initial=0)),
+        rms_error=float(np.sqrt(np.mean(np.square(error), dtype=np.float64))),
+        statistics=get_volume_statistics(cvsx_file, volume, info.sample_rate),
+    )
+
+
+def get_volume_url(
+    url_template: str,
+    cvsx_file: CVSXFile,
+    volume: MVSXVolume,
+) -> str:
+    # e.g. http://localhost:8000/cvsx/{cvsx_path}/{member} for the member
+    # endpoint of api/api.py
+    return url_template.format(
+        cvsx_path=quote(cvsx_file.filepath),
+        member=quote(volume.source_filepath),
+    )
+
+
 def get_list_of_all_volumes(cvsx_file: CVSXFile) -> list[MVSXVolume]:
     mvsx_volumes = []
     annotations = get_volume_annotations(cvsx_file)
@@ -52,3 +154,222 @@ def get_list_of_all_volumes(cvsx_file: CVSXFile) -> list[MVSXVolume]:
         mvsx_volumes.append(mvsx_volume)
 
     return mvsx_volumes
+
+
+# separable kernel the volume server downsamples with
+DOWNSAMPLING_KERNEL = np.array([1, 4, 6, 4, 1], dtype=np.float32) / 16
+
+
+def downsample_axis(values: np.ndarray, axis: int) -> np.ndarray:
+    # sample j of the result is centered on sample 2j of the input, so
+    # the grid keeps its origin and an odd sample count keeps its last
+    # sample
+    count = math.ceil(values.shape[axis] / 2)
+    pad_width = [(0, 0)] * values.ndim
+    pad_width[axis] = (2, 2)
+    padded = np.pad(values, pad_width, mode="edge")
+
+    result = np.zeros(
+        values.shape[:axis] + (count,) + values.shape[axis + 1 :],
+        dtype=np.float32,
+    )
+    for offset, weight in enumerate(DOWNSAMPLING_KERNEL):
+        taps = [slice(None)] * values.ndim
+        taps[axis] = slice(offset, offset + 2 * count - 1, 2)
+        result += weight * padded[tuple(taps)]
+    return result
+
+
+def replace_volume_values(
+    volume_cif: VolumeCif,
+    values: np.ndarray,
+    info_update: dict,
+) -> VolumeCif:
+    # values in the (slow, ..., fast) axis order of the sample counts, the
+    # sampled statistics are recomputed
+    block = volume_cif.volume_block
+    info = block.volume_data_3d_info.model_copy(
+        update={
+            **info_update,
+            "sample_count_0": values.shape[2],
+            "sample_count_1": values.shape[1],
+            "sample_count_2": values.shape[0],
+            "mean_sampled": float(values.mean()),
+            "sigma_sampled": float(values.std()),
+            "min_sampled": float(values.min()),
+            "max_sampled": float(values.max()),
+        }
+    )
+
+    return VolumeCif(
+        volume_block=VolumeBlock(
+            volume_data_3d_info=info,
+            volume_data_time_and_channel_info=(block.volume_data_time_and_channel_info),
+            volume_data_3d=VolumeData3d(values=np.ascontiguousarray(values).ravel()),
+        )
+    )
+
+
+def get_volume_values(volume_cif: VolumeCif) -> np.ndarray:
+    # values are stored with the first axis fastest
+    info = volume_cif.volume_block.volume_data_3d_info
+    counts = (info.sample_count_2, info.sample_count_1, info.sample_count_0)
+    return volume_cif.volume_block.volume_data_3d.values.reshape(counts)
+
+
+def downsample_volume_cif(volume_cif: VolumeCif) -> VolumeCif:
+    """
+    Halves the sampling of a volume along every axis. The fractional origin
+    stays and the fractional dimensions grow with the padding of odd sample
+    counts, so the voxel size doubles exactly.
+    """
+    info = volume_cif.volume_block.volume_data_3d_info
+    values = get_volume_values(volume_cif)
+    counts = values.shape[::-1]
+
+    for axis in range(3):
+        values = downsample_axis(values, axis)
+    scales = [2 * n / c for n, c in zip(values.shape[::-1], counts)]
+
+    return replace_volume_values(
+        volume_cif,
+        values,
+        {
+            "sample_rate": info.sample_rate * 2,
+            "dimensions_0": info.dimensions_0 * scales[0],
+            "dimensions_1": info.dimensions_1 * scales[1],
+            "dimensions_2": info.dimensions_2 * scales[2],
+        },
+    )
+
+
+def crop_volume_cif(volume_cif: VolumeCif, bounds: Bounds) -> VolumeCif:
+    """
+    Crops a volume to the samples covering bounds (Å). As in mol*, sample i
+    of an axis is at (origin + dimensions * i / count) * cell size in
+    fractional coordinates of an orthogonal cell, the cropped grid keeps
+    the position of every sample. Sample counts, origin and dimensions are
+    in axis order, bounds and cell size in x, y, z. A volume the bounds do
+    not overlap is kept whole.
+    """
+    info = volume_cif.volume_block.volume_data_3d_info
+    axis_order = [info.axis_order_0, info.axis_order_1, info.axis_order_2]
+    counts = np.array([info.sample_count_0, info.sample_count_1, info.sample_count_2])
+    origin = np.array([info.origin_0, info.origin_1, info.origin_2])
+    dimensions = np.array([info.dimensions_0, info.dimensions_1, info.dimensions_2])
+    cell_size = np.array(
+        [
+            info.spacegroup_cell_size_0,
+            info.spacegroup_cell_size_1,
+            info.spacegroup_cell_size_2,
+        ]
+    )[axis_order]
+
+    lower, upper = (np.asarray(bound)[axis_order] for bound in bounds)
+    start = np.floor((lower / cell_size - origin) / dimensions * counts)
+    stop = np.ceil((upper / cell_size - origin) / dimensions * counts) + 1
+    start = np.clip(start, 0, counts).astype(int)
+    stop = np.clip(stop, 0, counts).astype(int)
+    if np.any(stop <= start):
+        return volume_cif
+
+    values = get_volume_values(volume_cif)[
+        start[2] : stop[2], start[1] : stop[1], start[0] : stop[0]
+    ]
+    new_origin = origin + dimensions * start / counts
+    new_dimensions = dimensions * (stop - start) / counts
+
+    return replace_volume_values(
+        volume_cif,
+        values,
+        {
+            "origin_0": float(new_origin[0]),
+            "origin_1": float(new_origin[1]),
+            "origin_2": float(new_origin[2]),
+            "dimensions_0": float(new_dimensions[0]),
+            "dimensions_1": float(new_dimensions[1]),
+            "dimensions_2": float(new_dimensions[2]),
+        },
+    )
+
+
+def slice_volume_cif(volume_cif: VolumeCif, slices: VolumeSlices) -> VolumeCif:
+    """
+    Keeps only the z slices shown by the grid_slice representation: the
+    central one or every slices-th one. The z component is the one with
+    axis order 2, its fractional origin and dimensions are moved so the
+    kept slices stay in place.
+    """
+    info = volume_cif.volume_block.volume_data_3d_info
+    axis_order = [info.axis_order_0, info.axis_order_1, info.axis_order_2]
+    component = axis_order.index(2)
+    count = [info.sample_count_0, info.sample_count_1, info.sample_count_2][component]
+    origin = [info.origin_0, info.origin_1, info.origin_2][component]
+    dimension = [info.dimensions_0, info.dimensions_1, info.dimensions_2][component]
+
+    if slices == "center":
+        start, stop, step = count // 2, count // 2 + 1, 1
+    elif slices >= 1:
+        start, stop, step = 0, count, slices
+    else:
+        raise ValueError(f"Invalid volume slices: {slices}")
+    num_slices = len(range(start, stop, step))
+
+    taps = [slice(None)] * 3
+    taps[2 - component] = slice(start, stop, step)
+    values = get_volume_values(volume_cif)[tuple(taps)]
+
+    return replace_volume_values(
+        volume_cif,
+        values,
+        {
+            f"origin_{component}": origin + dimension * start / count,
+            f"dimensions_{component}": dimension * step * num_slices / count,
+        },
+    )
+
+
+def get_pyramid_sample_rates(cvsx_file: CVSXFile, sample_rate: int) -> list[int]:
+    # the coarser levels the volume server has for the entry, each level
+    # halves the sampling of the previous one
+    sampling_info = cvsx_file.metadata.volumes.volume_sampling_info
+    rates = []
+    for level in sampling_info.spatial_downsampling_levels:
+        if not level.available or level.level <= sample_rate:
+            continue
+        factor = level.level // sample_rate
+        if level.level % sample_rate == 0 and factor & (factor - 1) == 0:
+            rates.append(level.level)
+    return sorted(rates)
+
+
+def get_level_filepath(filepath: str, sample_rate: int) -> str:
+    stem, dot, extension = filepath.rpartition(".")
+    if not dot:
+        return f"{filepath}_rate_{sample_rate}"
+    return f"{stem}_rate_{sample_rate}.{extension}"
+
+
+def iter_volume_pyramid(
+    cvsx_file: CVSXFile,
+    volume: MVSXVolume,
+    volume_cif: VolumeCif,
+) -> Iterator[tuple[MVSXVolume, VolumeCif]]:
+    # downsampled levels of the volume from fine to coarse, every level is
+    # computed from the previous one
+    info = volume_cif.volume_block.volume_data_3d_info
+
+    for sample_rate in get_pyramid_sample_rates(cvsx_file, info.sample_rate):
+        while info.sample_rate < sample_rate:
+            volume_cif = downsample_volume_cif(volume_cif)
+            info = volume_cif.volume_block.volume_data_3d_info
+        level = volume.model_copy(
+            update={
+                "id": uuid4(),
+                "destination_filepath": get_level_filepath(
+                    volume.destination_filepath, sample_rate
+                ),
+                "sample_rate": sample_rate,
+            }
+        )
+        yield level, volume_cif
@@ -1,5 +1,102 @@
-from src.models.read.geometric import ShapePrimitiveData
+from itertools import chain
 
+import numpy as np
+from pydantic_core import from_json
 
-def parse_geometric_json(json_string: str) -> ShapePrimitiveData:
-    return ShapePrimitiveData.model_validate_json(json_string)
+from src.models.read.geometric import (
+    BoxColumns,
+    CylinderColumns,
+    EllipsoidColumns,
+    PyramidColumns,
+    ShapePrimitiveColumns,
+    ShapePrimitiveData,
+    SphereColumns,
+)
+
+
+def parse_geometric_json(json_data: bytes | str) -> ShapePrimitiveData:
+    return ShapePrimitiveData.model_validate_json(json_data)
+
+
+def _float_column(shapes: list[dict], key: str, width: int | None = None):
+    # fromiter avoids building an intermediate list per shape
+    if width is None:
+        values = (shape[key] for shape in shapes)
+        return np.fromiter(values, dtype=np.float64, count=len(shapes))
+
+    values = chain.from_iterable(shape[key] for shape in shapes)
+    return np.fromiter(values, dtype=np.float64, count=len(shapes) * width).reshape(
+        -1, width
+    )
+
+
+def _id_column(shapes: list[dict]) -> np.ndarray:
+    values = (shape["id"] for shape in shapes)
+    return np.fromiter(values, dtype=np.int64, count=len(shapes))
+
+
+def _rotation_columns(shapes: list[dict]) -> dict[str, np.ndarray]:
+    rotations = [shape["rotation"] for shape in shapes]
+    return dict(
+        rotation_axis=_float_column(rotations, "axis", 3),
+        rotation_radians=_float_column(rotations, "radians"),
+    )
+
+
+def parse_geometric_json_columns(json_data: bytes | str) -> ShapePrimitiveColumns:
+    try:
+        data = from_json(json_data)
+        shapes_by_kind: dict[str, list[dict]] = {
+            "sphere": [],
+            "box": [],
+            "cylinder": [],
+            "ellipsoid": [],
+            "pyramid": [],
+        }
+        for shape in data["shape_primitive_list"]:
+            kind = shape["kind"]
+            if kind not in shapes_by_kind:
+                raise ValueError(f"Unknown geometric primitives shape type: {kind}")
+            shapes_by_kind[kind].append(shape)
+
+        spheres = shapes_by_kind["sphere"]
+        boxes = shapes_by_kind["box"]
+        cylinders = shapes_by_kind["cylinder"]
+        ellipsoids = shapes_by_kind["ellipsoid"]
+        pyramids = shapes_by_kind["pyramid"]
+
+        return ShapePrimitiveColumns(
+            sphere=SphereColumns(
+                id=_id_column(spheres),
+                center=_float_column(spheres, "center", 3),
+                radius=_float_column(spheres, "radius"),
+            ),
+            box=BoxColumns(
+                id=_id_column(boxes),
+                translation=_float_column(boxes, "translation", 3),
+                scaling=_float_column(boxes, "scaling", 3),
+                **_rotation_columns(boxes),
+            ),
+            cylinder=CylinderColumns(
+                id=_id_column(cylinders),
+                start=_float_column(cylinders, "start", 3),
+                end=_float_column(cylinders, "end", 3),
+                radius_bottom=_float_column(cylinders, "radius_bottom"),
+                radius_top=_float_column(cylinders, "radius_top"),
+            ),
+            ellipsoid=EllipsoidColumns(
+                id=_id_column(ellipsoids),
+                dir_major=_float_column(ellipsoids, "dir_major", 3),
+                dir_minor=_float_column(ellipsoids, "dir_minor", 3),
+                center=_float_column(ellipsoids, "center", 3),
+                radius_scale=_float_column(ellipsoids, "radius_scale", 3),
+            ),
+            pyramid=PyramidColumns(
+                id=_id_column(pyramids),
+                translation=_float_column(pyramids, "translation", 3),
+                scaling=_float_column(pyramids, "scaling", 3),
+                **_rotation_columns(pyramids),
+            ),
+        )
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid geometric segmentation data: {e}")
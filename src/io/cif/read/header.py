@@ -0,0 +1,44 @@
+from typing import BinaryIO
+
+import msgpack
+
+READ_SIZE = 64 * 1024
+
+
+def read_bcif_row_counts(f: BinaryIO) -> dict[str, int]:
+    # row count of every category by name (without the leading "_"). The
+    # stream is read up to the row count of the last category, so its
+    # columns, the voxels of volumes and lattices, are never read
+    unpacker = msgpack.Unpacker(f, raw=False, read_size=READ_SIZE)
+    row_counts: dict[str, int] = {}
+    for _ in range(unpacker.read_map_header()):
+        if unpacker.unpack() != "dataBlocks":
+            unpacker.skip()
+            continue
+        num_blocks = unpacker.read_array_header()
+        for block_index in range(num_blocks):
+            for _ in range(unpacker.read_map_header()):
+                if unpacker.unpack() != "categories":
+                    unpacker.skip()
+                    continue
+                num_categories = unpacker.read_array_header()
+                for category_index in range(num_categories):
+                    last = (
+                        block_index == num_blocks - 1
+                        and category_index == num_categories - 1
+                    )
+                    name = row_count = None
+                    for _ in range(unpacker.read_map_header()):
+                        key = unpacker.unpack()
+                        if key == "name":
+                            name = unpacker.unpack()
+                        elif key == "rowCount":
+                            row_count = unpacker.unpack()
+                        else:
+                            unpacker.skip()
+                        if last and name is not None and row_count is not None:
+                            row_counts[name.lstrip("_")] = row_count
+                            return row_counts
+                    if name is not None and row_count is not None:
+                        row_counts[name.lstrip("_")] = row_count
+    return row_counts
@@ -1,8 +1,10 @@
 from ciftools.serialization import create_binary_writer
-from src.models.cif.read.lattice import LatticeCif
-from src.models.cif.write.volume.volume_data_3d import VolumeData3dCategory
-from src.models.cif.write.volume.volume_data_3d_info import VolumeData3dInfoCategory
-from src.models.cif.write.volume.volume_data_time_and_channel_info import (
+
+from src.models.read.lattice import LatticeCif
+from src.models.write.segmentation_data_3d import SegmentationData3dCategory
+from src.models.write.segmentation_table import SegmentationDataTableCategory
+from src.models.write.volume_data_3d_info import VolumeData3dInfoCategory
+from src.models.write.volume_data_time_and_channel_info import (
     VolumeDataTimeAndChannelInfoCategory,
 )
 
@@ -12,7 +14,8 @@ def lattice_to_bcif(lattice_model: LatticeCif) -> bytes:
 
     # this empty data block is required by mol* despite not being used
     writer.start_data_block("SERVER")
-    writer.start_data_block("VOLUME_DATA")
+    # same block as the CVSX lattice files read by parse_lattice_bcif
+    writer.start_data_block("SEGMENTATION_DATA")
 
     writer.write_category(
         VolumeData3dInfoCategory,
@@ -27,9 +30,15 @@ def lattice_to_bcif(lattice_model: LatticeCif) -> bytes:
         ],
     )
     writer.write_category(
-        VolumeData3dCategory,
+        SegmentationDataTableCategory,
+        [
+            lattice_model.segmentation_block.segmentation_data_table,
+        ],
+    )
+    writer.write_category(
+        SegmentationData3dCategory,
         [
-            lattice_model.segmentation_block.segmentation_data_3d.values,
+            lattice_model.segmentation_block.segmentation_data_3d,
         ],
     )
 
@@ -1,15 +1,17 @@
 from ciftools.serialization import create_binary_writer
-from src.models.cif.read.mesh import MeshCif
-from src.models.cif.write.mesh.mesh import MeshCategory
-from src.models.cif.write.mesh.mesh_vertex import MeshVertexCategory
-from src.models.cif.write.volume.volume_data_3d_info import VolumeData3dInfoCategory
-from src.src.models.cif.write.mesh.mesh_triangle import MeshTriangleCategory
+
+from src.models.read.mesh import MeshCif
+from src.models.write.mesh import MeshCategory
+from src.models.write.mesh_triangle import MeshTriangleCategory
+from src.models.write.mesh_vertex import MeshVertexCategory
+from src.models.write.volume_data_3d_info import VolumeData3dInfoCategory
 
 
 def mesh_to_bcif(mesh: MeshCif) -> bytes:
     writer = create_binary_writer(encoder="VolumeServer")
 
-    writer.start_data_block("MESH_DATA")
+    # same block layout as the CVSX mesh files read by parse_mesh_bcif
+    writer.start_data_block("VOLUME_INFO")
 
     writer.write_category(
         VolumeData3dInfoCategory,
@@ -17,6 +19,9 @@ def mesh_to_bcif(mesh: MeshCif) -> bytes:
             mesh.mesh_block.volume_data_3d_info,
         ],
     )
+
+    writer.start_data_block("MESHES")
+
     writer.write_category(
         MeshCategory,
         [
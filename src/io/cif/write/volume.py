@@ -0,0 +1,42 @@
+from ciftools.serialization import create_binary_writer
+
+from src.models.read.volume import VolumeCif
+from src.models.write.volume_data_3d import VOLUME_DATA_3D_CATEGORIES
+from src.models.write.volume_data_3d_info import VolumeData3dInfoCategory
+from src.models.write.volume_data_time_and_channel_info import (
+    VolumeDataTimeAndChannelInfoCategory,
+)
+
+
+def volume_to_bcif(volume: VolumeCif, num_bits: int | None = None) -> bytes:
+    # num_bits interval quantizes float values, None writes them as they are
+    if num_bits not in VOLUME_DATA_3D_CATEGORIES:
+        raise ValueError(f"Unsupported number of quantization bits: {num_bits}")
+
+    writer = create_binary_writer(encoder="VolumeServer")
+
+    # same block layout as the CVSX volume files read by parse_volume_bcif,
+    # the empty SERVER block is expected by mol*
+    writer.start_data_block("SERVER")
+    writer.start_data_block("VOLUME")
+
+    writer.write_category(
+        VolumeData3dInfoCategory,
+        [
+            volume.volume_block.volume_data_3d_info,
+        ],
+    )
+    writer.write_category(
+        VolumeDataTimeAndChannelInfoCategory,
+        [
+            volume.volume_block.volume_data_time_and_channel_info,
+        ],
+    )
+    writer.write_category(
+        VOLUME_DATA_3D_CATEGORIES[num_bits],
+        [
+            volume.volume_block.volume_data_3d,
+        ],
+    )
+
+    return writer.encode()
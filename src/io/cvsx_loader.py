@@ -1,13 +1,19 @@
 import json
 import os
-from typing import Type, TypeVar
+from typing import Iterable, Type, TypeVar
 from zipfile import BadZipFile, ZipFile
 
 from pydantic import ValidationError
 
 from src.models.cvsx.cvsx_annotations import CVSXAnnotations
 from src.models.cvsx.cvsx_file import CVSXFile
-from src.models.cvsx.cvsx_index import CVSXIndex
+from src.models.cvsx.cvsx_index import (
+    CVSXIndex,
+    CVSXSegmentationEntry,
+    CVSXTimeframeIndex,
+    CVSXVolumeEntry,
+    SegmentationFileInfo,
+)
 from src.models.cvsx.cvsx_metadata import CVSXMetadata
 from src.models.cvsx.cvsx_query import CVSXQuery
 
@@ -22,10 +28,12 @@ def check_zip_file_exists(zip_path: str) -> None:
         raise ValueError(f"Path exists but is not a file: '{zip_path}'")
 
 
-def check_zip_integrity(zip_path: str) -> None:
+def check_zip_integrity(zip_path: str, test_members: bool = True) -> None:
+    # test_members reads every member, members read later are checked by
+    # ZipFile either way
     try:
         with ZipFile(zip_path, "r") as z:
-            bad_file = z.testzip()
+            bad_file = z.testzip() if test_members else None
             if bad_file is not None:
                 raise ValueError(
                     f"ZIP archive is corrupted. First bad file: '{bad_file}'"
@@ -88,9 +96,71 @@ def load_model_from_zip(zip_path: str, inner_path: str, model_class: Type[T]) ->
         )
 
 
-def load_cvsx_entry(cvsx_path: str) -> CVSXFile:
+def index_timeframes(
+    volumes: Iterable[CVSXVolumeEntry],
+    segmentations: Iterable[CVSXSegmentationEntry],
+) -> CVSXTimeframeIndex:
+    volume_index: dict[int, dict[str, list[CVSXVolumeEntry]]] = {}
+    for volume in volumes:
+        if volume.timeframe_id not in volume_index:
+            volume_index[volume.timeframe_id] = {}
+        channels = volume_index[volume.timeframe_id]
+        if volume.channel_id not in channels:
+            channels[volume.channel_id] = []
+        channels[volume.channel_id].append(volume)
+
+    segmentation_index: dict[int, dict[str, list[CVSXSegmentationEntry]]] = {}
+    for segmentation in segmentations:
+        if segmentation.timeframe_id not in segmentation_index:
+            segmentation_index[segmentation.timeframe_id] = {}
+        segmentation_ids = segmentation_index[segmentation.timeframe_id]
+        if segmentation.segmentation_id not in segmentation_ids:
+            segmentation_ids[segmentation.segmentation_id] = []
+        segmentation_ids[segmentation.segmentation_id].append(segmentation)
+
+    return CVSXTimeframeIndex(
+        volumes=dict(sorted(volume_index.items())),
+        segmentations=dict(sorted(segmentation_index.items())),
+    )
+
+
+def get_timeframe_index(cvsx_index: CVSXIndex) -> CVSXTimeframeIndex:
+    volumes = [
+        CVSXVolumeEntry(
+            source_filepath=source_filepath,
+            channel_id=volume_info.channelId,
+            timeframe_id=volume_info.timeframeIndex,
+        )
+        for source_filepath, volume_info in cvsx_index.volumes.items()
+    ]
+
+    segmentation_infos: list[tuple[str, str, SegmentationFileInfo]] = [
+        ("mesh", source_filepath, mesh_info)
+        for mesh_info in cvsx_index.meshSegmentations or []
+        for source_filepath in mesh_info.segmentsFilenames
+    ]
+    for kind, infos in [
+        ("lattice", cvsx_index.latticeSegmentations),
+        ("geometric-segmentation", cvsx_index.geometricSegmentations),
+    ]:
+        for source_filepath, segmentation_info in (infos or {}).items():
+            segmentation_infos.append((kind, source_filepath, segmentation_info))
+    segmentations = [
+        CVSXSegmentationEntry(
+            kind=kind,
+            source_filepath=source_filepath,
+            segmentation_id=segmentation_info.segmentationId,
+            timeframe_id=segmentation_info.timeframeIndex,
+        )
+        for kind, source_filepath, segmentation_info in segmentation_infos
+    ]
+
+    return index_timeframes(volumes, segmentations)
+
+
+def load_cvsx_entry(cvsx_path: str, test_members: bool = True) -> CVSXFile:
     check_zip_file_exists(cvsx_path)
-    check_zip_integrity(cvsx_path)
+    check_zip_integrity(cvsx_path, test_members)
 
     check_file_exists_in_zip(cvsx_path, "index.json")
 
@@ -109,6 +179,7 @@ def load_cvsx_entry(cvsx_path: str) -> CVSXFile:
     return CVSXFile(
         filepath=cvsx_path,
         index=cvsx_index,
+        timeframes=get_timeframe_index(cvsx_index),
         annotations=cvsx_annotations,
         metadata=cvsx_metadata,
         query=cvsx_query,
@@ -0,0 +1,152 @@
+import hashlib
+import json
+from typing import Any, TextIO
+
+import numpy as np
+from molviewspec.nodes import GlobalMetadata, Node, SnapshotMetadata
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+CHUNK_SIZE = 65536
+
+
+class MVSJWriter:
+    """
+    Writes an MVSJ state tree to a text sink node by node, so the whole tree
+    never has to exist in memory. Numpy arrays in node params are written
+    directly from their buffers (flattened), chunk by chunk. None values are
+    skipped, as with model_dump(exclude_none=True).
+    """
+
+    def __init__(
+        self,
+        sink: TextIO,
+        indent: int | None = None,
+        chunk_size: int = CHUNK_SIZE,
+    ):
+        self._sink = sink
+        self._indent = indent
+        self._chunk_size = chunk_size
+        self._colon = ":" if indent is None else ": "
+        # number of items written to each open container
+        self._counts: list[int] = []
+
+    def begin_states(self, metadata: GlobalMetadata) -> None:
+        self._open("{")
+        self._write_key("kind")
+        self._write_value("multiple")
+        self._write_key("metadata")
+        self._write_value(metadata)
+        self._write_key("snapshots")
+        self._open("[")
+
+    def end_states(self) -> None:
+        self._close("]")
+        self._close("}")
+        self._sink.write("\n")
+
+    def begin_snapshot(self, metadata: SnapshotMetadata) -> None:
+        self._write_separator()
+        self._open("{")
+        self._write_key("metadata")
+        self._write_value(metadata)
+        self._write_key("root")
+        self._open("{")
+        self._write_key("kind")
+        self._write_value("root")
+        self._write_key("children")
+        self._open("[")
+
+    def end_snapshot(self) -> None:
+        self._close("]")
+        self._close("}")
+        self._close("}")
+
+    def write_node(self, node: Node | dict) -> None:
+        self._write_separator()
+        self._write_value(node)
+
+    def _newline(self) -> None:
+        if self._indent is not None:
+            self._sink.write("\n" + " " * (self._indent * len(self._counts)))
+
+    def _write_separator(self) -> None:
+        if not self._counts:
+            return
+        if self._counts[-1]:
+            self._sink.write(",")
+        self._counts[-1] += 1
+        self._newline()
+
+    def _open(self, bracket: str) -> None:
+        self._sink.write(bracket)
+        self._counts.append(0)
+
+    def _close(self, bracket: str) -> None:
+        if self._counts.pop():
+            self._newline()
+        self._sink.write(bracket)
+
+    def _write_key(self, key: Any) -> None:
+        self._write_separator()
+        self._sink.write(json.dumps(str(key)))
+        self._sink.write(self._colon)
+
+    def _write_value(self, value: Any) -> None:
+        if isinstance(value, np.ndarray):
+            self._write_array(value)
+        elif isinstance(value, BaseModel):
+            self._write_value(value.model_dump(exclude_none=True))
+        elif isinstance(value, dict):
+            self._open("{")
+            for key, item in value.items():
+                if item is None:
+                    continue
+                self._write_key(key)
+                self._write_value(item)
+            self._close("}")
+        elif isinstance(value, (list, tuple)):
+            self._open("[")
+            for item in value:
+                self._write_separator()
+                self._write_value(item)
+            self._close("]")
+        elif isinstance(value, np.generic):
+            self._write_value(value.item())
+        else:
+            self._sink.write(json.dumps(value))
+
+    def _format_chunk(self, chunk: np.ndarray) -> str:
+        # the chunk is the only part of the array converted to Python objects
+        return to_json(chunk.tolist())[1:-1].decode()
+
+    def _write_array(self, array: np.ndarray) -> None:
+        # numeric arrays stay on one line, also when indented
+        array = array.ravel()
+        self._sink.write("[")
+        for start in range(0, len(array), self._chunk_size):
+            if start:
+                self._sink.write(",")
+            chunk = array[start : start + self._chunk_size]
+            self._sink.write(self._format_chunk(chunk))
+        self._sink.write("]")
+
+
+class HashingSink:
+    """Text sink that hashes everything written through it"""
+
+    def __init__(self, sink: TextIO):
+        self._sink = sink
+        self.hash = hashlib.sha256()
+
+    def write(self, text: str) -> int:
+        self.hash.update(text.encode())
+        return self._sink.write(text)
+
+
+def write_node_file(node: Node | dict, filepath: str) -> str:
+    # returns the hash of the written content
+    with open(filepath, "w") as f:
+        sink = HashingSink(f)
+        MVSJWriter(sink).write_node(node)
+    return sink.hash.hexdigest()
@@ -0,0 +1,154 @@
+import os
+import queue
+import threading
+import zlib
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile
+
+from src.models.mvsx.mvsx_options import CompressionMode
+
+# already entropy-coded or compressed, deflating them costs CPU for ~1%
+STORED_EXTENSIONS = {".bcif", ".gz", ".zip", ".png", ".jpg", ".jpeg"}
+# a probed member is stored unless deflate saves at least this fraction
+PROBE_MIN_SAVING = 0.05
+
+
+def is_compressible(filepath: str, compresslevel: int, probe_bytes: int) -> bool:
+    with open(filepath, "rb") as f:
+        sample = f.read(probe_bytes)
+    if not sample:
+        return False
+    compressed_size = len(zlib.compress(sample, compresslevel))
+    return compressed_size < (1 - PROBE_MIN_SAVING) * len(sample)
+
+
+def get_compress_type(
+    filepath: str,
+    compression: CompressionMode,
+    compresslevel: int,
+    probe_bytes: int,
+) -> int:
+    if compression == "store":
+        return ZIP_STORED
+    if compression == "deflate":
+        return ZIP_DEFLATED
+    if compression == "probe":
+        if is_compressible(filepath, compresslevel, probe_bytes):
+            return ZIP_DEFLATED
+        return ZIP_STORED
+
+    _, ext = os.path.splitext(filepath)
+    if ext.lower() in STORED_EXTENSIONS:
+        return ZIP_STORED
+    return ZIP_DEFLATED
+
+
+def write_member(
+    z: ZipFile,
+    filepath: str,
+    arcname: str,
+    compression: CompressionMode,
+    compresslevel: int,
+    probe_bytes: int,
+) -> None:
+    compress_type = get_compress_type(filepath, compression, compresslevel, probe_bytes)
+    z.write(
+        filepath,
+        arcname=arcname,
+        compress_type=compress_type,
+        compresslevel=compresslevel if compress_type == ZIP_DEFLATED else None,
+    )
+
+
+def write_mvsx(
+    output_path: str,
+    mvsj_path: str,
+    asset_dir: str,
+    asset_uris: list[str],
+    compression: CompressionMode = "auto",
+    compresslevel: int = 6,
+    probe_bytes: int = 64 * 1024,
+) -> None:
+    """
+    Packs the MVSJ (as index.mvsj) and its local assets, given by their uris
+    relative to asset_dir, into an MVSX archive. Every member is stored or
+    deflated according to the compression mode.
+    """
+    members = [(mvsj_path, "index.mvsj")]
+    members += [(os.path.join(asset_dir, uri), uri) for uri in asset_uris]
+
+    with ZipFile(output_path, "w") as z:
+        for filepath, arcname in members:
+            write_member(z, filepath, arcname, compression, compresslevel, probe_bytes)
+
+
+class MVSXArchiveWriter:
+    """
+    Packs an MVSX archive on a background thread while its assets are still
+    being produced: add() queues an asset uri relative to asset_dir, at
+    most queue_size of them wait at once. The MVSJ is added last with
+    add_file(mvsj_path, "index.mvsj"). Leaving the context finishes the
+    archive and raises a write error, if any.
+    """
+
+    def __init__(
+        self,
+        output_path: str,
+        asset_dir: str,
+        compression: CompressionMode = "auto",
+        compresslevel: int = 6,
+        probe_bytes: int = 64 * 1024,
+        queue_size: int = 8,
+    ):
+        self.output_path = output_path
+        self.asset_dir = asset_dir
+        self.compression = compression
+        self.compresslevel = compresslevel
+        self.probe_bytes = probe_bytes
+        self._queue: queue.Queue[tuple[str, str] | None] = queue.Queue(queue_size)
+        self._error: Exception | None = None
+        self._thread = threading.Thread(
+            target=self._run, name="mvsx-archive", daemon=True
+        )
+
+    def __enter__(self) -> "MVSXArchiveWriter":
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._put(None)
+        self._thread.join()
+        if exc_type is None and self._error is not None:
+            raise self._error
+
+    def add(self, uri: str) -> None:
+        self.add_file(os.path.join(self.asset_dir, uri), uri)
+
+    def add_file(self, filepath: str, arcname: str) -> None:
+        if self._error is not None:
+            raise self._error
+        self._put((filepath, arcname))
+
+    def _put(self, member: tuple[str, str] | None) -> None:
+        # a failed writer no longer takes members, so do not wait for it
+        while self._thread.is_alive():
+            try:
+                self._queue.put(member, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _run(self) -> None:
+        try:
+            with ZipFile(self.output_path, "w") as z:
+                while (member := self._queue.get()) is not None:
+                    filepath, arcname = member
+                    write_member(
+                        z,
+                        filepath,
+                        arcname,
+                        self.compression,
+                        self.compresslevel,
+                        self.probe_bytes,
+                    )
+        except Exception as e:
+            self._error = e
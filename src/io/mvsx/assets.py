@@ -0,0 +1,100 @@
+import hashlib
+import os
+import tempfile
+from typing import BinaryIO, Callable
+
+from molviewspec.nodes import Node
+
+from src.io.mvsj.writer import write_node_file
+from src.models.mvsx.mvsx_report import MVSXAssetReport
+
+CHUNK_SIZE = 1 << 20
+
+
+class AssetStore:
+    """
+    Writes the assets of an MVSX archive (volumes, mesh nodes) to
+    output_dir. Every asset is hashed while it is written and stored once,
+    later assets with the same content reference the first copy. With
+    content_addressed, assets are stored under a path derived from their
+    hash instead of their destination filepath. on_store is called with the
+    uri of every newly stored asset.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        content_addressed: bool = False,
+        on_store: Callable[[str], None] | None = None,
+    ):
+        self.output_dir = output_dir
+        self.content_addressed = content_addressed
+        self.on_store = on_store
+        self.report = MVSXAssetReport()
+        # content hash -> uri of the stored asset
+        self._uris: dict[str, str] = {}
+        self._used_uris: set[str] = set()
+
+    @property
+    def uris(self) -> list[str]:
+        return list(self._uris.values())
+
+    def write_node(self, node: Node | dict, destination_filepath: str) -> str:
+        temp_filepath = self._get_temp_filepath()
+        content_hash = write_node_file(node, temp_filepath)
+        return self._store(temp_filepath, content_hash, destination_filepath)
+
+    def write_file(self, source: BinaryIO, destination_filepath: str) -> str:
+        temp_filepath = self._get_temp_filepath()
+        content_hash = hashlib.sha256()
+        with open(temp_filepath, "wb") as f:
+            while chunk := source.read(CHUNK_SIZE):
+                content_hash.update(chunk)
+                f.write(chunk)
+        return self._store(
+            temp_filepath,
+            content_hash.hexdigest(),
+            destination_filepath,
+        )
+
+    def _get_temp_filepath(self) -> str:
+        os.makedirs(self.output_dir, exist_ok=True)
+        # same directory, so the final rename does not copy
+        fd, temp_filepath = tempfile.mkstemp(dir=self.output_dir, suffix=".tmp")
+        os.close(fd)
+        return temp_filepath
+
+    def _get_uri(self, content_hash: str, destination_filepath: str) -> str:
+        # a destination already used by different content falls back to
+        # the hash, so it is never overwritten
+        if self.content_addressed or destination_filepath in self._used_uris:
+            _, ext = os.path.splitext(destination_filepath)
+            return f"assets/{content_hash[:32]}{ext}"
+        return destination_filepath
+
+    def _store(
+        self,
+        temp_filepath: str,
+        content_hash: str,
+        destination_filepath: str,
+    ) -> str:
+        size = os.path.getsize(temp_filepath)
+        self.report.assets += 1
+        self.report.total_bytes += size
+
+        if content_hash in self._uris:
+            os.remove(temp_filepath)
+            return self._uris[content_hash]
+
+        uri = self._get_uri(content_hash, destination_filepath)
+        filepath = os.path.join(self.output_dir, uri)
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        os.replace(temp_filepath, filepath)
+
+        self._uris[content_hash] = uri
+        self._used_uris.add(uri)
+        self.report.unique_assets += 1
+        self.report.stored_bytes += size
+        if self.on_store is not None:
+            self.on_store(uri)
+        return uri
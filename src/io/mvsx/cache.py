@@ -0,0 +1,153 @@
+import hashlib
+import os
+import re
+import shutil
+from uuid import uuid4
+from zipfile import ZipFile
+
+from src.models.mvsx.mvsx_options import MVSXConversionOptions
+from src.models.mvsx.mvsx_report import MVSXAssetReport
+
+# part of every key, bump it when the converter output changes
+CACHE_VERSION = "1"
+# options that change how an entry is converted, not the result
+EXECUTION_OPTIONS = {
+    "pipeline",
+    "incremental_segments",
+    "stream_mvsj",
+    "geometry_cache_dir",
+}
+
+KEY_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+
+def get_cache_key(cvsx_path: str, options: MVSXConversionOptions) -> str:
+    # the central directory has the CRC and size of every member, so the
+    # archive does not have to be read as a whole
+    key = hashlib.sha256(f"cvsx2mvsx {CACHE_VERSION}\n".encode())
+    with ZipFile(cvsx_path, "r") as z:
+        for info in sorted(z.infolist(), key=lambda info: info.filename):
+            key.update(f"{info.filename}\0{info.CRC:08x}\0{info.file_size}\n".encode())
+    key.update(options.model_dump_json(exclude=EXECUTION_OPTIONS).encode())
+    if options.volume_url_template is not None:
+        # volume URLs are formatted with the path as given, archives of
+        # copies of the entry elsewhere reference their own path
+        key.update(f"\0{cvsx_path}".encode())
+    return key.hexdigest()
+
+
+def copy_file(source_path: str, destination_path: str, link: bool = False) -> None:
+    # copied from an open descriptor, or hard linked with link (copied
+    # across file systems), so the destination survives the removal of the
+    # source. An existing destination is replaced in one step. Raises
+    # FileNotFoundError if the source is gone
+    temp_path = f"{destination_path}.{uuid4().hex}.partial"
+    try:
+        linked = False
+        if link:
+            try:
+                os.link(source_path, temp_path)
+                linked = True
+            except FileNotFoundError:
+                raise
+            except OSError:
+                # another file system
+                pass
+        if not linked:
+            with open(source_path, "rb") as src, open(temp_path, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+        os.replace(temp_path, destination_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+class ResultCache:
+    """
+    Finished MVSX archives and their asset reports in cache_dir, by cache
+    key. Entries are evicted least recently used first once they take more
+    than max_bytes. Entries are added and removed by renames, so one cache
+    can be shared by threads and processes.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 10 * 2**30):
+        if max_bytes <= 0:
+            raise ValueError("max_bytes must be positive")
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def get_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.mvsx")
+
+    def get_temp_path(self) -> str:
+        # same directory, so put() does not copy
+        return os.path.join(self.cache_dir, f"{uuid4().hex}.partial")
+
+    def get(self, key: str) -> tuple[str, MVSXAssetReport] | None:
+        path = self.get_path(key)
+        try:
+            with open(f"{path}.json") as f:
+                report = MVSXAssetReport.model_validate_json(f.read())
+            # the access time of the entry for eviction
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path, report
+
+    def copy(
+        self,
+        key: str,
+        destination_path: str,
+        link: bool = False,
+    ) -> MVSXAssetReport | None:
+        # the entry at destination_path, which eviction does not remove. A
+        # linked destination shares the entry's data, it must not be
+        # modified. None if there is no entry, or it was evicted meanwhile
+        cached = self.get(key)
+        if cached is None:
+            return None
+        path, report = cached
+        try:
+            copy_file(path, destination_path, link)
+        except FileNotFoundError:
+            return None
+        return report
+
+    def put(self, key: str, mvsx_path: str, report: MVSXAssetReport) -> str:
+        # moves mvsx_path into the cache. The report goes in last, entries
+        # without one are incomplete and never returned
+        path = self.get_path(key)
+        os.replace(mvsx_path, path)
+        temp_path = self.get_temp_path()
+        with open(temp_path, "w") as f:
+            f.write(report.model_dump_json())
+        os.replace(temp_path, f"{path}.json")
+        self.evict(keep=key)
+        return path
+
+    def evict(self, keep: str | None = None) -> None:
+        entries = []
+        for filename in os.listdir(self.cache_dir):
+            key, ext = os.path.splitext(filename)
+            if ext != ".mvsx" or not KEY_PATTERN.fullmatch(key):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, filename))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, key))
+
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, key in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            path = self.get_path(key)
+            for filepath in [f"{path}.json", path]:
+                try:
+                    os.remove(filepath)
+                except FileNotFoundError:
+                    pass
+            total_bytes -= size
@@ -1,7 +1,7 @@
 from pydantic import BaseModel
 
 from src.models.cvsx.cvsx_annotations import CVSXAnnotations
-from src.models.cvsx.cvsx_index import CVSXIndex
+from src.models.cvsx.cvsx_index import CVSXIndex, CVSXTimeframeIndex
 from src.models.cvsx.cvsx_metadata import CVSXMetadata
 from src.models.cvsx.cvsx_query import CVSXQuery
 
@@ -9,6 +9,8 @@ from src.models.cvsx.cvsx_query import CVSXQuery
 class CVSXFile(BaseModel):
     filepath: str
     index: CVSXIndex
+    # built from the index on load
+    timeframes: CVSXTimeframeIndex
     annotations: CVSXAnnotations
     metadata: CVSXMetadata
     query: CVSXQuery
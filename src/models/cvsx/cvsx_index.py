@@ -2,6 +2,8 @@ from typing import Literal
 
 from pydantic import BaseModel, field_validator
 
+from src.models.cvsx.cvsx_query import SegmentationKind
+
 
 class CVSXFileInfo(BaseModel):
     type: Literal[
@@ -50,3 +52,27 @@ class CVSXIndex(BaseModel):
     meshSegmentations: list[MeshSegmentationFilesInfo] | None = None
     latticeSegmentations: dict[str, LatticeSegmentationFileInfo] | None = None
     geometricSegmentations: dict[str, GeometricSegmentationFileInfo] | None = None
+
+
+class CVSXVolumeEntry(BaseModel):
+    source_filepath: str
+    channel_id: str
+    timeframe_id: int
+
+
+class CVSXSegmentationEntry(BaseModel):
+    # one per member, so one per segment for meshes
+    kind: SegmentationKind
+    source_filepath: str
+    segmentation_id: str
+    timeframe_id: int
+
+
+class CVSXTimeframeIndex(BaseModel):
+    """
+    Members of a CVSX index by timeframe, in ascending order, then by
+    channel or segmentation id, in the order of the index.
+    """
+
+    volumes: dict[int, dict[str, list[CVSXVolumeEntry]]] = {}
+    segmentations: dict[int, dict[str, list[CVSXSegmentationEntry]]] = {}
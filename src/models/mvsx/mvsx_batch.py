@@ -0,0 +1,28 @@
+from typing import Literal
+
+from pydantic import BaseModel
+
+BatchStatus = Literal["pending", "done", "failed"]
+
+
+class MVSXBatchEntry(BaseModel):
+    cvsx_path: str
+    # of the CVSX when it was converted, a changed input is converted again
+    cvsx_bytes: int
+    cvsx_mtime: float
+    output_path: str
+    status: BatchStatus = "pending"
+    seconds: float | None = None
+    # sha256 of the written MVSX
+    output_hash: str | None = None
+    # whether the MVSX came from the result cache, None without a cache
+    cache_hit: bool | None = None
+    error: str | None = None
+
+
+class MVSXBatchManifest(BaseModel):
+    # conversion options of the batch as JSON, entries done with other
+    # options are converted again
+    options: str
+    # by absolute CVSX path
+    entries: dict[str, MVSXBatchEntry] = {}
@@ -1,7 +1,11 @@
 from pydantic import BaseModel
 
 from src.models.cvsx.cvsx_annotations import DescriptionData
-from src.models.mvsx.mvsx_segmentation import MVSXBaseSegmentation
+from src.models.mvsx.mvsx_segmentation import (
+    MVSXGeometricSegmentationSet,
+    MVSXSegmentation,
+    MVSXSegmentationMember,
+)
 from src.models.mvsx.mvsx_volume import MVSXVolume
 
 
@@ -16,8 +20,12 @@ class MVSXIndexSnapshot(MVSXSnapshot):
 
 
 class MVSXTimeframeSnapshot(MVSXSnapshot):
+    timeframe_id: int
     volumes: list[MVSXVolume]
-    segmentations: list[MVSXBaseSegmentation]
+    # segmentation members are converted when the snapshot is written
+    segmentations: list[
+        MVSXSegmentation | MVSXGeometricSegmentationSet | MVSXSegmentationMember
+    ]
 
 
 class MVSXFile(BaseModel):
@@ -0,0 +1,136 @@
+from typing import Annotated, Literal
+
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+from src.models.cvsx.cvsx_query import SegmentationKind
+
+# inline: mesh arrays are embedded in the MVSJ state
+# uri: every mesh node is written as a separate asset in the archive
+MeshOutputMode = Literal["inline", "uri"]
+
+# angstrom: coordinate_precision is a distance in Å
+# voxel: coordinate_precision is a fraction of the smallest voxel size, entries
+# without a volume grid keep full precision
+CoordinateUnit = Literal["angstrom", "voxel"]
+
+# z slices of a volume kept for the grid_slice representation
+# center: the central slice, n: every n-th slice
+VolumeSlices = Literal["center"] | Annotated[int, Field(ge=1)]
+
+# compression of the MVSX archive members
+# deflate: every member, store: none
+# auto: all but already compressed formats (BCIF, images, archives)
+# probe: members whose first probe_bytes deflate well
+CompressionMode = Literal["deflate", "store", "auto", "probe"]
+
+
+class PipelineOptions(BaseModel):
+    # threads per stage: reading CVSX members, parsing them, and building
+    # the segment geometry (mesh scaling, marching cubes, shape models)
+    read_workers: int = Field(default=2, ge=1)
+    parse_workers: int = Field(default=2, ge=1)
+    geometry_workers: int = Field(default=4, ge=1)
+    # items waiting between two stages, also assets waiting for the archive
+    queue_size: int = Field(default=8, ge=1)
+
+
+class ConversionSelection(BaseModel):
+    # the part of the entry to convert, every field None selects all.
+    # Volumes are selected by timeframe and channel, segmentations by
+    # timeframe, segmentation id and kind, segments by segment id. Members
+    # that are not selected are never read
+    timeframes: list[int] | None = None
+    channel_ids: list[str] | None = None
+    segmentation_ids: list[str] | None = None
+    segmentation_kinds: list[SegmentationKind] | None = None
+    segment_ids: list[int] | None = None
+
+    @field_validator("channel_ids", mode="before")
+    @classmethod
+    def convert_channel_ids_to_strings(cls, v):
+        if v is None:
+            return v
+        return [str(channel_id) for channel_id in v]
+
+
+class MVSXConversionOptions(BaseModel):
+    # merge all segments of a (segmentation_id, timeframe) into one mesh node
+    merge_segments: bool = False
+    mesh_output: MeshOutputMode = "inline"
+    # one primitives node per (segmentation_id, timeframe), boxes and
+    # pyramids are instanced
+    batch_primitives: bool = False
+    # read geometric segmentations into per-kind numpy arrays instead of
+    # one model per shape, always batched
+    columnar_primitives: bool = False
+    # one snapshot per timeframe instead of only the first one. Static
+    # volumes and segmentations are carried over to later timeframes, with
+    # mesh_output="uri" identical assets are written once
+    all_timeframes: bool = False
+    # store archive assets under assets/<content hash> instead of their
+    # source names, identical assets are written once either way
+    content_addressed_assets: bool = False
+    # also write the coarser sampling levels the volume server lists for
+    # the entry. Timeframe snapshots load the coarsest level, the finer
+    # levels up to the CVSX volume get their own snapshots
+    volume_pyramid: bool = False
+    # crop volumes to the bounding box of all segments of the entry, padded
+    # by crop_margin in Å. Entries without segments keep the full volume
+    crop_to_segmentations: bool = False
+    crop_margin: float = Field(default=10, ge=0)
+    # write only these z slices of every volume, None keeps the whole grid
+    volume_slices: VolumeSlices | None = None
+    # re-encode float volumes as interval quantized 8 or 16 bit integers,
+    # None copies them as they are
+    volume_bits: Literal[8, 16] | None = None
+    # reference volumes in place instead of copying them into the archive:
+    # volume nodes download this URL, formatted with the CVSX path and the
+    # member name, e.g. "http://localhost:8000/cvsx/{cvsx_path}/{member}"
+    # for api/api.py, which fills in the path under data/. Pyramid levels
+    # are still written to the archive
+    volume_url_template: str | None = None
+    compression: CompressionMode = "auto"
+    # zlib level of deflated members
+    compresslevel: int = Field(default=6, ge=0, le=9)
+    probe_bytes: int = Field(default=64 * 1024, gt=0)
+    # write the MVSJ node by node with MVSJWriter instead of building the
+    # whole state tree first, mesh arrays are never converted to lists
+    stream_mvsj: bool = False
+    # run the conversion as concurrent stages: members are read, parsed and
+    # meshed in overlapping stages, and assets are packed into the archive
+    # while the MVSJ is written. None converts one step after the other
+    pipeline: PipelineOptions | None = None
+    # plan snapshots from the CVSX index and convert every segment only when
+    # its node is written, instead of converting all segments first. With
+    # stream_mvsj or mesh_output="uri", peak memory is about one segment
+    # (one group with merge_segments or batch_primitives). Segments are
+    # converted again for every snapshot that shows them, and once more for
+    # crop_to_segmentations
+    incremental_segments: bool = False
+    # keep the meshes of lattice segments in this directory, keyed by the
+    # lattice member content, the segment id and the meshing parameters.
+    # Conversions of entries with only annotations changed reuse them
+    geometry_cache_dir: str | None = None
+    # convert only part of the entry, None converts all of it
+    selection: ConversionSelection | None = None
+    # no indentation in the written MVSJ
+    compact_mvsj: bool = False
+    # vertices, primitive positions and sizes, and instance transforms are
+    # rounded to this precision, None keeps full precision
+    coordinate_precision: float | None = Field(default=0.01, gt=0)
+    coordinate_unit: CoordinateUnit = "angstrom"
+
+    @model_validator(mode="after")
+    def check_volume_references(self) -> "MVSXConversionOptions":
+        # referenced volumes are the CVSX members as they are
+        modified = (
+            self.crop_to_segmentations
+            or self.volume_slices is not None
+            or self.volume_bits is not None
+        )
+        if self.volume_url_template is not None and modified:
+            raise ValueError(
+                "volume_url_template cannot be combined with cropped, sliced "
+                "or re-encoded volumes"
+            )
+        return self
@@ -0,0 +1,45 @@
+from typing import Literal
+
+from pydantic import BaseModel
+
+PlanMemberKind = Literal["volume", "mesh", "lattice", "geometric-segmentation"]
+
+
+class MVSXMemberPlan(BaseModel):
+    source_filepath: str
+    kind: PlanMemberKind
+    timeframe_id: int
+    # uncompressed, from the central directory
+    bytes: int
+    # grid samples of volumes and lattices
+    voxels: int = 0
+    # volumes: estimated samples and bytes written to the archive after
+    # cropping, slicing and re-encoding, pyramid levels included. The
+    # crop region is not known before segmentations are parsed, so cropped
+    # volumes are counted whole
+    written_voxels: int = 0
+    written_bytes: int = 0
+    cropped: bool = False
+    # lattice segments to mesh
+    segments: int = 0
+    vertices: int = 0
+    triangles: int = 0
+    primitives: int = 0
+
+
+class MVSXCostModel(BaseModel):
+    # coefficients of the plan features (see src/plan.py), the predictions
+    # are linear in them. Fitted by benchmarks/planner.py
+    seconds: dict[str, float]
+    peak_memory_bytes: dict[str, float]
+    output_bytes: dict[str, float]
+
+
+class MVSXPlan(BaseModel):
+    cvsx_path: str
+    # the CVSX members the conversion reads
+    members: list[MVSXMemberPlan]
+    features: dict[str, float]
+    seconds: float
+    peak_memory_bytes: int
+    output_bytes: int
@@ -0,0 +1,47 @@
+from pydantic import BaseModel, computed_field
+
+from src.models.cvsx.cvsx_metadata import VolumeDescriptiveStatistics
+
+
+class MVSXVolumeEncodingReport(BaseModel):
+    filepath: str
+    num_bits: int
+    # float values of the volume and the written BCIF
+    source_bytes: int
+    bytes: int
+    # decoded against the float values
+    max_error: float
+    rms_error: float
+    # of the volume's sampling level in the entry metadata, if listed
+    statistics: VolumeDescriptiveStatistics | None = None
+
+    @computed_field
+    @property
+    def max_error_in_std(self) -> float | None:
+        if self.statistics is None or not self.statistics.std:
+            return None
+        return self.max_error / self.statistics.std
+
+    @computed_field
+    @property
+    def max_error_in_range(self) -> float | None:
+        if self.statistics is None:
+            return None
+        value_range = self.statistics.max - self.statistics.min
+        return self.max_error / value_range if value_range else None
+
+
+class MVSXAssetReport(BaseModel):
+    # every asset produced by the conversion, duplicates included
+    assets: int = 0
+    total_bytes: int = 0
+    # assets actually written to the archive
+    unique_assets: int = 0
+    stored_bytes: int = 0
+    # volumes re-encoded with MVSXConversionOptions.volume_bits
+    volume_encodings: list[MVSXVolumeEncodingReport] = []
+
+    @computed_field
+    @property
+    def saved_bytes(self) -> int:
+        return self.total_bytes - self.stored_bytes
@@ -5,9 +5,23 @@ import numpy as np
 from pydantic import BaseModel, ConfigDict, Field
 
 from src.models.cvsx.cvsx_annotations import DescriptionData
-from src.models.read.geometric import ShapePrimitive
+from src.models.read.geometric import ShapePrimitive, ShapePrimitiveColumns
 
 SegmentationType = Literal["mesh", "lattice", "primitive"]
+SegmentationMemberKind = Literal["mesh", "lattice", "primitive", "primitive_set"]
+
+
+class MVSXSegmentationMember(BaseModel):
+    """
+    A segmentation member of the CVSX before conversion. It has the
+    timeframe fields of the segmentations it converts to, so snapshots can
+    be planned before any geometry exists.
+    """
+
+    kind: SegmentationMemberKind
+    source_filepath: str
+    segmentation_id: str
+    timeframe_id: int
 
 
 class MVSXBaseSegmentation(BaseModel):
@@ -53,4 +67,30 @@ class MVSXGeometricSegmentation(MVSXBaseSegmentation):
     shape: ShapePrimitive
 
 
-MVSXSegmentation = MVSXMeshSegmentation | MVSXGeometricSegmentation
+class MVSXGeometricSegmentationSet(BaseModel):
+    """All shapes of one geometric segmentation member, stored column-wise"""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    id: UUID = Field(default_factory=uuid4)
+
+    kind: Literal["primitive_set"] = "primitive_set"
+
+    source_filepath: str
+    destination_filepath: str
+
+    timeframe_id: int
+
+    segmentation_id: str
+
+    shapes: ShapePrimitiveColumns
+
+    # keyed by segment_id
+    colors: dict[int, str]
+    opacities: dict[int, float]
+    descriptions: dict[int, list[DescriptionData]]
+
+
+MVSXSegmentation = (
+    MVSXMeshSegmentation | MVSXLatticeSegmentation | MVSXGeometricSegmentation
+)
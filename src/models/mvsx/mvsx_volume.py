@@ -13,6 +13,10 @@ class MVSXVolume(BaseModel):
 
     channel_id: str
 
+    # downsampling level of a volume pyramid, None for the volume as it is
+    # in the CVSX
+    sample_rate: int | None = None
+
     # TODO: how to set from metadata???
     isovalue: float = 1
 
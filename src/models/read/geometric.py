@@ -1,6 +1,7 @@
-from typing import Literal, Mapping
+from typing import Annotated, Literal, Mapping
 
-from pydantic import BaseModel
+import numpy as np
+from pydantic import BaseModel, ConfigDict, Field
 
 Vector3 = tuple[float, float, float]
 
@@ -52,9 +53,77 @@ class PyramidShape(ShapePrimitiveBase):
 
 ShapePrimitive = SphereShape | BoxShape | CylinderShape | EllipsoidShape | PyramidShape
 
+# validated by looking at "kind" only, instead of trying every union member
+DiscriminatedShapePrimitive = Annotated[ShapePrimitive, Field(discriminator="kind")]
+
 
 class ShapePrimitiveData(BaseModel):
-    shape_primitive_list: list[ShapePrimitive]
+    shape_primitive_list: list[DiscriminatedShapePrimitive]
+
+
+# Columnar representation: one array per shape parameter and kind, without
+# creating a model object for every shape
+
+
+class SphereColumns(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    id: np.ndarray[int]
+    center: np.ndarray[float]
+    radius: np.ndarray[float]
+
+
+class BoxColumns(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    id: np.ndarray[int]
+    translation: np.ndarray[float]
+    scaling: np.ndarray[float]
+    rotation_axis: np.ndarray[float]
+    rotation_radians: np.ndarray[float]
+
+
+class CylinderColumns(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    id: np.ndarray[int]
+    start: np.ndarray[float]
+    end: np.ndarray[float]
+    radius_bottom: np.ndarray[float]
+    radius_top: np.ndarray[float]
+
+
+class EllipsoidColumns(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    id: np.ndarray[int]
+    dir_major: np.ndarray[float]
+    dir_minor: np.ndarray[float]
+    center: np.ndarray[float]
+    radius_scale: np.ndarray[float]
+
+
+class PyramidColumns(BoxColumns):
+    pass
+
+
+class ShapePrimitiveColumns(BaseModel):
+    sphere: SphereColumns
+    box: BoxColumns
+    cylinder: CylinderColumns
+    ellipsoid: EllipsoidColumns
+    pyramid: PyramidColumns
+
+    def segment_ids(self) -> np.ndarray:
+        return np.concatenate(
+            (
+                self.sphere.id,
+                self.box.id,
+                self.cylinder.id,
+                self.ellipsoid.id,
+                self.pyramid.id,
+            )
+        )
 
 
 class GeometricSegmentationData(BaseModel):
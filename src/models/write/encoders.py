@@ -39,10 +39,16 @@ def coord_encoder(coords: np.ndarray) -> BinaryCIFEncoder:
     )  # ~0.01 voxel error - should be OK
     # num_steps, array_type = 2**8-1, DataTypeEnum.Uint8  # Too low quality
 
+    minimum = float(coords.min(initial=0))
+    maximum = float(coords.max(initial=0))
+    if minimum == maximum:
+        # flat axis, e.g. a planar mesh; avoid a zero quantization step
+        maximum = minimum + 1
+
     return ComposeEncoders(
         encoder.IntervalQuantization(
-            coords.min(),
-            coords.max(),
+            minimum,
+            maximum,
             num_steps,
             array_type,
         ),
@@ -52,18 +58,46 @@ def coord_encoder(coords: np.ndarray) -> BinaryCIFEncoder:
     )
 
 
-def decide_encoder(data: np.ndarray) -> tuple[BinaryCIFEncoder, np.dtype]:
+# unsigned integer type of interval quantized floats by number of bits
+QUANTIZED_TYPES = {
+    8: DataTypeEnum.Uint8,
+    16: DataTypeEnum.Uint16,
+}
+
+
+def get_quantization_range(data: np.ndarray) -> tuple[float, float]:
+    minimum = float(data.min(initial=data[0]))
+    maximum = float(data.max(initial=data[0]))
+    if minimum == maximum:
+        # constant data; avoid a zero quantization step
+        maximum = minimum + 1
+    return minimum, maximum
+
+
+def decide_encoder(
+    data: np.ndarray,
+    num_bits: int = 8,
+) -> tuple[BinaryCIFEncoder, np.dtype]:
+    """
+    Floats are interval quantized to num_bits unsigned integers over their
+    range, mol* decodes them back to floats. Other types are run length
+    encoded.
+    """
+    if num_bits not in QUANTIZED_TYPES:
+        raise ValueError(f"Unsupported number of quantization bits: {num_bits}")
+
     data_type = DataType.from_dtype(data.dtype)
     typed_array = DataType.to_dtype(data_type)
 
     encoders: list[BinaryCIFEncoder] = []
 
     if data_type in [DataTypeEnum.Float32, DataTypeEnum.Float64]:
+        minimum, maximum = get_quantization_range(data)
         interval_quantization = encoder.IntervalQuantization(
-            data.min(initial=data[0]),
-            data.max(initial=data[0]),
-            255,
-            DataTypeEnum.Uint8,
+            minimum,
+            maximum,
+            2**num_bits - 1,
+            QUANTIZED_TYPES[num_bits],
         )
         encoders.append(interval_quantization)
     else:
@@ -1,7 +1,7 @@
 from ciftools.models.writer import CIFCategoryDesc, CIFFieldDesc
 
-from src.src.models.cif.read.mesh import Mesh
-from src.src.models.cif.write.encoders import bytearray_encoder
+from src.models.read.mesh import Mesh
+from src.models.write.encoders import bytearray_encoder
 
 
 class MeshCategory(CIFCategoryDesc):
@@ -17,7 +17,7 @@ class MeshCategory(CIFCategoryDesc):
             CIFFieldDesc.number_array(
                 name="id",
                 dtype=data.id.dtype,
-                encoder=bytearray_encoder,
+                encoder=lambda _: bytearray_encoder(),
                 array=lambda d: d.id,
             ),
         ]
@@ -1,7 +1,7 @@
 from ciftools.models.writer import CIFCategoryDesc, CIFFieldDesc
 
-from src.models.cif.read.mesh import MeshTriangle
-from src.models.cif.write.encoders import bytearray_encoder, delta_rl_encoder
+from src.models.read.mesh import MeshTriangle
+from src.models.write.encoders import bytearray_encoder, delta_rl_encoder
 
 
 class MeshTriangleCategory(CIFCategoryDesc):
@@ -17,13 +17,13 @@ class MeshTriangleCategory(CIFCategoryDesc):
             CIFFieldDesc.number_array(
                 name="mesh_id",
                 dtype=data.mesh_id.dtype,
-                encoder=delta_rl_encoder,
+                encoder=lambda _: delta_rl_encoder(),
                 array=lambda d: d.mesh_id,
             ),
             CIFFieldDesc.number_array(
                 name="vertex_id",
                 dtype=data.vertex_id.dtype,
-                encoder=bytearray_encoder,
+                encoder=lambda _: bytearray_encoder(),
                 array=lambda d: d.vertex_id,
             ),
         ]
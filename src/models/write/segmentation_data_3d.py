@@ -1,7 +1,7 @@
 from ciftools.models.writer import CIFCategoryDesc, CIFFieldDesc
 
-from src.models.cif.read.lattice import SegmentationData3d
-from src.src.models.cif.write.encoders import decide_encoder
+from src.models.read.lattice import SegmentationData3d
+from src.models.write.encoders import decide_encoder
 
 
 class SegmentationData3dCategory(CIFCategoryDesc):
@@ -13,12 +13,12 @@ class SegmentationData3dCategory(CIFCategoryDesc):
 
     @staticmethod
     def get_field_descriptors(data: SegmentationData3d):
-        encoder, dtype = decide_encoder(data, "SegmentationData3d")
+        encoder, dtype = decide_encoder(data.values)
         return [
             CIFFieldDesc.number_array(
                 name="values",
                 dtype=dtype,
-                encoder=lambda: encoder,
+                encoder=lambda _: encoder,
                 array=lambda d: d.values,
             ),
         ]
@@ -2,8 +2,8 @@ from ciftools.binary.data_types import DataType, DataTypeEnum
 from ciftools.models.writer import CIFCategoryDesc
 from ciftools.models.writer import CIFFieldDesc as Field
 
-from src.models.cif.read.lattice import SegmentationDataTable
-from src.models.cif.write.encoders import bytearray_encoder, delta_rl_encoder
+from src.models.read.lattice import SegmentationDataTable
+from src.models.write.encoders import bytearray_encoder, delta_rl_encoder
 
 
 class SegmentationDataTableCategory(CIFCategoryDesc):
@@ -20,13 +20,13 @@ class SegmentationDataTableCategory(CIFCategoryDesc):
             Field.number_array(
                 name="set_id",
                 dtype=dtype,
-                encoder=delta_rl_encoder,
+                encoder=lambda _: delta_rl_encoder(),
                 array=lambda d: d.set_id,
             ),
             Field.number_array(
                 name="segment_id",
                 dtype=dtype,
-                encoder=bytearray_encoder,
+                encoder=lambda _: bytearray_encoder(),
                 array=lambda d: d.segment_id,
             ),
         ]
@@ -1,24 +1,45 @@
 from ciftools.models.writer import CIFCategoryDesc, CIFFieldDesc
 
-from src.models.cif.read.volume import VolumeData3d
-from src.models.cif.write.encoders import decide_encoder
+from src.models.read.volume import VolumeData3d
+from src.models.write.encoders import bytearray_encoder, decide_encoder
 
 
 class VolumeData3dCategory(CIFCategoryDesc):
     name = "volume_data_3d"
+    # values are written as they are, like the volume server does, unless
+    # set to quantize them (see decide_encoder)
+    num_bits: int | None = None
 
     @staticmethod
     def get_row_count(data: VolumeData3d) -> int:
         return data.values.size
 
-    @staticmethod
-    def get_field_descriptors(data: VolumeData3d):
-        encoder, dtype = decide_encoder(data.values, "VolumeData3d")
+    @classmethod
+    def get_field_descriptors(cls, data: VolumeData3d):
+        if cls.num_bits is None:
+            encoder, dtype = bytearray_encoder(), data.values.dtype
+        else:
+            encoder, dtype = decide_encoder(data.values, cls.num_bits)
         return [
             CIFFieldDesc.number_array(
                 name="values",
                 dtype=dtype,
-                encoder=lambda: encoder,
+                encoder=lambda _: encoder,
                 array=lambda d: d.values,
             ),
         ]
+
+
+class Quantized8BitVolumeData3dCategory(VolumeData3dCategory):
+    num_bits = 8
+
+
+class Quantized16BitVolumeData3dCategory(VolumeData3dCategory):
+    num_bits = 16
+
+
+VOLUME_DATA_3D_CATEGORIES: dict[int | None, type[VolumeData3dCategory]] = {
+    None: VolumeData3dCategory,
+    8: Quantized8BitVolumeData3dCategory,
+    16: Quantized16BitVolumeData3dCategory,
+}
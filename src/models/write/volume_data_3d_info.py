@@ -1,7 +1,7 @@
 from ciftools.models.writer import CIFCategoryDesc, CIFFieldDesc
 
-from src.models.cif.read.common import VolumeData3dInfo
-from src.models.cif.write.encoders import bytearray_encoder
+from src.models.read.common import VolumeData3dInfo
+from src.models.write.encoders import bytearray_encoder
 
 
 class VolumeData3dInfoCategory(CIFCategoryDesc):
@@ -16,174 +16,174 @@ class VolumeData3dInfoCategory(CIFCategoryDesc):
         return [
             CIFFieldDesc.strings(
                 name="name",
-                value=lambda d: d.name,
+                value=lambda d, i: d.name,
             ),
             CIFFieldDesc.numbers(
                 name="axis_order[0]",
-                value=lambda d: d.axis_order_0,
+                value=lambda d, i: d.axis_order_0,
                 dtype="i4",
-                encoder=bytearray_encoder,
+                encoder=lambda _: bytearray_encoder(),
             ),
             CIFFieldDesc.numbers(
                 name="axis_order[1]",
-                value=lambda d: d.axis_order_1,
+                value=lambda d, i: d.axis_order_1,
                 dtype="i4",
-                encoder=bytearray_encoder,
+                encoder=lambda _: bytearray_encoder(),
             ),
             CIFFieldDesc.numbers(
                 name="axis_order[2]",
-                value=lambda d: d.axis_order_2,
+                value=lambda d, i: d.axis_order_2,
                 dtype="i4",
-                encoder=bytearray_encoder,
+                encoder=lambda _: bytearray_encoder(),
             ),
             CIFFieldDesc.numbers(
                 name="origin[0]",
-                value=lambda d: d.origin_0,
+                value=lambda d, i: d.origin_0,
                 dtype="f4",
-                encoder=bytearray_encoder,
+                encoder=lambda _: bytearray_encoder(),
             ),
             CIFFieldDesc.numbers(
                 name="origin[1]",
-                value=lambda d: d.origin_1,
+                value=lambda d, i: d.origin_1,
                 dtype="f4",
-                encoder=bytearray_encoder,
+                encoder=lambda _: bytearray_encoder(),
             ),
             CIFFieldDesc.numbers(
                 name="origin[2]",
-                value=lambda d: d.origin_2,
+                value=lambda d, i: d.origin_2,
                 dtype="f4",
-                encoder=bytearray_encoder,
+                encoder=lambda _: bytearray_encoder(),
             ),
             CIFFieldDesc.numbers(
                 name="dimensions[0]",
-                value=lambda d: d.dimensions_0,
+                value=lambda d, i: d.dimensions_0,
                 dtype="f4",
-                encoder=bytearray_encoder,
+                encoder=lambda _: bytearray_encoder(),
             ),
             CIFFieldDesc.numbers(
                 name="dimensions[1]",
-                value=lambda d: d.dimensions_1,
+                value=lambda d, i: d.dimensions_1,
                 dtype="f4",
-                encoder=bytearray_encoder,
+                encoder=lambda _: bytearray_encoder(),
             ),
             CIFFieldDesc.numbers(
                 name="dimensions[2]",
-                value=lambda d: d.dimensions_2,
+                value=lambda d, i: d.dimensions_2,
                 dtype="f4",
-                encoder=bytearray_encoder,
+                encoder=lambda _: bytearray_encoder(),
             ),
             CIFFieldDesc.numbers(
                 name="sample_rate",
-                value=lambda d: d.sample_rate,
+                value=lambda d, i: d.sample_rate,
                 dtype="i4",
-                encoder=bytearray_encoder,
+                encoder=lambda _: bytearray_encoder(),
             ),
             CIFFieldDesc.numbers(
                 name="sample_count[0]",
-                value=lambda d: d.sample_count_0,
+                value=lambda d, i: d.sample_count_0,
                 dtype="i4",
-                encoder=bytearray_encoder,
+                encoder=lambda _: bytearray_encoder(),
             ),
             CIFFieldDesc.numbers(
                 name="sample_count[1]",
-                value=lambda d: d.sample_count_1,
+                value=lambda d, i: d.sample_count_1,
                 dtype="i4",
-                encoder=bytearray_encoder,
+                encoder=lambda _: bytearray_encoder(),
             ),
             CIFFieldDesc.numbers(
                 name="sample_count[2]",
-                value=lambda d: d.sample_count_2,
+                value=lambda d, i: d.sample_count_2,
                 dtype="i4",
-                encoder=bytearray_encoder,
+                encoder=lambda _: bytearray_encoder(),
             ),
             CIFFieldDesc.numbers(
                 name="spacegroup_number",
-                value=lambda d: d.spacegroup_number,
+                value=lambda d, i: d.spacegroup_number,
                 dtype="i4",
-                encoder=bytearray_encoder,
+                encoder=lambda _: bytearray_encoder(),
             ),
             CIFFieldDesc.numbers(
                 name="spacegroup_cell_size[0]",
-                value=lambda d: d.spacegroup_cell_size_0,
+                value=lambda d, i: d.spacegroup_cell_size_0,
                 dtype="f8",
-                encoder=bytearray_encoder,
+                encoder=lambda _: bytearray_encoder(),
             ),
             CIFFieldDesc.numbers(
                 name="spacegroup_cell_size[1]",
-                value=lambda d: d.spacegroup_cell_size_1,
+                value=lambda d, i: d.spacegroup_cell_size_1,
                 dtype="f8",
-                encoder=bytearray_encoder,
+                encoder=lambda _: bytearray_encoder(),
             ),
             CIFFieldDesc.numbers(
                 name="spacegroup_cell_size[2]",
-                value=lambda d: d.spacegroup_cell_size_2,
+                value=lambda d, i: d.spacegroup_cell_size_2,
                 dtype="f8",
-                encoder=bytearray_encoder,
+                encoder=lambda _: bytearray_encoder(),
             ),
             CIFFieldDesc.numbers(
                 name="spacegroup_cell_angles[0]",
-                value=lambda d: d.spacegroup_cell_angles_0,
+                value=lambda d, i: d.spacegroup_cell_angles_0,
                 dtype="f8",
-                encoder=bytearray_encoder,
+                encoder=lambda _: bytearray_encoder(),
             ),
             CIFFieldDesc.numbers(
                 name="spacegroup_cell_angles[1]",
-                value=lambda d: d.spacegroup_cell_angles_1,
+                value=lambda d, i: d.spacegroup_cell_angles_1,
                 dtype="f8",
-                encoder=bytearray_encoder,
+                encoder=lambda _: bytearray_encoder(),
             ),
             CIFFieldDesc.numbers(
                 name="spacegroup_cell_angles[2]",
-                value=lambda d: d.spacegroup_cell_angles_2,
+                value=lambda d, i: d.spacegroup_cell_angles_2,
                 dtype="f8",
-                encoder=bytearray_encoder,
+                encoder=lambda _: bytearray_encoder(),
             ),
             CIFFieldDesc.numbers(
                 name="mean_source",
-                value=lambda d: d.mean_source,
+                value=lambda d, i: d.mean_source,
                 dtype="f8",
-                encoder=bytearray_encoder,
+                encoder=lambda _: bytearray_encoder(),
             ),
             CIFFieldDesc.numbers(
                 name="mean_sampled",
-                value=lambda d: d.mean_sampled,
+                value=lambda d, i: d.mean_sampled,
                 dtype="f8",
-                encoder=bytearray_encoder,
+                encoder=lambda _: bytearray_encoder(),
             ),
             CIFFieldDesc.numbers(
                 name="sigma_source",
-                value=lambda d: d.sigma_source,
+                value=lambda d, i: d.sigma_source,
                 dtype="f8",
-                encoder=bytearray_encoder,
+                encoder=lambda _: bytearray_encoder(),
             ),
             CIFFieldDesc.numbers(
                 name="sigma_sampled",
-                value=lambda d: d.sigma_sampled,
+                value=lambda d, i: d.sigma_sampled,
                 dtype="f8",
-                encoder=bytearray_encoder,
+                encoder=lambda _: bytearray_encoder(),
             ),
             CIFFieldDesc.numbers(
                 name="min_source",
-                value=lambda d: d.min_source,
+                value=lambda d, i: d.min_source,
                 dtype="f8",
-                encoder=bytearray_encoder,
+                encoder=lambda _: bytearray_encoder(),
             ),
             CIFFieldDesc.numbers(
                 name="min_sampled",
-                value=lambda d: d.min_sampled,
+                value=lambda d, i: d.min_sampled,
                 dtype="f8",
-                encoder=bytearray_encoder,
+                encoder=lambda _: bytearray_encoder(),
             ),
             CIFFieldDesc.numbers(
                 name="max_source",
-                value=lambda d: d.max_source,
+                value=lambda d, i: d.max_source,
                 dtype="f8",
-                encoder=bytearray_encoder,
+                encoder=lambda _: bytearray_encoder(),
             ),
             CIFFieldDesc.numbers(
                 name="max_sampled",
-                value=lambda d: d.max_sampled,
+                value=lambda d, i: d.max_sampled,
                 dtype="f8",
-                encoder=bytearray_encoder,
+                encoder=lambda _: bytearray_encoder(),
             ),
         ]
@@ -1,7 +1,7 @@
 from ciftools.models.writer import CIFCategoryDesc, CIFFieldDesc
 
-from src.models.cif.read.common import VolumeDataTimeAndChannelInfo
-from src.models.cif.write.encoders import bytearray_encoder
+from src.models.read.common import VolumeDataTimeAndChannelInfo
+from src.models.write.encoders import bytearray_encoder
 
 
 class VolumeDataTimeAndChannelInfoCategory(CIFCategoryDesc):
@@ -16,14 +16,14 @@ class VolumeDataTimeAndChannelInfoCategory(CIFCategoryDesc):
         return [
             CIFFieldDesc.numbers(
                 name="time_id",
-                value=lambda d: d.time_id,
+                value=lambda d, i: d.time_id,
                 dtype="i4",
-                encoder=bytearray_encoder,
+                encoder=lambda _: bytearray_encoder(),
             ),
             CIFFieldDesc.numbers(
                 name="channel_id",
-                value=lambda d: d.channel_id,
+                value=lambda d, i: d.channel_id,
                 dtype="i4",
-                encoder=bytearray_encoder,
+                encoder=lambda _: bytearray_encoder(),
             ),
         ]
@@ -0,0 +1,172 @@
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator
+
+# how often blocked stages check whether the pipeline was stopped, in s
+POLL_INTERVAL = 0.1
+
+
+class Stage:
+    """
+    A step of a Pipeline. fn maps one item to any number of items for the
+    next stage and is called by up to workers threads at once.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[Any], Iterable[Any]],
+        workers: int = 1,
+    ):
+        if workers < 1:
+            raise ValueError(f"Stage {name} needs at least one worker")
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+
+
+class _Done:
+    pass
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class _Stopped(Exception):
+    pass
+
+
+def _put(q: queue.Queue, item: Any, stop: threading.Event) -> None:
+    while True:
+        try:
+            q.put(item, timeout=POLL_INTERVAL)
+            return
+        except queue.Full:
+            if stop.is_set():
+                raise _Stopped
+
+
+def _get(q: queue.Queue, stop: threading.Event) -> Any:
+    while True:
+        try:
+            return q.get(timeout=POLL_INTERVAL)
+        except queue.Empty:
+            if stop.is_set():
+                raise _Stopped
+
+
+def _call(fn: Callable[[Any], Iterable[Any]], item: Any) -> list[Any]:
+    return list(fn(item))
+
+
+class Pipeline:
+    """
+    Runs stages concurrently, connected by bounded queues of queue_size
+    items, so a slow stage holds back the ones before it instead of
+    buffering their output. Items leave every stage in the order they
+    entered it. An error in any stage stops the pipeline and is raised to
+    the consumer.
+    """
+
+    def __init__(self, stages: list[Stage], queue_size: int = 8):
+        if queue_size < 1:
+            raise ValueError("queue_size must be at least 1")
+        self.stages = stages
+        self.queue_size = queue_size
+
+    def run(self, items: Iterable[Any]) -> Iterator[Any]:
+        stop = threading.Event()
+        queues = [
+            queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)
+        ]
+        threads = [
+            threading.Thread(
+                target=self._feed,
+                args=(items, queues[0], stop),
+                name="pipeline-feed",
+                daemon=True,
+            )
+        ]
+        for stage, inbox, outbox in zip(self.stages, queues, queues[1:]):
+            threads.append(
+                threading.Thread(
+                    target=self._run_stage,
+                    args=(stage, inbox, outbox, stop),
+                    name=f"pipeline-{stage.name}",
+                    daemon=True,
+                )
+            )
+
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                item = queues[-1].get()
+                if isinstance(item, _Done):
+                    return
+                if isinstance(item, _Failure):
+                    raise item.error
+                yield item
+        finally:
+            # also reached when the consumer stops early
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+    def _feed(
+        self,
+        items: Iterable[Any],
+        outbox: queue.Queue,
+        stop: threading.Event,
+    ) -> None:
+        try:
+            for item in items:
+                _put(outbox, item, stop)
+            _put(outbox, _Done(), stop)
+        except _Stopped:
+            pass
+        except Exception as e:
+            try:
+                _put(outbox, _Failure(e), stop)
+            except _Stopped:
+                pass
+
+    def _run_stage(
+        self,
+        stage: Stage,
+        inbox: queue.Queue,
+        outbox: queue.Queue,
+        stop: threading.Event,
+    ) -> None:
+        # at most stage.workers calls are in flight, their results are
+        # forwarded oldest first to keep the order
+        pending: deque[Future] = deque()
+        with ThreadPoolExecutor(stage.workers, f"pipeline-{stage.name}") as executor:
+            try:
+                while True:
+                    item = _get(inbox, stop)
+                    if isinstance(item, (_Done, _Failure)):
+                        break
+                    pending.append(executor.submit(_call, stage.fn, item))
+                    if len(pending) >= stage.workers:
+                        for result in pending.popleft().result():
+                            _put(outbox, result, stop)
+                while pending:
+                    for result in pending.popleft().result():
+                        _put(outbox, result, stop)
+                # end of input or an upstream error
+                _put(outbox, item, stop)
+            except _Stopped:
+                pass
+            except Exception as e:
+                try:
+                    _put(outbox, _Failure(e), stop)
+                except _Stopped:
+                    pass
+            finally:
+                for future in pending:
+                    future.cancel()
@@ -0,0 +1,411 @@
+import math
+import threading
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator
+from zipfile import ZipFile
+
+from src.convert.mesh import get_info_from_mesh_filepath
+from src.convert.pipeline import get_segmentation_members
+from src.convert.selection import (
+    get_converted_timeframes,
+    get_volume_sources,
+    select_segmentation_members,
+    select_timeframes,
+)
+from src.convert.volume import get_pyramid_sample_rates, get_sampling_box
+from src.io.cif.read.header import read_bcif_row_counts
+from src.io.cvsx_loader import load_cvsx_entry
+from src.models.cvsx.cvsx_file import CVSXFile
+from src.models.mvsx.mvsx_options import MVSXConversionOptions
+from src.models.mvsx.mvsx_plan import MVSXCostModel, MVSXMemberPlan, MVSXPlan
+
+# the plan features, linear predictors of the cost of a conversion
+FEATURES = [
+    "constant",
+    # sums over the converted members
+    "volume_bytes",
+    # samples of volumes decoded to be cropped, sliced, re-encoded or
+    # downsampled into pyramid levels, and the samples written of them
+    "processed_volume_voxels",
+    "written_volume_voxels",
+    # of volumes written to the archive, not referenced by URL. Cropped
+    # volumes have their own feature, its coefficient is the fraction of
+    # them a crop typically keeps
+    "written_volume_bytes",
+    "cropped_volume_bytes",
+    "lattice_voxels",
+    # every lattice segment is meshed from a mask of the whole grid
+    "lattice_segment_voxels",
+    "mesh_vertices",
+    "mesh_triangles",
+    "primitives",
+    # the largest volume or lattice, decoded at once
+    "largest_voxels",
+    # mesh vertices in memory at once: the largest mesh member with
+    # incremental_segments, all of them otherwise
+    "held_vertices",
+]
+
+# fitted by benchmarks/planner.py on synthetic entries, refit on the entries
+# of a deployment and pass the result as cost_model
+DEFAULT_COST_MODEL = MVSXCostModel(
+    seconds={
+        "constant": 0.35,
+        "volume_bytes": 4.0e-9,
+        "processed_volume_voxels": 2.0e-8,
+        "written_volume_voxels": 1.0e-8,
+        "lattice_voxels": 6.0e-8,
+        "lattice_segment_voxels": 1.5e-8,
+        "mesh_vertices": 1.0e-6,
+        "mesh_triangles": 4.0e-7,
+        "primitives": 2.0e-4,
+    },
+    peak_memory_bytes={
+        "constant": 120e6,
+        "largest_voxels": 48.0,
+        "held_vertices": 120.0,
+        "primitives": 2000.0,
+    },
+    output_bytes={
+        "constant": 20e3,
+        "written_volume_bytes": 1.0,
+        "cropped_volume_bytes": 0.5,
+        "lattice_segment_voxels": 0.02,
+        "mesh_vertices": 30.0,
+        "mesh_triangles": 12.0,
+        "primitives": 300.0,
+    },
+)
+
+# every shape of a geometric segmentation has one
+PRIMITIVE_MARKER = b'"kind"'
+CHUNK_SIZE = 1 << 20
+
+
+def load_cost_model(path: str) -> MVSXCostModel:
+    with open(path) as f:
+        return MVSXCostModel.model_validate_json(f.read())
+
+
+def count_primitives(f: BinaryIO) -> int:
+    # counted in the raw JSON, which is not parsed. The tail of every chunk
+    # is kept for markers across chunks, it is too short to hold a whole one
+    count = 0
+    tail = b""
+    while chunk := f.read(CHUNK_SIZE):
+        data = tail + chunk
+        count += data.count(PRIMITIVE_MARKER)
+        tail = data[-(len(PRIMITIVE_MARKER) - 1) :]
+    return count
+
+
+def get_volume_dimensions(
+    cvsx_file: CVSXFile,
+    voxels: int,
+) -> tuple[int, tuple[float, float, float]]:
+    # the sample rate and x, y, z sample counts of a volume, from the
+    # sampling box with the nearest number of samples. A volume of a
+    # query region has the proportions of the box, scaled to its samples
+    sampling_box = get_sampling_box(cvsx_file, voxels)
+    if sampling_box is None or voxels <= 0:
+        return 1, (0, 0, 0)
+    sample_rate, box = sampling_box
+    scale = (voxels / max(math.prod(box.grid_dimensions), 1)) ** (1 / 3)
+    x, y, z = (count * scale for count in box.grid_dimensions)
+    return sample_rate, (x, y, z)
+
+
+def get_volume_written_size(
+    cvsx_file: CVSXFile,
+    options: MVSXConversionOptions,
+    voxels: int,
+    num_bytes: int,
+    cropped: bool,
+) -> tuple[int, int]:
+    # samples and bytes of the volume and its pyramid levels in the archive,
+    # as written by write_volumes
+    modified = (
+        cropped or options.volume_slices is not None or options.volume_bits is not None
+    )
+    # the volume itself, unless referenced by URL
+    written_voxels = 0
+    written_bytes = 0.0
+    if modified or options.volume_url_template is None:
+        written_voxels = voxels
+        written_bytes = num_bytes
+    if not modified and not options.volume_pyramid:
+        return written_voxels, int(written_bytes)
+
+    bytes_per_voxel = num_bytes / voxels if voxels else 0
+    if options.volume_bits is not None:
+        # re-encoding never grows a sample, integer volumes are copied
+        # as they are
+        bytes_per_voxel = min(bytes_per_voxel, options.volume_bits / 8)
+
+    sample_rate, (x, y, z) = get_volume_dimensions(cvsx_file, voxels)
+    if options.volume_slices == "center":
+        z = 1
+    elif options.volume_slices is not None:
+        z = math.ceil(round(z) / options.volume_slices)
+    if modified:
+        written_voxels = round(x * y * z)
+        written_bytes = written_voxels * bytes_per_voxel
+
+    if options.volume_pyramid:
+        # every level halves the sampling along every axis, odd counts are
+        # padded
+        for level_rate in get_pyramid_sample_rates(cvsx_file, sample_rate):
+            factor = level_rate // sample_rate
+            level_voxels = math.prod(math.ceil(count / factor) for count in (x, y, z))
+            written_voxels += level_voxels
+            written_bytes += level_voxels * bytes_per_voxel
+    return written_voxels, int(written_bytes)
+
+
+def get_mesh_sizes(cvsx_file: CVSXFile) -> dict[tuple[str, int, int], tuple[int, int]]:
+    # vertices and triangles by segmentation, timeframe and segment, at the
+    # detail level of the query, or the finest one
+    sizes: dict[tuple[str, int, int], tuple[int, int]] = {}
+    meshes = cvsx_file.metadata.segmentation_meshes
+    if meshes is None:
+        return sizes
+    for segmentation_id, metadata in meshes.segmentation_metadata.items():
+        for timeframe_id, components in metadata.mesh_timeframes.items():
+            for segment_id, detail_lvls in components.segment_ids.items():
+                if not detail_lvls.detail_lvls:
+                    continue
+                detail_lvl = cvsx_file.query.detail_lvl
+                if detail_lvl not in detail_lvls.detail_lvls:
+                    detail_lvl = min(detail_lvls.detail_lvls)
+                mesh_ids = detail_lvls.detail_lvls[detail_lvl].mesh_ids.values()
+                sizes[(segmentation_id, timeframe_id, segment_id)] = (
+                    sum(mesh.num_vertices for mesh in mesh_ids),
+                    sum(mesh.num_triangles for mesh in mesh_ids),
+                )
+    return sizes
+
+
+def get_member_plans(
+    cvsx_file: CVSXFile,
+    options: MVSXConversionOptions,
+) -> list[MVSXMemberPlan]:
+    # the members the conversion reads, from the index, the metadata and the
+    # BCIF headers. Only geometric members are read through
+    timeframes = cvsx_file.timeframes
+    if options.selection is not None:
+        timeframes = select_timeframes(timeframes, options.selection)
+    volume_timeframes, segmentation_timeframes = get_converted_timeframes(
+        timeframes, options
+    )
+    volume_sources = get_volume_sources(volume_timeframes)
+    segment_ids = options.selection.segment_ids if options.selection else None
+    members = select_segmentation_members(
+        get_segmentation_members(cvsx_file), segmentation_timeframes, segment_ids
+    )
+    mesh_sizes = get_mesh_sizes(cvsx_file)
+    # entries without segments keep the full volume
+    cropped = options.crop_to_segmentations and bool(members)
+
+    plans: list[MVSXMemberPlan] = []
+    with ZipFile(cvsx_file.filepath, "r") as z:
+        for source_filepath, volume_info in cvsx_file.index.volumes.items():
+            if source_filepath not in volume_sources:
+                continue
+            with z.open(source_filepath) as f:
+                row_counts = read_bcif_row_counts(f)
+            num_bytes = z.getinfo(source_filepath).file_size
+            voxels = row_counts.get("volume_data_3d", 0)
+            written_voxels, written_bytes = get_volume_written_size(
+                cvsx_file, options, voxels, num_bytes, cropped
+            )
+            plans.append(
+                MVSXMemberPlan(
+                    source_filepath=source_filepath,
+                    kind="volume",
+                    timeframe_id=volume_info.timeframeIndex,
+                    bytes=num_bytes,
+                    voxels=voxels,
+                    written_voxels=written_voxels,
+                    written_bytes=written_bytes,
+                    cropped=cropped,
+                )
+            )
+
+        for member in members:
+            counts = {}
+            if member.kind == "mesh":
+                segment_id, _, _ = get_info_from_mesh_filepath(member.source_filepath)
+                size = mesh_sizes.get(
+                    (member.segmentation_id, member.timeframe_id, segment_id)
+                )
+                if size is None:
+                    with z.open(member.source_filepath) as f:
+                        row_counts = read_bcif_row_counts(f)
+                    # mesh_triangle has a row per vertex index, three per
+                    # triangle, as MeshMetadata.num_triangles counts them
+                    size = (
+                        row_counts.get("mesh_vertex", 0),
+                        row_counts.get("mesh_triangle", 0) // 3,
+                    )
+                counts = {"vertices": size[0], "triangles": size[1]}
+            elif member.kind == "lattice":
+                with z.open(member.source_filepath) as f:
+                    row_counts = read_bcif_row_counts(f)
+                # the segment table has a row for the background as well
+                segments = max(row_counts.get("segmentation_data_table", 0) - 1, 0)
+                if segment_ids is not None:
+                    segments = min(segments, len(segment_ids))
+                counts = {
+                    "voxels": row_counts.get("segmentation_data_3d", 0),
+                    "segments": segments,
+                }
+            else:
+                with z.open(member.source_filepath) as f:
+                    counts = {"primitives": count_primitives(f)}
+            plans.append(
+                MVSXMemberPlan(
+                    source_filepath=member.source_filepath,
+                    kind=(
+                        member.kind
+                        if member.kind in ["mesh", "lattice"]
+                        else "geometric-segmentation"
+                    ),
+                    timeframe_id=member.timeframe_id,
+                    bytes=z.getinfo(member.source_filepath).file_size,
+                    **counts,
+                )
+            )
+
+    return plans
+
+
+def is_volume_processed(options: MVSXConversionOptions) -> bool:
+    # volumes are decoded, not copied as they are
+    return (
+        options.crop_to_segmentations
+        or options.volume_slices is not None
+        or options.volume_bits is not None
+        or options.volume_pyramid
+    )
+
+
+def get_plan_features(
+    members: list[MVSXMemberPlan],
+    options: MVSXConversionOptions,
+) -> dict[str, float]:
+    def total(kind: str, field: str) -> int:
+        return sum(getattr(member, field) for member in members if member.kind == kind)
+
+    volumes = [member for member in members if member.kind == "volume"]
+    mesh_vertices = [member.vertices for member in members if member.kind == "mesh"]
+    features = {
+        "constant": 1,
+        "volume_bytes": total("volume", "bytes"),
+        "processed_volume_voxels": (
+            total("volume", "voxels") if is_volume_processed(options) else 0
+        ),
+        "written_volume_voxels": (
+            total("volume", "written_voxels") if is_volume_processed(options) else 0
+        ),
+        "written_volume_bytes": sum(
+            volume.written_bytes for volume in volumes if not volume.cropped
+        ),
+        "cropped_volume_bytes": sum(
+            volume.written_bytes for volume in volumes if volume.cropped
+        ),
+        "lattice_voxels": total("lattice", "voxels"),
+        "lattice_segment_voxels": sum(
+            member.voxels * member.segments
+            for member in members
+            if member.kind == "lattice"
+        ),
+        "mesh_vertices": sum(mesh_vertices),
+        "mesh_triangles": total("mesh", "triangles"),
+        "primitives": total("geometric-segmentation", "primitives"),
+        "largest_voxels": max((member.voxels for member in members), default=0),
+        "held_vertices": (
+            max(mesh_vertices, default=0)
+            if options.incremental_segments
+            else sum(mesh_vertices)
+        ),
+    }
+    return {name: float(features[name]) for name in FEATURES}
+
+
+def predict(coefficients: dict[str, float], features: dict[str, float]) -> float:
+    return max(
+        sum(value * features.get(name, 0) for name, value in coefficients.items()), 0
+    )
+
+
+def plan_conversion(
+    cvsx_path: str,
+    options: MVSXConversionOptions | None = None,
+    cost_model: MVSXCostModel = DEFAULT_COST_MODEL,
+) -> MVSXPlan:
+    # predicts the conversion without parsing any volume or segmentation.
+    # Lattice segments reused from the previous timeframe or the geometry
+    # cache are not known in advance, so lattice costs are upper bounds
+    options = options or MVSXConversionOptions()
+    cvsx_file = load_cvsx_entry(cvsx_path, test_members=False)
+    members = get_member_plans(cvsx_file, options)
+    features = get_plan_features(members, options)
+    return MVSXPlan(
+        cvsx_path=cvsx_path,
+        members=members,
+        features=features,
+        seconds=predict(cost_model.seconds, features),
+        peak_memory_bytes=int(predict(cost_model.peak_memory_bytes, features)),
+        output_bytes=int(predict(cost_model.output_bytes, features)),
+    )
+
+
+class MemoryAdmission:
+    """
+    Memory-aware admission of planned conversions for schedulers: a plan is
+    admitted while the predicted peak memory of the admitted plans stays
+    within memory_bytes, and released once its conversion is done. A plan
+    predicted above memory_bytes is admitted when no other plan is, so it
+    runs alone instead of never. Thread safe.
+    """
+
+    def __init__(self, memory_bytes: int):
+        if memory_bytes <= 0:
+            raise ValueError("memory_bytes must be positive")
+        self.memory_bytes = memory_bytes
+        self.admitted_bytes = 0
+        self.num_admitted = 0
+        self._condition = threading.Condition()
+
+    def _fits(self, plan: MVSXPlan) -> bool:
+        if self.num_admitted == 0:
+            return True
+        return self.admitted_bytes + plan.peak_memory_bytes <= self.memory_bytes
+
+    def _admit(self, plan: MVSXPlan) -> None:
+        self.num_admitted += 1
+        self.admitted_bytes += plan.peak_memory_bytes
+
+    def try_admit(self, plan: MVSXPlan) -> bool:
+        with self._condition:
+            if not self._fits(plan):
+                return False
+            self._admit(plan)
+            return True
+
+    def release(self, plan: MVSXPlan) -> None:
+        with self._condition:
+            self.num_admitted -= 1
+            self.admitted_bytes -= plan.peak_memory_bytes
+            self._condition.notify_all()
+
+    @contextmanager
+    def admitted(self, plan: MVSXPlan) -> Iterator[None]:
+        # waits until the plan is admitted, released on exit
+        with self._condition:
+            self._condition.wait_for(lambda: self._fits(plan))
+            self._admit(plan)
+        try:
+            yield
+        finally:
+            self.release(plan)
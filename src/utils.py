@@ -53,6 +53,41 @@ def matrix_to_flat_list(matrix: np.ndarray) -> list[float]:
     return matrix.T.flatten().tolist()
 
 
+def axis_angle_to_rotation_matrices(
+    axes: np.ndarray,
+    angles: np.ndarray,
+) -> np.ndarray:
+    # Rodrigues' formula for (N, 3) axes and (N,) angles -> (N, 3, 3)
+    axes = axes / np.linalg.norm(axes, axis=1, keepdims=True)
+    x, y, z = axes.T
+    zeros = np.zeros_like(x)
+
+    K = np.stack([zeros, -z, y, z, zeros, -x, -y, x, zeros], axis=1).reshape(-1, 3, 3)
+    sin_angles = np.sin(angles)[:, None, None]
+    cos_angles = np.cos(angles)[:, None, None]
+
+    return np.eye(3) + sin_angles * K + (1 - cos_angles) * (K @ K)
+
+
+def compose_transform_matrices(
+    rotations: np.ndarray,
+    scalings: np.ndarray,
+    translations: np.ndarray,
+) -> np.ndarray:
+    # (N, 4, 4) matrices applying scaling, then rotation, then translation
+    transforms = np.zeros((len(rotations), 4, 4))
+    # R @ diag(s) scales the columns of R
+    transforms[:, :3, :3] = rotations * scalings[:, None, :]
+    transforms[:, :3, 3] = translations
+    transforms[:, 3, 3] = 1
+    return transforms
+
+
+def matrices_to_flat_lists(matrices: np.ndarray) -> list[list[float]]:
+    # column major, as expected by MVS instances
+    return matrices.transpose(0, 2, 1).reshape(len(matrices), -1).tolist()
+
+
 def smooth_3d_volume(volume: np.ndarray, iterations: int = 1) -> np.ndarray:
     vol = volume.astype(np.float32)
     for _ in range(iterations):